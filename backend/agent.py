@@ -1,15 +1,26 @@
-from typing import List
+from typing import List, Optional, Union
 from models import Task, TaskWithUtility
 from agent_intelligence import AgentIntelligence
 from database import Database
+from task_table import TaskTable
 
 
 # Mantém funções originais para compatibilidade, mas agora usa AgentIntelligence
 
+_default_db = None
+
+
+def _get_default_db() -> Database:
+    """Banco padrão compartilhado pelos wrappers quando nenhum é informado"""
+    global _default_db
+    if _default_db is None:
+        _default_db = Database()
+    return _default_db
+
 def calculate_utility(task: Task, db: Database = None) -> float:
     """Calcula utilidade (wrapper para AgentIntelligence)"""
     if db is None:
-        db = Database()
+        db = _get_default_db()
     agent = AgentIntelligence(db)
     return agent.calculate_utility(task)
 
@@ -34,12 +45,13 @@ def get_importance_level(importance: float) -> str:
         return "low"
 
 
-def prioritize_tasks(tasks: List[Task], db: Database = None) -> List[TaskWithUtility]:
+def prioritize_tasks(tasks: Union[List[Task], TaskTable], db: Database = None, limit: Optional[int] = None,
+                     risk_weight: float = 0.0) -> List[TaskWithUtility]:
     """
     Ordena as tarefas por utilidade (wrapper para AgentIntelligence)
     Agora com reavaliação automática e detecção de alto estresse
     """
     if db is None:
-        db = Database()
+        db = _get_default_db()
     agent = AgentIntelligence(db)
-    return agent.prioritize_tasks(tasks)
+    return agent.prioritize_tasks(tasks, limit=limit, risk_weight=risk_weight)
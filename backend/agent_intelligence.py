@@ -3,15 +3,33 @@ Módulo de Inteligência do Agente
 Implementa funcionalidades avançadas de IA para o gerenciamento de tarefas
 """
 
-from typing import List, Dict, Tuple
-from datetime import datetime, timedelta
+from typing import List, Dict, Tuple, Optional, Union
+from datetime import datetime, date, timedelta
+import numpy as np
 from models import Task, TaskWithUtility, NextActionSuggestion, DashboardStats
-from database import Database
+from database import Database, EVENT_FEATURE_COLUMNS, EVENT_REF_COLUMNS
+from scoring import (TaskColumns, WEIGHT_KEYS, utility_scores, round_scores, rank,
+                     feature_matrix, weight_vector)
+from weight_sweep import build_vectors, sweep
+from planner import build_plan
+from risk import DEFAULT_HOURS_PER_DAY, DEFAULT_SIMULATIONS, estimate_sigma, simulate, days_needed
+from priority_index import PriorityIndex
+from task_table import TASK_COLUMNS, TaskTable
+from metrics import timed
+from preference_learning import EVENT_LABELS, task_features, sgd_update, fit
 
 
+# Simulações usadas quando o risco entra na utilidade (semente fixa: ranking estável)
+RISK_SCORE_SIMULATIONS = 500
+
+# Campos de TaskWithUtility, na ordem das tuplas de prioritize_rows
+PRIORITIZED_FIELDS = TASK_COLUMNS + ('utility', 'urgency_level', 'importance_level')
+
 class AgentIntelligence:
-    def __init__(self, db: Database):
+    def __init__(self, db: Database, use_index: bool = False):
         self.db = db
+        # Índice incremental (opcional) para next-action e top-k sem varrer o backlog
+        self.index = PriorityIndex(self) if use_index else None
     
     def calculate_utility(self, task: Task, weights: Dict = None) -> float:
         """
@@ -59,14 +77,21 @@ class AgentIntelligence:
         else:
             return "low"
     
-    def detect_high_stress_mode(self, tasks: List[Task]) -> bool:
+    @timed("detect_high_stress_mode")
+    def detect_high_stress_mode(self, tasks: Optional[List[Task]] = None) -> bool:
         """
         Detecta se o usuário está em modo alto estresse
         Critérios:
         - Muitas tarefas com stress >= 0.6
         - Prazos muito curtos (deadline <= 2)
         - Carga de horas muito grande
+        Sem `tasks`, usa os agregados calculados direto no banco
         """
+        if tasks is None:
+            active = self._active_summary(self.db.get_status_summary())
+            return self._is_high_stress(active['count'], active['high_stress_count'],
+                                        active['urgent_count'], active['total_hours'])
+        
         if not tasks:
             return False
         
@@ -79,9 +104,28 @@ class AgentIntelligence:
         urgent_count = sum(1 for t in active_tasks if t.deadline <= 2)
         total_hours = sum(t.duration for t in active_tasks)
         
+        return self._is_high_stress(len(active_tasks), high_stress_count, urgent_count, total_hours)
+    
+    def _active_summary(self, summary: Dict[str, Dict]) -> Dict:
+        """Soma os agregados de todos os status diferentes de 'done'"""
+        active = {'count': 0, 'total_hours': 0.0, 'urgent_count': 0,
+                  'high_stress_count': 0, 'stress_sum': 0.0}
+        for status, values in summary.items():
+            if status == 'done':
+                continue
+            for key in active:
+                active[key] += values[key]
+        return active
+    
+    def _is_high_stress(self, active_count: int, high_stress_count: int,
+                        urgent_count: int, total_hours: float) -> bool:
+        """Aplica os critérios de alto estresse a contagens já agregadas"""
+        if active_count == 0:
+            return False
+        
         # Está em alto estresse se:
-        stress_ratio = high_stress_count / len(active_tasks)
-        urgent_ratio = urgent_count / len(active_tasks)
+        stress_ratio = high_stress_count / active_count
+        urgent_ratio = urgent_count / active_count
         
         return (stress_ratio >= 0.5 or  # 50%+ das tarefas com alto stress
                 urgent_ratio >= 0.4 or   # 40%+ das tarefas urgentes
@@ -101,62 +145,333 @@ class AgentIntelligence:
             'effort_weight': base_weights['effort_weight'] * 1.8  # MUITO mais peso em tarefas rápidas
         }
     
-    def prioritize_tasks(self, tasks: List[Task], force_weights: Dict = None) -> List[TaskWithUtility]:
+    @timed("prioritize_tasks")
+    def prioritize_tasks(self, tasks: Union[List[Task], TaskTable], force_weights: Dict = None,
+                         limit: Optional[int] = None, risk_weight: float = 0.0) -> List[TaskWithUtility]:
         """
         Prioriza tarefas com reavaliação automática
+        A pontuação é feita em lote (NumPy) sobre a TaskTable; só as `limit` primeiras
+        viram TaskWithUtility
+        Com risk_weight > 0 soma risk_weight * P(atraso) (Monte Carlo) à utilidade
         """
-        if not tasks:
-            return []
+        active, order, scores = self._rank(tasks, force_weights, limit, risk_weight)
+        return [self._with_utility(task, float(scores[i]))
+                for task, i in zip(active.tasks(order), order)]
+    
+    @timed("prioritize_rows")
+    def prioritize_rows(self, tasks: TaskTable, force_weights: Dict = None,
+                        limit: Optional[int] = None, risk_weight: float = 0.0,
+                        completion_samples: Optional[Tuple[List[float], List[float]]] = None) -> List[tuple]:
+        """
+        Mesmo ranking de prioritize_tasks, em tuplas na ordem de PRIORITIZED_FIELDS
+        (serializadas direto, sem montar TaskWithUtility)
+        Com pesos e amostras (get_completion_samples) já lidos, não acessa o banco
+        """
+        active, order, scores = self._rank(tasks, force_weights, limit, risk_weight, completion_samples)
+        utilities = scores.tolist()
+        deadlines = active.columns.deadline.tolist()
+        importances = active.columns.importance.tolist()
+        return [
+            active.row(i) + (utilities[i], self.get_urgency_level(deadlines[i]),
+                             self.get_importance_level(importances[i]))
+            for i in order
+        ]
+    
+    def _rank(self, tasks: Union[List[Task], TaskTable], force_weights: Dict = None,
+              limit: Optional[int] = None, risk_weight: float = 0.0,
+              completion_samples: Optional[Tuple[List[float], List[float]]] = None
+              ) -> Tuple[TaskTable, List[int], np.ndarray]:
+        """(tarefas ativas, posições em ordem de prioridade, utilidades)"""
+        if not isinstance(tasks, TaskTable):
+            tasks = TaskTable.from_tasks(tasks)
         
         # Filtra apenas tarefas não concluídas
-        active_tasks = [t for t in tasks if t.status != 'done']
+        active = tasks.active()
         
-        if not active_tasks:
-            return []
+        if not len(active):
+            return active, [], np.empty(0)
         
-        # Detecta modo alto estresse
-        high_stress = self.detect_high_stress_mode(active_tasks)
+        extra = None
+        if risk_weight:
+            risk = self._simulate(active, DEFAULT_HOURS_PER_DAY, RISK_SCORE_SIMULATIONS, seed=0,
+                                  completion_samples=completion_samples)
+            extra = risk_weight * risk.late_probability
         
+        scores = self._score(active.columns, force_weights, extra)
+        return active, rank(scores, limit).tolist(), scores
+    
+    def _columns_high_stress(self, columns: TaskColumns) -> bool:
+        """Detecta modo alto estresse direto nas colunas"""
+        return self._is_high_stress(
+            len(columns),
+            int((columns.stress >= 0.6).sum()),
+            int((columns.deadline <= 2).sum()),
+            sum(columns.duration.tolist())
+        )
+    
+    def _score(self, columns: TaskColumns, force_weights: Dict = None,
+               extra: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Utilidade arredondada das tarefas ativas, com o ajuste do modo alto estresse
+        extra (opcional) é somado antes do arredondamento
+        """
         # Carrega pesos
         base_weights = force_weights or self.db.get_user_weights()
         
         # Ajusta pesos se necessário
-        weights = self.adjust_weights_for_high_stress(base_weights) if high_stress else base_weights
+        if self._columns_high_stress(columns):
+            weights = self.adjust_weights_for_high_stress(base_weights)
+        else:
+            weights = base_weights
         
-        tasks_with_utility = []
+        utility = utility_scores(columns, weights)
+        if extra is not None:
+            utility += extra
+        return round_scores(utility)
+    
+    @timed("score_tasks")
+    def score_tasks(self, tasks: List[Task], weights: Optional[Dict] = None,
+                    high_stress: Optional[bool] = None) -> np.ndarray:
+        """
+        Utilidade de um subconjunto de tarefas (ex.: resultados de busca)
+        O modo alto estresse vem do backlog inteiro, não só do subconjunto
+        (weights e high_stress, quando já lidos, evitam ir ao banco)
+        """
+        weights = weights or self.db.get_user_weights()
+        if high_stress is None:
+            high_stress = self.detect_high_stress_mode()
+        if high_stress:
+            weights = self.adjust_weights_for_high_stress(weights)
+        return round_scores(utility_scores(TaskColumns.from_tasks(tasks), weights))
+    
+    @timed("sweep_weights")
+    def sweep_weights(self, mode: str = "random", weights: Optional[List[Dict]] = None,
+                      samples: int = 100, steps: int = 3, spread: float = 0.2,
+                      seed: Optional[int] = None, top_k: int = 10,
+                      current_weights: Optional[Dict] = None,
+                      active: Optional[TaskTable] = None) -> Dict:
+        """
+        Sensibilidade do ranking aos pesos
+        Pontua as tarefas ativas contra todos os vetores numa única multiplicação de matrizes
+        e compara cada ranking com o dos pesos atuais
+        current_weights e active, quando já lidos do banco, evitam a leitura aqui
+        """
+        base_weights = current_weights or self.db.get_user_weights()
+        vectors = build_vectors(mode, base_weights, weights, samples, steps, spread, seed)
         
-        for task in active_tasks:
-            utility = self.calculate_utility(task, weights)
-            urgency_level = self.get_urgency_level(task.deadline)
-            importance_level = self.get_importance_level(task.importance)
-            
-            task_with_utility = TaskWithUtility(
-                **task.model_dump(),
-                utility=utility,
-                urgency_level=urgency_level,
-                importance_level=importance_level
-            )
-            tasks_with_utility.append(task_with_utility)
-        
-        # Ordena por utilidade
-        tasks_with_utility.sort(key=lambda x: x.utility, reverse=True)
-        
-        return tasks_with_utility
+        if active is None:
+            active = self.db.get_task_table(active_only=True)
+        if not len(active):
+            return {'tasks': 0, 'vectors': len(vectors), 'high_stress_mode': False}
+        
+        columns = active.columns
+        high_stress = self._columns_high_stress(columns)
+        # O ajuste do modo alto estresse é um fator por peso: aplica em todos os vetores
+        factors = np.ones(len(WEIGHT_KEYS))
+        if high_stress:
+            factors = weight_vector(self.adjust_weights_for_high_stress(dict.fromkeys(WEIGHT_KEYS, 1.0)))
+        
+        baseline = self._score(columns, base_weights)
+        result = sweep(feature_matrix(columns), vectors * factors, baseline, top_k)
+        
+        def describe(i: int) -> Dict:
+            return {'task_id': active.value(i, 'id'), 'title': active.value(i, 'title')}
+        
+        return {
+            'tasks': len(active),
+            'vectors': len(vectors),
+            'high_stress_mode': high_stress,
+            'baseline_top': [describe(i) for i in result['baseline_top']],
+            'rank_stability': result['rank_stability'],
+            'top_k_overlap': result['top_k_overlap'],
+            'top1_frequency': [
+                {**describe(i), 'count': count, 'share': count / len(vectors)}
+                for i, count in result['top1'][:20]
+            ],
+            'baseline_top_ranks': [
+                {**describe(item.pop('index')), **item} for item in result['baseline_top_ranks']
+            ],
+        }
     
-    def suggest_next_action(self) -> NextActionSuggestion:
+    @timed("plan_schedule")
+    def plan_schedule(self, hours_per_day: float = 6.0, days: int = 14,
+                      capacity: Optional[Dict[date, float]] = None,
+                      allow_split: bool = True, max_listed: int = 100,
+                      active: Optional[TaskTable] = None, weights: Optional[Dict] = None) -> Dict:
         """
-        🧠 Sugestão de próxima ação
-        Retorna a tarefa com maior utilidade no momento
+        📋 Plano dia a dia respeitando a capacidade (horas por dia)
+        Garante primeiro os prazos viáveis e usa a folga para as tarefas de maior utilidade
+        As listas de inviáveis, atrasadas e não agendadas trazem até max_listed itens
+        (as contagens completas ficam em summary)
+        active e weights, quando já lidos do banco, evitam a leitura aqui
         """
-        tasks = self.db.get_all_tasks()
-        # Filtra apenas tarefas não concluídas
-        pending_tasks = [t for t in tasks if t.status != 'done']
-        prioritized = self.prioritize_tasks(pending_tasks)
+        today = date.today()
+        capacity = capacity or {}
+        calendar = [today + timedelta(days=i) for i in range(days)]
+        capacities = [float(capacity.get(day, hours_per_day)) for day in calendar]
+        
+        if active is None:
+            active = self.db.get_task_table(active_only=True)
+        scores = self._score(active.columns, weights).tolist() if len(active) else []
+        
+        # Prazo como índice do dia no plano (atrasadas contam como hoje)
+        dues = active.due_days(today).tolist()
+        durations = active.columns.duration.tolist()
+        plan = build_plan(durations, [max(0, d) for d in dues], scores, capacities, allow_split)
+        
+        def describe(i: int) -> Dict:
+            return {'task_id': active.value(i, 'id'), 'title': active.value(i, 'title'),
+                    'due_at': active.value(i, 'due_at'), 'utility': scores[i]}
+        
+        def finish_date(i: int) -> Optional[str]:
+            day = plan.finish_day[i]
+            return calendar[day].isoformat() if day is not None else None
+        
+        schedule = []
+        for day, entries in zip(calendar, plan.days):
+            items = [
+                {**describe(i), 'hours': round(hours, 2), 'finishes': plan.finish_day[i] is not None
+                 and calendar[plan.finish_day[i]] == day}
+                for i, hours in entries.items()
+            ]
+            schedule.append({
+                'date': day.isoformat(),
+                'capacity': capacity.get(day, hours_per_day),
+                'planned_hours': round(sum(entries.values()), 2),
+                'tasks': items
+            })
+        
+        infeasible = set(plan.infeasible)
+        late = [
+            {**describe(i), 'finish_date': finish_date(i)}
+            for i in range(len(active))
+            if dues[i] < days and i not in infeasible
+            and (dues[i] < 0 or plan.finish_day[i] is None or plan.finish_day[i] > dues[i])
+        ]
+        unscheduled = [i for i in range(len(active)) if plan.remaining[i] > 0]
+        unscheduled.sort(key=lambda i: -scores[i])
         
-        if not prioritized:
-            raise ValueError("Nenhuma tarefa disponível")
+        return {
+            'start': today.isoformat(),
+            'days': schedule,
+            'infeasible': [{**describe(i), 'duration': durations[i],
+                            'finish_date': finish_date(i)} for i in plan.infeasible[:max_listed]],
+            'late': late[:max_listed],
+            'unscheduled': [{**describe(i), 'remaining_hours': round(plan.remaining[i], 2)}
+                            for i in unscheduled[:max_listed]],
+            'summary': {
+                'tasks': len(active),
+                'capacity_hours': round(sum(capacities), 2),
+                'planned_hours': round(sum(sum(entries.values()) for entries in plan.days), 2),
+                'infeasible_count': len(plan.infeasible),
+                'late_count': len(late),
+                'unscheduled_count': len(unscheduled),
+            }
+        }
+    
+    def _simulate(self, active: TaskTable, hours_per_day: float, simulations: int,
+                  seed: Optional[int] = None,
+                  completion_samples: Optional[Tuple[List[float], List[float]]] = None):
+        """Monte Carlo das tarefas ativas com o sigma aprendido do histórico"""
+        sigma, _ = estimate_sigma(*(completion_samples or self.db.get_completion_samples()))
+        return simulate(active.columns.duration, active.due_days(), sigma, hours_per_day,
+                        simulations, seed)
+    
+    @timed("deadline_risk")
+    def deadline_risk(self, hours_per_day: float = DEFAULT_HOURS_PER_DAY,
+                      simulations: int = DEFAULT_SIMULATIONS, seed: Optional[int] = 0,
+                      limit: int = 20, active: Optional[TaskTable] = None,
+                      completion_samples: Optional[Tuple[List[float], List[float]]] = None) -> Dict:
+        """
+        🎲 Risco de atraso por Monte Carlo
+        Durações lognormais (espalhamento aprendido das tarefas concluídas), executadas em
+        ordem de prazo com hours_per_day por dia. Retorna a probabilidade de atraso de cada
+        tarefa (as `limit` mais arriscadas) e a probabilidade de sobrecarga
+        active e completion_samples, quando já lidos do banco, evitam a leitura aqui
+        """
+        today = date.today()
+        sigma, samples = estimate_sigma(*(completion_samples or self.db.get_completion_samples()))
+        if active is None:
+            active = self.db.get_task_table(active_only=True)
+        dues = active.due_days(today)
+        risk = simulate(active.columns.duration, dues, sigma, hours_per_day, simulations, seed)
+        
+        probabilities = risk.late_probability
+        order = np.argsort(-probabilities, kind='stable')[:limit].tolist()
+        
+        def finish_date(i: int) -> str:
+            return (today + timedelta(days=int(round(risk.expected_finish_day[i])))).isoformat()
+        
+        summary = {}
+        if len(active):
+            summary = {
+                'total_hours': {f'p{q}': round(float(np.percentile(risk.total_hours, q)), 1)
+                                for q in (10, 50, 90)},
+                'days_to_clear': {f'p{q}': days_needed(risk.total_hours, hours_per_day, q)
+                                  for q in (50, 90)},
+            }
         
-        best_task = prioritized[0]
+        return {
+            'simulations': risk.simulations,
+            'hours_per_day': hours_per_day,
+            'duration_sigma': round(sigma, 3),
+            'sigma_samples': samples,
+            'tasks': len(active),
+            'overload_probability': round(risk.overload_probability, 4),
+            'expected_late_tasks': round(risk.expected_late, 2),
+            'overdue_count': int((dues < 0).sum()),
+            'at_risk_count': int((probabilities >= 0.5).sum()),
+            **summary,
+            'riskiest': [
+                {'task_id': active.value(i, 'id'), 'title': active.value(i, 'title'),
+                 'due_at': active.value(i, 'due_at'), 'duration': active.value(i, 'duration'),
+                 'late_probability': round(float(probabilities[i]), 4),
+                 'expected_finish_date': finish_date(i)}
+                for i in order
+            ],
+        }
+    
+    def _with_utility(self, task: Task, utility: float) -> TaskWithUtility:
+        """Monta o TaskWithUtility a partir de uma tarefa já validada pelo banco"""
+        return TaskWithUtility.model_construct(
+            **dict(task),
+            utility=utility,
+            urgency_level=self.get_urgency_level(task.deadline),
+            importance_level=self.get_importance_level(task.importance)
+        )
+    
+    def load_index(self):
+        """
+        Lê do banco o que o índice precisa (sem pontuar), para que top_tasks no executor
+        de CPU só faça a pontuação
+        """
+        if self.index is not None:
+            self.index.load()
+    
+    @timed("top_tasks")
+    def top_tasks(self, limit: int) -> List[TaskWithUtility]:
+        """
+        As `limit` tarefas de maior utilidade
+        Usa o índice incremental quando disponível
+        """
+        if self.index is not None:
+            return self.index.top(limit)
+        return self.prioritize_tasks(self.db.get_task_table(active_only=True), limit=limit)
+    
+    @timed("suggest_next_action")
+    def suggest_next_action(self, best_task: Optional[TaskWithUtility] = None) -> NextActionSuggestion:
+        """
+        🧠 Sugestão de próxima ação
+        Retorna a tarefa com maior utilidade no momento
+        (ou `best_task`, quando ela já vem de um ranking pronto)
+        """
+        if best_task is None:
+            prioritized = self.top_tasks(1)
+            
+            if not prioritized:
+                raise ValueError("Nenhuma tarefa disponível")
+            
+            best_task = prioritized[0]
         
         # Gera razão da sugestão
         reasons = []
@@ -191,106 +506,110 @@ class AgentIntelligence:
             estimated_finish_time=finish_time.strftime("%H:%M")
         )
     
-    def adaptive_learning(self, ignored_task_id: int):
+    @timed("adaptive_learning")
+    def adaptive_learning(self, ignored_task_id: int) -> Optional[Task]:
         """
         Aprendizado adaptativo
-        Ajusta pesos quando usuário ignora sugestão
+        Registra que o usuário ignorou a sugestão e ajusta os pesos (modelo pairwise)
+        Retorna a tarefa com o contador atualizado (ou None)
         """
-        # Incrementa contador de ignorados
-        self.db.increment_ignored_count(ignored_task_id)
-        
-        # Busca tarefa ignorada
-        task = self.db.get_task_by_id(ignored_task_id)
-        
-        if not task or task.ignored_count < 2:
-            return  # Precisa ignorar pelo menos 2x para ajustar
-        
-        # Carrega pesos atuais
-        weights = self.db.get_user_weights()
-        
-        # Ajusta pesos baseado nas características da tarefa ignorada
-        # Se ignora tarefas estressantes → diminui peso de stress
-        if task.stress >= 0.6:
-            weights['stress_weight'] *= 0.9
-        
-        # Se ignora tarefas longas → aumenta peso de effort
-        if task.duration >= 5:
-            weights['effort_weight'] *= 1.1
-        
-        # Se ignora tarefas de baixa importância → aumenta peso de importância
-        if task.importance < 0.5:
-            weights['importance_weight'] *= 1.1
-        
-        # Se ignora tarefas divertidas → diminui peso de fun
-        if task.fun >= 0.7:
-            weights['fun_weight'] *= 0.9
-        
-        # Salva pesos ajustados
-        self.db.update_user_weights(weights)
+        return self.record_feedback('ignored', ignored_task_id)
+    
+    @timed("record_feedback")
+    def record_feedback(self, event: str, task_id: int) -> Optional[Task]:
+        """
+        Registra no log o retorno do usuário (shown, accepted, completed, ignored)
+        A referência do par é a melhor tarefa ativa diferente desta; eventos com rótulo
+        fazem um passo de SGD nos pesos na mesma transação
+        """
+        label = EVENT_LABELS[event]
+        ref = self._reference_task(task_id)
+        ref_features = task_features(ref) if ref is not None else None
+        
+        def build(task: Task, weights: Dict):
+            features = task_features(task)
+            row = dict(zip(EVENT_FEATURE_COLUMNS, features))
+            if ref is None:
+                # Sem alternativa não há par para aprender
+                return dict(row, label=0), None
+            row.update(zip(EVENT_REF_COLUMNS, ref_features), ref_task_id=ref.id, label=label)
+            if not label:
+                return row, None
+            preferred, other = (features, ref_features) if label > 0 else (ref_features, features)
+            return row, sgd_update(weights, preferred, other)
+        
+        return self.db.record_feedback(task_id, event, build, increment_ignored=(event == 'ignored'))
     
+    def _reference_task(self, task_id: int) -> Optional[TaskWithUtility]:
+        """Melhor tarefa ativa diferente de task_id"""
+        for task in self.top_tasks(2):
+            if task.id != task_id:
+                return task
+        return None
+    
+    @timed("retrain_preferences")
+    def retrain_preferences(self, epochs: int = 200) -> Dict:
+        """Retreina os pesos do zero com todos os pares do log (em lote, vetorizado)"""
+        weights, pairs = fit(self.db.iter_preference_pairs(), epochs=epochs)
+        if pairs:
+            self.db.update_user_weights(weights)
+        return {'pairs': pairs, 'weights': weights}
+    
+    @timed("get_dashboard_stats")
     def get_dashboard_stats(self) -> DashboardStats:
         """
         📊 Estatísticas para o dashboard
         """
-        all_tasks = self.db.get_all_tasks()
+        summary = self.db.get_status_summary()
+        active = self._active_summary(summary)
+        # Tarefas arquivadas continuam contando como concluídas
+        archived_count = self.db.get_archive_summary()['count']
         
-        backlog = [t for t in all_tasks if t.status == 'backlog']
-        doing = [t for t in all_tasks if t.status == 'doing']
-        done = [t for t in all_tasks if t.status == 'done']
-        active = [t for t in all_tasks if t.status != 'done']
+        total_tasks = sum(values['count'] for values in summary.values()) + archived_count
+        done_count = summary.get('done', {}).get('count', 0) + archived_count
         
-        total_hours = sum(t.duration for t in active)
-        urgent = sum(1 for t in active if t.deadline <= 2)
-        high_stress = sum(1 for t in active if t.stress >= 0.6)
+        avg_stress = active['stress_sum'] / active['count'] if active['count'] else 0
         
-        avg_stress = sum(t.stress for t in active) / len(active) if active else 0
-        
-        completion_rate = len(done) / len(all_tasks) if all_tasks else 0
+        completion_rate = done_count / total_tasks if total_tasks else 0
         
         return DashboardStats(
-            total_tasks=len(all_tasks),
-            backlog_count=len(backlog),
-            doing_count=len(doing),
-            done_count=len(done),
-            total_hours=round(total_hours, 1),
-            urgent_tasks=urgent,
-            high_stress_tasks=high_stress,
+            total_tasks=total_tasks,
+            backlog_count=summary.get('backlog', {}).get('count', 0),
+            doing_count=summary.get('doing', {}).get('count', 0),
+            done_count=done_count,
+            total_hours=round(active['total_hours'], 1),
+            urgent_tasks=active['urgent_count'],
+            high_stress_tasks=active['high_stress_count'],
             average_stress=round(avg_stress, 2),
-            completion_rate=round(completion_rate, 2)
+            completion_rate=round(completion_rate, 2),
+            archived_count=archived_count
         )
     
+    @timed("get_timeline_data")
     def get_timeline_data(self) -> List[Dict]:
         """
         📅 Timeline de deadlines para os próximos 30 dias
+        Horas e contagem por dia vêm da tabela de agregados diários
         """
-        tasks = self.db.get_all_tasks()
-        active_tasks = [t for t in tasks if t.status != 'done']
+        today = date.today()
+        until = today + timedelta(days=30)  # Apenas próximos 30 dias
+        urgent_until = (today + timedelta(days=2)).isoformat()
         
-        # Agrupa por deadline
         timeline = {}
-        for task in active_tasks:
-            if task.deadline <= 30:  # Apenas próximos 30 dias
-                date = (datetime.now() + timedelta(days=task.deadline)).strftime("%Y-%m-%d")
-                
-                if date not in timeline:
-                    timeline[date] = {
-                        'date': date,
-                        'tasks': [],
-                        'total_hours': 0,
-                        'urgent_count': 0
-                    }
-                
-                timeline[date]['tasks'].append({
-                    'id': task.id,
-                    'title': task.title,
-                    'duration': task.duration,
-                    'importance': task.importance
-                })
-                timeline[date]['total_hours'] += task.duration
-                
-                if task.deadline <= 2:
-                    timeline[date]['urgent_count'] += 1
+        for rollup in self.db.get_timeline_rollup(until):
+            day = rollup['day']
+            timeline[day] = {
+                'date': day,
+                'tasks': [],
+                'total_hours': round(rollup['total_hours'], 2),
+                # Todas as tarefas de um mesmo dia têm o mesmo deadline
+                'urgent_count': rollup['task_count'] if day <= urgent_until else 0
+            }
+        
+        for task in self.db.get_timeline_tasks(until):
+            day = timeline.get(task.pop('due_at'))
+            if day is not None:
+                day['tasks'].append(task)
         
         # Converte para lista ordenada
-        result = sorted(timeline.values(), key=lambda x: x['date'])
-        return result
+        return list(timeline.values())
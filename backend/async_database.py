@@ -0,0 +1,67 @@
+"""
+Acesso assíncrono ao banco
+Executa as chamadas bloqueantes do Database em um executor dedicado e limitado,
+e o cálculo pesado do agente em outro, para não travar o event loop
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from database import Database
+
+
+# Executor só para I/O de banco (tamanho próximo ao do pool de conexões)
+DB_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("DB_EXECUTOR_WORKERS", "8")),
+    thread_name_prefix="db"
+)
+
+# Executor para pontuação/priorização (NumPy libera o GIL nas operações em lote)
+CPU_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("CPU_EXECUTOR_WORKERS", str(os.cpu_count() or 2))),
+    thread_name_prefix="scoring"
+)
+
+
+async def run_in(executor: ThreadPoolExecutor, fn: Callable, *args, **kwargs):
+    """Roda fn no executor preservando o contexto (contextvars) da requisição"""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, fn, *args, **kwargs)
+    return await loop.run_in_executor(executor, call)
+
+
+async def run_cpu(fn: Callable, *args, **kwargs):
+    """Roda trabalho de CPU (pontuação, ordenação) fora do event loop"""
+    return await run_in(CPU_EXECUTOR, fn, *args, **kwargs)
+
+
+class AsyncDatabase:
+    """
+    Versão assíncrona do Database
+    Qualquer método público vira uma corrotina: await adb.get_all_tasks()
+    Os submit_* (fila de escrita) só aguardam a Future, sem ocupar o executor
+    """
+
+    def __init__(self, db: Database, executor: ThreadPoolExecutor = DB_EXECUTOR):
+        self.db = db
+        self.executor = executor
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.db, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        if name.startswith('submit_'):
+            async def call(*args, **kwargs):
+                return await asyncio.wrap_future(attr(*args, **kwargs))
+        else:
+            async def call(*args, **kwargs):
+                return await run_in(self.executor, attr, *args, **kwargs)
+
+        call.__name__ = name
+        return call
@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+"""
+Benchmarks do backend
+Popula bancos temporários com tarefas sintéticas (workload.py) e mede operações do
+Database, do AgentIntelligence e das rotas da API (cliente de teste em processo)
+
+    python benchmark.py run --sizes 1000 10000 --output bench.json
+    python benchmark.py compare baseline.json bench.json --threshold 0.2
+
+O modo compare termina com código 1 se o p50 ou o p99 de algum caso piorar além do limite
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from models import TaskUpdate
+from database import Database
+from agent_intelligence import AgentIntelligence
+from workload import generate_task, populate
+
+
+STATUSES = ("backlog", "doing", "done")
+
+
+class Case:
+    """Operação medida; setup (opcional) roda antes de cada amostra, fora da medição"""
+
+    def __init__(self, name: str, fn: Callable, setup: Optional[Callable] = None):
+        self.name = name
+        self.fn = fn
+        self.setup = setup
+
+
+def percentile(sorted_samples: List[float], q: float) -> float:
+    """Percentil pelo método nearest-rank (amostras já ordenadas)"""
+    index = max(0, math.ceil(q * len(sorted_samples)) - 1)
+    return sorted_samples[min(index, len(sorted_samples) - 1)]
+
+
+def summarize(samples: List[float]) -> Dict:
+    ordered = sorted(samples)
+    return {
+        'samples': len(ordered),
+        'mean_ms': round(sum(ordered) / len(ordered), 4),
+        'min_ms': round(ordered[0], 4),
+        'p50_ms': round(percentile(ordered, 0.50), 4),
+        'p95_ms': round(percentile(ordered, 0.95), 4),
+        'p99_ms': round(percentile(ordered, 0.99), 4),
+        'max_ms': round(ordered[-1], 4),
+    }
+
+
+def measure(case: Case, repeat: int, warmup: int, budget: float) -> Dict:
+    """
+    Roda o caso `warmup` vezes sem medir e depois até `repeat` vezes
+    Para antes se passar de `budget` segundos (mínimo de 3 amostras)
+    """
+    for _ in range(warmup):
+        if case.setup:
+            case.setup()
+        case.fn()
+
+    samples = []
+    deadline = time.perf_counter() + budget
+    for _ in range(repeat):
+        if case.setup:
+            case.setup()
+        start = time.perf_counter_ns()
+        case.fn()
+        samples.append((time.perf_counter_ns() - start) / 1e6)
+        if len(samples) >= 3 and time.perf_counter() > deadline:
+            break
+    return summarize(samples)
+
+
+def _check(response, status: int = 200):
+    if response.status_code != status:
+        raise RuntimeError(f"{response.request.method} {response.request.url} "
+                           f"retornou {response.status_code}: {response.text[:200]}")
+    return response
+
+
+def read_cases(db: Database, agent: AgentIntelligence, indexed: AgentIntelligence,
+               ids: List[int], rng: random.Random) -> List[Case]:
+    """Leituras e priorização (não alteram o banco)"""
+    tasks = db.get_all_tasks()
+    return [
+        Case("db.get_all_tasks", db.get_all_tasks),
+        Case("db.get_task_table", db.get_task_table),
+        Case("db.get_task_by_id", lambda: db.get_task_by_id(rng.choice(ids))),
+        Case("db.get_tasks_by_status", lambda: db.get_tasks_by_status("doing")),
+        Case("db.get_status_summary", db.get_status_summary),
+        Case("db.search_tasks", lambda: db.search_tasks("estudar rel", limit=20)),
+        Case("agent.prioritize_tasks", lambda: agent.prioritize_tasks(tasks)),
+        Case("agent.prioritize_tasks_top10", lambda: agent.prioritize_tasks(tasks, limit=10)),
+        Case("agent.suggest_next_action", agent.suggest_next_action),
+        Case("agent.suggest_next_action_indexed", indexed.suggest_next_action),
+        Case("agent.detect_high_stress_mode", agent.detect_high_stress_mode),
+        Case("agent.get_dashboard_stats", agent.get_dashboard_stats),
+        Case("agent.get_timeline_data", agent.get_timeline_data),
+    ]
+
+
+def http_cases(client, ws, headers: Dict) -> List[Case]:
+    """Rotas da API; o cache de respostas é limpo antes de cada amostra (exceto no caso 304)"""
+    clear = ws.response_cache.clear
+    etag = _check(client.get("/tasks", headers=headers)).headers["etag"]
+    conditional = dict(headers, **{"If-None-Match": etag})
+    return [
+        Case("http.GET /tasks", lambda: _check(client.get("/tasks", headers=headers)), clear),
+        Case("http.GET /tasks (304)",
+             lambda: _check(client.get("/tasks", headers=conditional), 304)),
+        Case("http.POST /agent/priorizar",
+             lambda: _check(client.post("/agent/priorizar", headers=headers))),
+        Case("http.POST /agent/priorizar?limit=10",
+             lambda: _check(client.post("/agent/priorizar?limit=10", headers=headers))),
+        Case("http.GET /agent/next-action",
+             lambda: _check(client.get("/agent/next-action", headers=headers)), clear),
+        Case("http.GET /dashboard/stats",
+             lambda: _check(client.get("/dashboard/stats", headers=headers)), clear),
+        Case("http.GET /dashboard/timeline",
+             lambda: _check(client.get("/dashboard/timeline", headers=headers)), clear),
+    ]
+
+
+def write_cases(db: Database, ids: List[int], rng: random.Random,
+                client=None, headers: Optional[Dict] = None) -> List[Case]:
+    """Escritas; o caso de delete remove as tarefas criadas no caso de create"""
+    created: List[int] = []
+
+    def create():
+        created.append(db.create_task(generate_task(rng)).id)
+
+    def ensure_created():
+        if not created:
+            create()
+
+    cases = [
+        Case("db.create_task", create),
+        Case("db.update_task",
+             lambda: db.update_task(rng.choice(ids), TaskUpdate(status=rng.choice(STATUSES)))),
+        Case("db.delete_task", lambda: db.delete_task(created.pop()), ensure_created),
+    ]
+    if client is not None:
+        cases.append(Case("http.PATCH /tasks/{id}/status", lambda: _check(client.patch(
+            f"/tasks/{rng.choice(ids)}/status", params={"status": rng.choice(STATUSES)},
+            headers=headers))))
+    return cases
+
+
+def run_size(size: int, args, data_dir: str) -> Dict:
+    rng = random.Random(args.seed)
+    client = ws = headers = None
+
+    if args.http:
+        # Importado aqui: main lê WORKSPACES_DIR ao ser carregado
+        from fastapi.testclient import TestClient
+        import main
+        workspace_id = f"bench-{size}"
+        ws = main.workspaces.get(workspace_id)
+        db = ws.db
+        client = TestClient(main.app)
+        headers = {"X-Workspace-Id": workspace_id}
+    else:
+        db = Database(os.path.join(data_dir, f"bench-{size}.db"))
+
+    start = time.perf_counter()
+    ids = populate(db, size, seed=args.seed)
+    populate_s = time.perf_counter() - start
+
+    agent = AgentIntelligence(db)
+    indexed = AgentIntelligence(db, use_index=True)
+
+    cases = read_cases(db, agent, indexed, ids, rng)
+    if client is not None:
+        cases += http_cases(client, ws, headers)
+    cases += write_cases(db, ids, rng, client, headers)
+    if args.filter:
+        cases = [case for case in cases if any(f in case.name for f in args.filter)]
+
+    results = {}
+    for case in cases:
+        results[case.name] = measure(case, args.repeat, args.warmup, args.budget)
+        print(f"  {size:>8} {case.name:<40} p50={results[case.name]['p50_ms']:>10.3f}ms "
+              f"p99={results[case.name]['p99_ms']:>10.3f}ms", flush=True)
+
+    if client is None:
+        db.close()
+    return {'populate_s': round(populate_s, 3), 'cases': results}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def cmd_run(args) -> int:
+    data_dir = tempfile.mkdtemp(prefix="bench-")
+    if args.http:
+        os.environ["WORKSPACES_DIR"] = data_dir
+
+    report = {
+        'meta': {
+            'created_at': datetime.now().isoformat(),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'warmup': args.warmup,
+        },
+        'sizes': {}
+    }
+    try:
+        for size in args.sizes:
+            print(f"Tamanho {size}:", flush=True)
+            report['sizes'][str(size)] = run_size(size, args, data_dir)
+    finally:
+        if args.http:
+            import main
+            main.workspaces.close_all()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados salvos em {args.output}")
+    return 0
+
+
+def compare(baseline: Dict, current: Dict, threshold: float, min_delta_ms: float) -> List[Dict]:
+    """
+    Compara p50 e p99 de cada caso presente nos dois relatórios
+    Regressão: valor atual > base * (1 + threshold) e diferença maior que min_delta_ms
+    """
+    rows = []
+    for size, base_size in baseline['sizes'].items():
+        current_cases = current['sizes'].get(size, {}).get('cases', {})
+        for name, base in base_size['cases'].items():
+            if name not in current_cases:
+                continue
+            for metric in ('p50_ms', 'p99_ms'):
+                before = base[metric]
+                after = current_cases[name][metric]
+                ratio = after / before if before else math.inf
+                rows.append({
+                    'size': size,
+                    'case': name,
+                    'metric': metric,
+                    'baseline': before,
+                    'current': after,
+                    'ratio': ratio,
+                    'regression': ratio > 1 + threshold and after - before > min_delta_ms,
+                })
+    return rows
+
+
+def cmd_compare(args) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    rows = compare(baseline, current, args.threshold, args.min_delta_ms)
+    regressions = [row for row in rows if row['regression']]
+    for row in rows:
+        flag = "REGRESSÃO" if row['regression'] else ""
+        print(f"{row['size']:>8} {row['case']:<40} {row['metric']:<7} "
+              f"{row['baseline']:>10.3f} -> {row['current']:>10.3f}ms "
+              f"({row['ratio']:.2f}x) {flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regressão(ões) acima de {args.threshold:.0%}")
+        return 1
+    print(f"\nSem regressões acima de {args.threshold:.0%} ({len(rows)} métricas comparadas)")
+    return 0
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks do backend")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Executa os benchmarks e grava o JSON")
+    run.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000],
+                     help="Quantidades de tarefas (ex.: 1000 100000 1000000)")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--repeat", type=int, default=30, help="Amostras por caso")
+    run.add_argument("--warmup", type=int, default=2)
+    run.add_argument("--budget", type=float, default=10.0,
+                     help="Tempo máximo (s) de medição por caso")
+    run.add_argument("--no-http", dest="http", action="store_false",
+                     help="Não mede as rotas da API")
+    run.add_argument("--filter", nargs="*", help="Só casos cujo nome contém um dos termos")
+    run.add_argument("--output", default="bench.json")
+    run.set_defaults(func=cmd_run)
+
+    cmp = sub.add_parser("compare", help="Compara dois JSONs e falha em caso de regressão")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=0.2,
+                     help="Piora relativa tolerada (0.2 = 20%%)")
+    cmp.add_argument("--min-delta-ms", type=float, default=0.05,
+                     help="Ignora diferenças absolutas menores que isso (ruído)")
+    cmp.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,123 @@
+"""
+Importação e exportação em lote de tarefas (NDJSON e CSV)
+A leitura é feita em streaming: as linhas são validadas e gravadas em blocos
+"""
+
+import csv
+import io
+import json
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Tuple
+
+from pydantic import ValidationError
+
+from models import TaskCreate
+from database import TASK_COLUMNS
+
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Quebra o corpo da requisição em linhas conforme os bytes chegam"""
+    buffer = b""
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8")
+    if buffer:
+        yield buffer.decode("utf-8")
+
+
+async def iter_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, object]]:
+    """(número da linha, objeto) para cada linha não vazia do NDJSON"""
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, e
+
+
+async def iter_csv(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, object]]:
+    """
+    (número da linha, dict) para cada registro do CSV (primeira linha = cabeçalho)
+    Registros com campos entre aspas contendo quebra de linha são remontados
+    """
+    header = None
+    pending: List[str] = []
+    line_number = 0
+    start_line = 0
+    async for line in lines:
+        line_number += 1
+        if not pending:
+            start_line = line_number
+        pending.append(line.rstrip("\r"))
+        # Aspas ímpares: o registro continua na próxima linha
+        if sum(part.count('"') for part in pending) % 2:
+            continue
+        record, pending = "\n".join(pending), []
+        if not record.strip():
+            continue
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        yield start_line, dict(zip(header, values))
+    if pending:
+        yield start_line, ValueError("Registro CSV incompleto (aspas sem fechamento)")
+
+
+def validate_rows(rows: Iterable[Tuple[int, object]]) -> Tuple[List[TaskCreate], List[Dict]]:
+    """Valida um bloco de linhas, separando tarefas válidas e erros por linha"""
+    valid = []
+    errors = []
+    for line_number, data in rows:
+        if isinstance(data, Exception):
+            errors.append({'line': line_number, 'error': str(data)})
+            continue
+        if not isinstance(data, dict):
+            errors.append({'line': line_number, 'error': "Cada linha deve ser um objeto"})
+            continue
+        # Campos vazios do CSV contam como ausentes (usa o valor padrão)
+        data = {key: value for key, value in data.items() if value != ""}
+        try:
+            valid.append(TaskCreate(**data))
+        except ValidationError as e:
+            errors.append({'line': line_number, 'error': "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            )})
+    return valid, errors
+
+
+def export_ndjson(rows: Iterable[Dict], batch_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Gera o NDJSON em pedaços de batch_size linhas"""
+    batch = []
+    for row in rows:
+        batch.append(json.dumps(row, ensure_ascii=False))
+        if len(batch) >= batch_size:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+
+def export_csv(rows: Iterable[Dict], batch_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Gera o CSV (com cabeçalho) em pedaços de batch_size linhas"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=TASK_COLUMNS, lineterminator="\n")
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -1,231 +1,849 @@
+import re
 import sqlite3
-from typing import List, Optional
-from datetime import datetime
-from models import Task, TaskCreate, TaskUpdate
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from datetime import datetime, date, timedelta
+from models import Task, TaskCreate, TaskUpdate, TaskChanges, ArchivedTask
+from task_table import TASK_COLUMNS, TaskTable, task_from_row
+from migrations import ensure_schema
+from write_queue import WriteQueue, DEFAULT_WINDOW, DEFAULT_MAX_BATCH
+from preference_learning import FEATURE_NAMES
+import metrics
+
+
+# O deadline em dias é derivado de due_at na leitura (tarefas atrasadas ficam com 0)
+DEADLINE_SQL = ("MAX(0, CAST(julianday({prefix}due_at) - "
+                "julianday('now', 'localtime', 'start of day') AS INTEGER))")
+
+
+# Padrões aplicados já no SELECT: as linhas lidas podem ser serializadas sem passar pelo Task
+COLUMN_DEFAULTS = {'description': "''", 'status': "'backlog'", 'ignored_count': "0"}
+
+
+def task_columns_sql(alias: str = "") -> str:
+    prefix = f"{alias}." if alias else ""
+
+    def column_sql(column: str) -> str:
+        if column == 'deadline':
+            return f"{DEADLINE_SQL.format(prefix=prefix)} AS deadline"
+        if column in COLUMN_DEFAULTS:
+            return f"COALESCE({prefix}{column}, {COLUMN_DEFAULTS[column]}) AS {column}"
+        return prefix + column
+
+    return ", ".join(column_sql(column) for column in TASK_COLUMNS)
+
+
+TASK_SELECT = "SELECT " + task_columns_sql() + " FROM tasks"
+
+# Devolve a linha escrita no mesmo comando (INSERT/UPDATE ... RETURNING)
+TASK_RETURNING = " RETURNING " + task_columns_sql()
+
+# Colunas físicas de tasks, copiadas como estão entre tasks e tasks_archive
+TASK_STORED_COLUMNS = ", ".join(TASK_COLUMNS)
+
+ARCHIVE_SELECT = "SELECT " + task_columns_sql() + ", archived_at FROM tasks_archive"
+
+# Posição da primeira coluna extra (depois das de TASK_COLUMNS) numa linha de tarefa
+EXTRA_COLUMN = len(TASK_COLUMNS)
+
+# Idade (dias desde a conclusão) a partir da qual tarefas concluídas vão para o arquivo
+ARCHIVE_AFTER_DAYS = 30
+
+INSERT_TASK = """
+    INSERT INTO tasks (title, description, deadline, importance, duration, stress, fun, penalty_late, status, created_at, due_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+# Colunas de features do log de sugestões (tarefa do evento e tarefa de referência)
+EVENT_FEATURE_COLUMNS = tuple(f"f_{name}" for name in FEATURE_NAMES)
+EVENT_REF_COLUMNS = tuple(f"r_{name}" for name in FEATURE_NAMES)
+
+
+def status_condition(status: str, column: str = "status") -> str:
+    """Filtro por status com um parâmetro; status NULL (linhas antigas) conta como 'backlog'"""
+    if status == 'backlog':
+        return f"({column} = ? OR {column} IS NULL)"
+    return f"{column} = ?"
+
+
+def task_rows(conn, sql: str, params=()) -> List[tuple]:
+    """Linhas como tuplas simples (começando pelas colunas de TASK_COLUMNS), para task_from_row"""
+    cursor = conn.execute(sql, params)
+    cursor.row_factory = None
+    return cursor.fetchall()
+
+
+def fts_query(text: str) -> str:
+    """
+    Converte o texto digitado numa consulta FTS5: todos os termos precisam aparecer,
+    cada um como prefixo. Pontuação e operadores do FTS5 são descartados
+    """
+    return " ".join(f'"{term}"*' for term in re.findall(r"\w+", text))
+
+
+def resolve_due_at(deadline: Optional[int], due_at: Optional[date]) -> date:
+    """Data de entrega: due_at se informado, senão hoje + deadline dias"""
+    if due_at is not None:
+        return due_at
+    return date.today() + timedelta(days=deadline)
+
+
+class CountingConnection(sqlite3.Connection):
+    """
+    Conexão que conta os comandos executados pela aplicação (para o /metrics)
+    executemany conta como um comando; os comandos internos dos triggers não entram
+    """
+
+    def execute(self, *args, **kwargs):
+        metrics.record_statement()
+        return super().execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        metrics.record_statement()
+        return super().executemany(*args, **kwargs)
+
+
+class ConnectionPool:
+    """
+    Pool limitado de conexões SQLite persistentes
+    Cada conexão é aberta uma única vez com WAL e pragmas ajustados e depois reutilizada
+    """
+
+    def __init__(self, factory: Callable[[], sqlite3.Connection], max_size: int = 8,
+                 timeout: float = 30.0):
+        self._factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle: List[sqlite3.Connection] = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        # Métricas
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def acquire(self) -> sqlite3.Connection:
+        start = time.perf_counter()
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = None
+                    break
+                waited = True
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    raise TimeoutError("Tempo esgotado aguardando conexão do pool")
+
+            wait_time = time.perf_counter() - start
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+                self._wait_time_total += wait_time
+                self._wait_time_max = max(self._wait_time_max, wait_time)
+
+        if conn is None:
+            try:
+                conn = self._factory()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                conn.close()
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def discard(self, conn: sqlite3.Connection):
+        """Descarta uma conexão com problema em vez de devolvê-la ao pool"""
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        conn.close()
+
+    def close(self):
+        """Fecha as conexões ociosas; as que estão em uso fecham ao serem devolvidas"""
+        with self._cond:
+            self._closed = True
+            for conn in self._idle:
+                conn.close()
+            self._size -= len(self._idle)
+            self._idle.clear()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_time_total': round(self._wait_time_total, 6),
+                'wait_time_max': round(self._wait_time_max, 6),
+            }
 
 
 class Database:
-    def __init__(self, db_name: str = "tasks.db"):
+    def __init__(self, db_name: str = "tasks.db", pool_size: int = 8,
+                 write_window: float = DEFAULT_WINDOW, write_max_batch: int = DEFAULT_MAX_BATCH):
         self.db_name = db_name
-        self.init_db()
+        self._listeners: List[Callable] = []
+        self.pool = ConnectionPool(self.get_connection, max_size=pool_size)
+        # Mutações unitárias (criar, editar, remover, ignorar, pesos) passam pela fila de escrita
+        self.writes = WriteQueue(self.get_connection, window=write_window, max_batch=write_max_batch)
+        # Só verifica o schema na primeira vez que o arquivo é aberto no processo
+        ensure_schema(self.db_name, self.connection)
+
+    def subscribe(self, listener: Callable):
+        """Registra um callback chamado como listener(event, payload) após cada escrita"""
+        self._listeners.append(listener)
+
+    def _notify(self, event: str, payload):
+        for listener in self._listeners:
+            listener(event, payload)
 
     def get_connection(self):
-        return sqlite3.connect(self.db_name)
+        """Abre uma nova conexão já configurada (usada pelo pool)"""
+        conn = sqlite3.connect(self.db_name, timeout=30.0, check_same_thread=False,
+                               cached_statements=256, factory=CountingConnection)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA mmap_size = 268435456")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        metrics.record_connection_opened()
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """
+        Empresta uma conexão do pool
+        Faz commit ao sair normalmente e rollback se houver exceção
+        """
+        conn = self.pool.acquire()
+        metrics.record_checkout()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.release(conn)
+
+    def close(self):
+        """Aplica as escritas pendentes e fecha as conexões"""
+        self.writes.close()
+        self.pool.close()
+
+    def pool_stats(self) -> Dict:
+        """Métricas do pool de conexões"""
+        return self.pool.stats()
 
     def init_db(self):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Tabela de tarefas
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                description TEXT DEFAULT '',
-                deadline INTEGER NOT NULL,
-                importance REAL NOT NULL,
-                duration REAL NOT NULL,
-                stress REAL NOT NULL,
-                fun REAL NOT NULL,
-                penalty_late REAL NOT NULL,
-                status TEXT DEFAULT 'backlog',
-                ignored_count INTEGER DEFAULT 0,
-                completed_date TEXT,
-                created_at TEXT NOT NULL
-            )
-        """)
-        
-        # Tabela de pesos do usuário (aprendizado adaptativo)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS user_weights (
-                id INTEGER PRIMARY KEY,
-                urgency_weight REAL DEFAULT 3.0,
-                importance_weight REAL DEFAULT 2.5,
-                penalty_weight REAL DEFAULT 2.0,
-                stress_weight REAL DEFAULT 1.0,
-                fun_weight REAL DEFAULT 0.5,
-                effort_weight REAL DEFAULT 1.5,
-                updated_at TEXT
-            )
-        """)
+        """Aplica as migrações pendentes (ignorando o cache do processo)"""
+        ensure_schema(self.db_name, self.connection, force=True)
+
+    def _insert_values(self, task: TaskCreate, created_at: str) -> tuple:
+        due_at = resolve_due_at(task.deadline, task.due_at)
+        # A coluna deadline guarda os dias informados na escrita (o valor lido vem de due_at)
+        deadline = (due_at - date.today()).days
+        return (task.title, task.description, deadline, task.importance, task.duration, task.stress,
+                task.fun, task.penalty_late, task.status, created_at, due_at.isoformat())
+
+    def create_task(self, task: TaskCreate) -> Task:
+        return self.submit_create_task(task).result()
+
+    def submit_create_task(self, task: TaskCreate) -> "Future[Task]":
+        values = self._insert_values(task, datetime.now().isoformat())
         
-        # Inicializa pesos padrão se não existir
-        cursor.execute("SELECT COUNT(*) FROM user_weights")
-        if cursor.fetchone()[0] == 0:
-            cursor.execute("""
-                INSERT INTO user_weights (id, updated_at) 
-                VALUES (1, ?)
-            """, (datetime.now().isoformat(),))
+        def apply(conn) -> Task:
+            row = task_rows(conn, INSERT_TASK + TASK_RETURNING, values)[0]
+            metrics.record_rows(1)
+            return task_from_row(row)
         
-        conn.commit()
-        conn.close()
+        return self.writes.submit(apply, lambda created: self._notify('task_saved', created))
 
-    def create_task(self, task: TaskCreate) -> Task:
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def bulk_create_tasks(self, tasks: List[TaskCreate]) -> List[int]:
+        """
+        Insere várias tarefas com executemany numa única transação
+        Retorna os ids criados, na mesma ordem da entrada
+        """
+        if not tasks:
+            return []
         created_at = datetime.now().isoformat()
         
-        cursor.execute("""
-            INSERT INTO tasks (title, description, deadline, importance, duration, stress, fun, penalty_late, status, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (task.title, task.description, task.deadline, task.importance, task.duration, task.stress, 
-              task.fun, task.penalty_late, task.status, created_at))
-        
-        conn.commit()
-        task_id = cursor.lastrowid
-        conn.close()
+        with self.connection() as conn:
+            conn.executemany(INSERT_TASK, [self._insert_values(t, created_at) for t in tasks])
+            # A transação segura o lock de escrita, então os ids são consecutivos
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
         
-        return Task(
-            id=task_id, 
-            created_at=created_at,
-            ignored_count=0,
-            completed_date=None,
-            **task.model_dump()
-        )
+        ids = list(range(last_id - len(tasks) + 1, last_id + 1))
+        self._notify('tasks_bulk_saved', ids)
+        return ids
+
+    def iter_task_rows(self, batch_size: int = 1000) -> Iterator[Dict]:
+        """
+        Percorre todas as tarefas em lotes (fetchmany), sem montar a lista inteira
+        Cada item é um dict com as colunas de TASK_COLUMNS
+        """
+        with self.connection() as conn:
+            cursor = conn.execute(TASK_SELECT + " ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(TASK_COLUMNS, row))
 
     def get_all_tasks(self) -> List[Task]:
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM tasks ORDER BY created_at DESC")
-        rows = cursor.fetchall()
-        conn.close()
+        with self.connection() as conn:
+            rows = task_rows(conn, TASK_SELECT + " ORDER BY created_at DESC")
         
-        tasks = []
-        for row in rows:
-            tasks.append(Task(
-                id=row[0],
-                title=row[1],
-                description=row[2] if len(row) > 2 and row[2] else "",
-                deadline=row[3] if len(row) > 3 else row[2],
-                importance=row[4] if len(row) > 4 else row[3],
-                duration=row[5] if len(row) > 5 else row[4],
-                stress=row[6] if len(row) > 6 else row[5],
-                fun=row[7] if len(row) > 7 else row[6],
-                penalty_late=row[8] if len(row) > 8 else row[7],
-                status=row[9] if len(row) > 9 and row[9] else "backlog",
-                ignored_count=row[10] if len(row) > 10 and row[10] else 0,
-                completed_date=row[11] if len(row) > 11 else None,
-                created_at=row[12] if len(row) > 12 else row[11] if len(row) > 11 else ""
-            ))
-        return tasks
+        return self._rows_to_tasks(rows)
+
+    def get_task_rows(self, status: Optional[str] = None, active_only: bool = False,
+                      batch_size: int = 10000) -> List[tuple]:
+        """
+        Linhas brutas (tuplas na ordem de TASK_COLUMNS), lidas em lotes com fetchmany
+        Mesma ordem de get_all_tasks; filtra por status ou só as ativas no SQL
+        """
+        if status is not None:
+            where, params = " WHERE " + status_condition(status), (status,)
+        else:
+            # Status NULL (linhas antigas) conta como 'backlog': ativa
+            where, params = (" WHERE status IS NOT 'done'" if active_only else ""), ()
+        rows = []
+        with self.connection() as conn:
+            cursor = conn.execute(TASK_SELECT + where + " ORDER BY created_at DESC", params)
+            cursor.row_factory = None  # tuplas simples: mais leves que sqlite3.Row
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                rows.extend(batch)
+        return rows
+
+    def get_task_table(self, active_only: bool = False) -> TaskTable:
+        """Tarefas em colunas (TaskTable), sem montar um Task por linha"""
+        return TaskTable.from_rows(self.get_task_rows(active_only=active_only))
 
     def get_task_by_id(self, task_id: int) -> Optional[Task]:
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
-        row = cursor.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            return self._fetch_task(conn, task_id)
+
+    def _fetch_task(self, conn, task_id: int) -> Optional[Task]:
+        rows = task_rows(conn, TASK_SELECT + " WHERE id = ?", (task_id,))
         
-        if not row:
+        if not rows:
             return None
-            
-        return Task(
-            id=row[0],
-            title=row[1],
-            description=row[2] if len(row) > 2 and row[2] else "",
-            deadline=row[3] if len(row) > 3 else row[2],
-            importance=row[4] if len(row) > 4 else row[3],
-            duration=row[5] if len(row) > 5 else row[4],
-            stress=row[6] if len(row) > 6 else row[5],
-            fun=row[7] if len(row) > 7 else row[6],
-            penalty_late=row[8] if len(row) > 8 else row[7],
-            status=row[9] if len(row) > 9 and row[9] else "backlog",
-            ignored_count=row[10] if len(row) > 10 and row[10] else 0,
-            completed_date=row[11] if len(row) > 11 else None,
-            created_at=row[12] if len(row) > 12 else row[11] if len(row) > 11 else ""
-        )
+        metrics.record_rows(1)
+        return task_from_row(rows[0])
+
+    def _rows_to_tasks(self, rows) -> List[Task]:
+        metrics.record_rows(len(rows))
+        return [task_from_row(row) for row in rows]
 
     def update_task(self, task_id: int, task_update: TaskUpdate) -> Optional[Task]:
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Busca tarefa atual
-        current_task = self.get_task_by_id(task_id)
-        if not current_task:
-            conn.close()
-            return None
+        return self.submit_update_task(task_id, task_update).result()
+
+    def submit_update_task(self, task_id: int, task_update: TaskUpdate) -> "Future[Optional[Task]]":
+        def after(updated: Optional[Task]):
+            if updated:
+                self._notify('task_saved', updated)
         
-        # Prepara update
+        return self.writes.submit(lambda conn: self._apply_update(conn, task_id, task_update), after)
+
+    def _apply_update(self, conn, task_id: int, task_update: TaskUpdate) -> Optional[Task]:
+        """
+        Aplica um TaskUpdate com um único UPDATE ... RETURNING
+        completed_date é decidido no SQL (só ao passar de outro status para done)
+        """
         update_data = task_update.model_dump(exclude_unset=True)
         
-        # Se mudou para done, registra data
-        if update_data.get('status') == 'done' and current_task.status != 'done':
-            update_data['completed_date'] = datetime.now().isoformat()
+        # Prazo em dias ou data absoluta: grava sempre a data de entrega
+        if update_data.get('deadline') is not None or update_data.get('due_at') is not None:
+            due_at = resolve_due_at(update_data.get('deadline'), update_data.get('due_at'))
+            update_data['due_at'] = due_at.isoformat()
+            update_data['deadline'] = (due_at - date.today()).days
+        else:
+            update_data.pop('deadline', None)
+            update_data.pop('due_at', None)
         
         if not update_data:
-            conn.close()
-            return current_task
+            return self._fetch_task(conn, task_id)
         
-        # Monta query dinamicamente
-        set_clause = ", ".join([f"{key} = ?" for key in update_data.keys()])
-        values = list(update_data.values()) + [task_id]
+        assignments = [f"{key} = ?" for key in update_data.keys()]
+        values = list(update_data.values())
         
-        cursor.execute(f"UPDATE tasks SET {set_clause} WHERE id = ?", values)
-        conn.commit()
-        conn.close()
+        # Nas expressões do SET, `status` ainda é o valor antigo da linha
+        if 'status' in update_data:
+            assignments.append("completed_date = CASE WHEN ? = 'done' AND status IS NOT 'done' "
+                               "THEN ? ELSE completed_date END")
+            values += [update_data['status'], datetime.now().isoformat()]
         
-        return self.get_task_by_id(task_id)
+        rows = task_rows(
+            conn, f"UPDATE tasks SET {', '.join(assignments)} WHERE id = ?" + TASK_RETURNING,
+            values + [task_id]
+        )
+        if not rows:
+            return None
+        metrics.record_rows(1)
+        return task_from_row(rows[0])
+
+    def apply_task_batch(self, updates: List[Tuple[int, TaskUpdate]],
+                         deletes: List[int]) -> Tuple[List[Task], List[int]]:
+        """
+        Aplica atualizações e remoções numa única transação (tudo ou nada)
+        Levanta LookupError se alguma tarefa não existir; nada é gravado nesse caso
+        """
+        overlap = {task_id for task_id, _ in updates} & set(deletes)
+        if overlap:
+            raise ValueError(f"Tarefas atualizadas e removidas no mesmo lote: {sorted(overlap)}")
+        
+        updated: Dict[int, Task] = {}
+        missing = []
+        with self.connection() as conn:
+            for task_id, task_update in updates:
+                task = self._apply_update(conn, task_id, task_update)
+                if task is None:
+                    missing.append(task_id)
+                else:
+                    updated[task_id] = task
+            
+            deleted = []
+            for task_id in dict.fromkeys(deletes):
+                if conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,)).rowcount:
+                    deleted.append(task_id)
+                else:
+                    missing.append(task_id)
+            
+            # A exceção faz o context manager desfazer a transação inteira
+            if missing:
+                raise LookupError(f"Tarefas não encontradas: {sorted(set(missing))}")
+        
+        for task in updated.values():
+            self._notify('task_saved', task)
+        for task_id in deleted:
+            self._notify('task_deleted', task_id)
+        return list(updated.values()), deleted
 
     def delete_task(self, task_id: int) -> bool:
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
-        conn.commit()
-        deleted = cursor.rowcount > 0
-        conn.close()
-        return deleted
+        return self.submit_delete_task(task_id).result()
+
+    def submit_delete_task(self, task_id: int) -> "Future[bool]":
+        def after(deleted: bool):
+            if deleted:
+                self._notify('task_deleted', task_id)
+        
+        return self.writes.submit(
+            lambda conn: conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,)).rowcount > 0,
+            after
+        )
+
+    def increment_ignored_count(self, task_id: int) -> Optional[Task]:
+        """Incrementa contador quando usuário ignora sugestão e retorna a tarefa atualizada"""
+        return self.submit_increment_ignored_count(task_id).result()
+
+    def submit_increment_ignored_count(self, task_id: int) -> "Future[Optional[Task]]":
+        def after(task: Optional[Task]):
+            if task:
+                self._notify('task_saved', task)
+        
+        return self.writes.submit(lambda conn: self._increment_ignored(conn, task_id), after)
 
-    def increment_ignored_count(self, task_id: int):
-        """Incrementa contador quando usuário ignora sugestão"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
+    def _increment_ignored(self, conn, task_id: int) -> Optional[Task]:
+        rows = task_rows(conn, """
             UPDATE tasks SET ignored_count = ignored_count + 1 
             WHERE id = ?
-        """, (task_id,))
-        conn.commit()
-        conn.close()
+        """ + TASK_RETURNING, (task_id,))
+        if not rows:
+            return None
+        metrics.record_rows(1)
+        return task_from_row(rows[0])
+
+    def record_feedback(self, task_id: int, event: str,
+                        build: Callable[[Task, Dict], Tuple[Dict, Optional[Dict]]],
+                        increment_ignored: bool = False) -> Optional[Task]:
+        """
+        Registra um evento no log de sugestões numa única transação
+        build(tarefa, pesos atuais) -> (colunas do evento, novos pesos ou None)
+        Com increment_ignored=True também incrementa o contador de ignorados
+        Retorna a tarefa (None se não existir; nada é gravado nesse caso)
+        """
+        return self.submit_record_feedback(task_id, event, build, increment_ignored).result()
+
+    def submit_record_feedback(self, task_id: int, event: str,
+                               build: Callable[[Task, Dict], Tuple[Dict, Optional[Dict]]],
+                               increment_ignored: bool = False) -> "Future[Optional[Task]]":
+        written: Dict = {}
+        
+        def apply(conn) -> Optional[Task]:
+            # A transação da fila já segura o lock de escrita: leitura e gravação dos pesos são atômicas
+            if increment_ignored:
+                task = self._increment_ignored(conn, task_id)
+            else:
+                task = self._fetch_task(conn, task_id)
+            if task is None:
+                return None
+            
+            row, weights = build(task, self._read_weights(conn))
+            row = dict(row, task_id=task_id, event=event, created_at=datetime.now().isoformat())
+            conn.execute(
+                f"INSERT INTO suggestion_events ({', '.join(row)}) "
+                f"VALUES ({', '.join('?' for _ in row)})",
+                list(row.values())
+            )
+            if weights is not None:
+                self._write_weights(conn, weights)
+                written['weights'] = dict(weights)
+            return task
+        
+        def after(task: Optional[Task]):
+            if task is not None and increment_ignored:
+                self._notify('task_saved', task)
+            if 'weights' in written:
+                self._notify('weights_learned', written['weights'])
+        
+        return self.writes.submit(apply, after)
+
+    def iter_preference_pairs(self, batch_size: int = 10000) -> Iterator[Tuple[int, List[float], List[float]]]:
+        """(rótulo, features, features da referência) de cada evento com rótulo != 0"""
+        columns = ", ".join(("label",) + EVENT_FEATURE_COLUMNS + EVENT_REF_COLUMNS)
+        size = len(FEATURE_NAMES)
+        with self.connection() as conn:
+            cursor = conn.execute(
+                f"SELECT {columns} FROM suggestion_events WHERE label != 0 ORDER BY id"
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row[0], list(row[1:size + 1]), list(row[size + 1:])
+
+    def get_event_counts(self) -> Dict[str, int]:
+        """Quantidade de eventos no log por tipo"""
+        with self.connection() as conn:
+            rows = conn.execute(
+                "SELECT event, COUNT(*) FROM suggestion_events GROUP BY event"
+            ).fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def get_completion_samples(self, limit: int = 5000) -> Tuple[List[float], List[float]]:
+        """(durações estimadas, horas entre criação e conclusão) das últimas tarefas concluídas"""
+        with self.connection() as conn:
+            rows = conn.execute("""
+                SELECT duration, (julianday(completed_date) - julianday(created_at)) * 24
+                FROM (
+                    SELECT duration, completed_date, created_at FROM tasks
+                    WHERE status = 'done' AND completed_date IS NOT NULL
+                    UNION ALL
+                    SELECT duration, completed_date, created_at FROM tasks_archive
+                    WHERE completed_date IS NOT NULL
+                )
+                ORDER BY completed_date DESC
+                LIMIT ?
+            """, (limit,)).fetchall()
+        # Datas inválidas viram NULL no julianday (descartadas na estimativa)
+        return [row[0] for row in rows], [row[1] or 0.0 for row in rows]
 
     def get_user_weights(self):
         """Retorna pesos adaptativos do usuário"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM user_weights WHERE id = 1")
-        row = cursor.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            return self._read_weights(conn)
+
+    def _read_weights(self, conn) -> Dict:
+        row = conn.execute("SELECT * FROM user_weights WHERE id = 1").fetchone()
         
         return {
-            'urgency_weight': row[1],
-            'importance_weight': row[2],
-            'penalty_weight': row[3],
-            'stress_weight': row[4],
-            'fun_weight': row[5],
-            'effort_weight': row[6]
+            'urgency_weight': row['urgency_weight'],
+            'importance_weight': row['importance_weight'],
+            'penalty_weight': row['penalty_weight'],
+            'stress_weight': row['stress_weight'],
+            'fun_weight': row['fun_weight'],
+            'effort_weight': row['effort_weight']
         }
 
     def update_user_weights(self, weights: dict):
         """Atualiza pesos adaptativos"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
+        self.submit_update_user_weights(weights).result()
+
+    def submit_update_user_weights(self, weights: dict) -> "Future[None]":
+        weights = dict(weights)
+        return self.writes.submit(lambda conn: self._write_weights(conn, weights),
+                                  lambda _: self._notify('weights_changed', dict(weights)))
+
+    def _write_weights(self, conn, weights: Dict):
+        conn.execute("""
             UPDATE user_weights 
             SET urgency_weight = ?, importance_weight = ?, penalty_weight = ?,
-                stress_weight = ?, fun_weight = ?, effort_weight = ?, updated_at = ?
+                stress_weight = ?, fun_weight = ?, effort_weight = ?, updated_at = ?,
+                version = version + 1
             WHERE id = 1
         """, (weights['urgency_weight'], weights['importance_weight'], 
               weights['penalty_weight'], weights['stress_weight'],
               weights['fun_weight'], weights['effort_weight'],
               datetime.now().isoformat()))
-        conn.commit()
-        conn.close()
+
+    def get_data_versions(self) -> Tuple[int, int]:
+        """
+        (versão dos dados das tarefas, versão dos pesos)
+        Ambas só crescem; a das tarefas vem da sequência do log de mudanças
+        """
+        with self.connection() as conn:
+            row = conn.execute("""
+                SELECT (SELECT seq FROM sqlite_sequence WHERE name = 'task_changes'),
+                       (SELECT version FROM user_weights WHERE id = 1)
+            """).fetchone()
+        return (row[0] or 0, row[1] or 0)
+
+    def get_changes(self, since: int, limit: int = 1000) -> TaskChanges:
+        """
+        Mudanças depois da versão `since` (tarefas alteradas + ids removidos)
+        Se `since` for anterior ao horizonte de limpeza, retorna reset=True
+        e o cliente deve recarregar tudo a partir da versão 0
+        """
+        with self.connection() as conn:
+            pruned = conn.execute("SELECT pruned_version FROM sync_state WHERE id = 1").fetchone()[0]
+            if 0 < since < pruned:
+                return TaskChanges(version=0, changes=[], deleted=[], has_more=False, reset=True)
+            
+            columns = task_columns_sql("t")
+            rows = task_rows(conn, f"""
+                SELECT {columns}, c.version, c.task_id, c.op
+                FROM task_changes c LEFT JOIN tasks t ON t.id = c.task_id
+                WHERE c.version > ?
+                ORDER BY c.version
+                LIMIT ?
+            """, (since, limit + 1))
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        changes = []
+        deleted = []
+        # Depois das colunas da tarefa: versão, id da tarefa no log e operação
+        for row in rows:
+            if row[EXTRA_COLUMN + 2] == 'delete' or row[0] is None:
+                deleted.append(row[EXTRA_COLUMN + 1])
+            else:
+                changes.append(task_from_row(row))
+        metrics.record_rows(len(changes))
+        
+        return TaskChanges(
+            version=rows[-1][EXTRA_COLUMN] if rows else since,
+            changes=changes,
+            deleted=deleted,
+            has_more=has_more
+        )
+
+    def prune_tombstones(self, older_than_days: int = 30) -> int:
+        """Remove tombstones antigos do log e avança o horizonte de sincronização"""
+        cutoff = (datetime.now() - timedelta(days=older_than_days)).isoformat()
+        with self.connection() as conn:
+            row = conn.execute("""
+                SELECT MAX(version), COUNT(*) FROM task_changes
+                WHERE op = 'delete' AND changed_at < ?
+            """, (cutoff,)).fetchone()
+            if not row[1]:
+                return 0
+            conn.execute("DELETE FROM task_changes WHERE op = 'delete' AND version <= ?", (row[0],))
+            conn.execute("UPDATE sync_state SET pruned_version = MAX(pruned_version, ?) WHERE id = 1",
+                         (row[0],))
+        return row[1]
+
+    def archive_done_tasks(self, older_than_days: int = ARCHIVE_AFTER_DAYS) -> List[int]:
+        """
+        Move para tasks_archive as tarefas concluídas há mais de N dias (sem data de
+        conclusão, conta a criação) e retorna os ids movidos
+        Para a sincronização incremental elas saem como removidas; os contadores do
+        arquivo mantêm done_count e completion_rate
+        """
+        cutoff = (datetime.now() - timedelta(days=older_than_days)).isoformat()
+        where = "status = 'done' AND COALESCE(completed_date, created_at) < ?"
+        with self.connection() as conn:
+            conn.execute(f"""
+                INSERT INTO tasks_archive ({TASK_STORED_COLUMNS}, archived_at)
+                SELECT {TASK_STORED_COLUMNS}, ? FROM tasks WHERE {where}
+            """, (datetime.now().isoformat(), cutoff))
+            archived = [row[0] for row in conn.execute(
+                f"DELETE FROM tasks WHERE {where} RETURNING id", (cutoff,)
+            ).fetchall()]
+        
+        if archived:
+            self._notify('tasks_archived', archived)
+        return archived
+
+    def restore_archived_task(self, task_id: int) -> Optional[Task]:
+        """Devolve uma tarefa do arquivo ao conjunto ativo (continua concluída)"""
+        with self.connection() as conn:
+            restored = conn.execute(f"""
+                INSERT INTO tasks ({TASK_STORED_COLUMNS})
+                SELECT {TASK_STORED_COLUMNS} FROM tasks_archive WHERE id = ?
+            """, (task_id,)).rowcount
+            if not restored:
+                return None
+            conn.execute("DELETE FROM tasks_archive WHERE id = ?", (task_id,))
+            task = self._fetch_task(conn, task_id)
+        
+        self._notify('task_saved', task)
+        return task
+
+    def get_archived_tasks(self, limit: int = 50, offset: int = 0) -> Tuple[List[ArchivedTask], int]:
+        """Página do arquivo (concluídas mais recentes primeiro) e o total arquivado"""
+        with self.connection() as conn:
+            total = conn.execute("SELECT task_count FROM archive_counters WHERE id = 1").fetchone()[0]
+            rows = task_rows(
+                conn, ARCHIVE_SELECT + " ORDER BY completed_date DESC, id DESC LIMIT ? OFFSET ?",
+                (limit, offset)
+            )
+        
+        tasks = self._rows_to_tasks(rows)
+        return [ArchivedTask.model_construct(**dict(task), archived_at=row[EXTRA_COLUMN])
+                for task, row in zip(tasks, rows)], total
+
+    def get_archive_summary(self) -> Dict:
+        """Contadores do arquivo: quantidade e horas das tarefas arquivadas"""
+        with self.connection() as conn:
+            row = conn.execute(
+                "SELECT task_count, total_hours FROM archive_counters WHERE id = 1"
+            ).fetchone()
+        return {'count': row['task_count'], 'total_hours': row['total_hours']}
+
+    def get_tasks_by_status(self, status: str) -> List[Task]:
+        """Retorna tarefas de um status (usa o índice de status)"""
+        with self.connection() as conn:
+            rows = task_rows(conn, TASK_SELECT + " WHERE " + status_condition(status)
+                             + " ORDER BY created_at DESC", (status,))
+        return self._rows_to_tasks(rows)
+
+    def get_status_summary(self) -> Dict[str, Dict]:
+        """
+        Agregados por status calculados no SQL
+        Para cada status: quantidade, horas, urgentes, alto stress e soma do stress
+        """
+        with self.connection() as conn:
+            rows = conn.execute("""
+                SELECT COALESCE(status, 'backlog') AS status,
+                       COUNT(*) AS count,
+                       COALESCE(SUM(duration), 0) AS total_hours,
+                       SUM(CASE WHEN due_at <= date('now', 'localtime', '+2 days') THEN 1 ELSE 0 END) AS urgent_count,
+                       SUM(CASE WHEN stress >= 0.6 THEN 1 ELSE 0 END) AS high_stress_count,
+                       COALESCE(SUM(stress), 0) AS stress_sum
+                FROM tasks
+                GROUP BY COALESCE(status, 'backlog')
+            """).fetchall()
+        
+        return {
+            row['status']: {
+                'count': row['count'],
+                'total_hours': row['total_hours'],
+                'urgent_count': row['urgent_count'],
+                'high_stress_count': row['high_stress_count'],
+                'stress_sum': row['stress_sum']
+            }
+            for row in rows
+        }
 
     def get_tasks_by_date(self, target_date: str) -> List[Task]:
-        """Retorna tarefas cujo deadline cai em uma data específica"""
-        # Calcula quantos dias faltam para a data alvo
-        from datetime import datetime, timedelta
-        target = datetime.fromisoformat(target_date)
-        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        days_until = (target - today).days
-        
-        tasks = self.get_all_tasks()
-        return [t for t in tasks if t.deadline == days_until and t.status != 'done']
+        """Retorna tarefas cuja data de entrega cai em uma data específica"""
+        target = date.fromisoformat(target_date[:10])
+        
+        with self.connection() as conn:
+            rows = task_rows(
+                conn, TASK_SELECT + " WHERE due_at = ? AND status IS NOT 'done' ORDER BY created_at DESC",
+                (target.isoformat(),)
+            )
+        return self._rows_to_tasks(rows)
+
+    def get_tasks_due_between(self, start: Optional[date], end: Optional[date],
+                              include_done: bool = False) -> List[Task]:
+        """Tarefas com entrega no intervalo [start, end] (limites opcionais), pelo índice de due_at"""
+        conditions = []
+        params = []
+        if start is not None:
+            conditions.append("due_at >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            conditions.append("due_at <= ?")
+            params.append(end.isoformat())
+        if not include_done:
+            conditions.append("status IS NOT 'done'")
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        
+        with self.connection() as conn:
+            rows = task_rows(conn, TASK_SELECT + where + " ORDER BY due_at, created_at DESC", params)
+        return self._rows_to_tasks(rows)
+
+    def search_tasks(self, text: str, statuses: Optional[List[str]] = None, limit: int = 20,
+                     offset: int = 0) -> Tuple[List[Tuple[Task, float, str]], int]:
+        """
+        Busca textual (FTS5) em título e descrição, ordenada por BM25
+        Retorna ([(tarefa, score BM25, trecho destacado)], total de resultados)
+        Score BM25 menor = mais relevante
+        """
+        query = fts_query(text)
+        if not query:
+            return [], 0
+        
+        where = "tasks_fts MATCH ?"
+        params: List = [query]
+        if statuses:
+            # Mesmo filtro das outras consultas por status (NULL conta como 'backlog')
+            conditions = [status_condition(status, "t.status") for status in statuses]
+            where += " AND (" + " OR ".join(conditions) + ")"
+            params += statuses
+        # CROSS JOIN fixa o FTS como laço externo (senão o planner pode varrer o índice de status)
+        source = "FROM tasks_fts CROSS JOIN tasks t ON t.id = tasks_fts.rowid WHERE " + where
+        
+        with self.connection() as conn:
+            total = conn.execute("SELECT COUNT(*) " + source, params).fetchone()[0]
+            rows = task_rows(conn, f"""
+                SELECT {task_columns_sql('t')}, tasks_fts.rank AS score,
+                       snippet(tasks_fts, -1, '[', ']', '…', 12) AS snippet
+                {source}
+                ORDER BY tasks_fts.rank
+                LIMIT ? OFFSET ?
+            """, params + [limit, offset])
+        
+        tasks = self._rows_to_tasks(rows)
+        return [(task, row[EXTRA_COLUMN], row[EXTRA_COLUMN + 1])
+                for task, row in zip(tasks, rows)], total
+
+    def get_timeline_rollup(self, until: date) -> List[Dict]:
+        """Agregados por dia (tarefas ativas e horas) até a data informada"""
+        with self.connection() as conn:
+            rows = conn.execute("""
+                SELECT day, task_count, total_hours FROM timeline_rollup
+                WHERE day <= ? AND task_count > 0
+                ORDER BY day
+            """, (until.isoformat(),)).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_timeline_tasks(self, until: date) -> List[Dict]:
+        """Resumo (id, título, duração, importância) das tarefas ativas com entrega até a data"""
+        with self.connection() as conn:
+            rows = conn.execute("""
+                SELECT due_at, id, title, duration, importance FROM tasks
+                WHERE due_at <= ? AND status IS NOT 'done'
+                ORDER BY created_at DESC
+            """, (until.isoformat(),)).fetchall()
+        return [dict(row) for row in rows]
@@ -0,0 +1,100 @@
+"""
+Cache HTTP (ETag / GET condicional)
+As ETags vêm da versão dos dados das tarefas (+ versão dos pesos nas rotas que dependem deles).
+Se o cliente já tem a versão atual, responde 304 sem consultar tarefas nem pontuar.
+Cada representação (JSON/colunar, com ou sem gzip) tem sua ETag e sua entrada no cache.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Awaitable, Callable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from serialization import negotiate, representation, encode, compress, build_response, VARY
+
+
+class ResponseCache:
+    """Corpos JSON já serializados, por rota, válidos enquanto a ETag não mudar"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, etag: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, etag: str, body: bytes):
+        with self._lock:
+            self._entries[key] = (etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def make_etag(workspace_id: str, key: str, versions: Tuple[int, int],
+              time_bucket: Optional[str] = None, variant: Optional[str] = None,
+              weighted: bool = False) -> str:
+    tasks_version, weights_version = versions
+    # Os deadlines em dias dependem da data de hoje
+    etag = f"{workspace_id}:{key}:t{tasks_version}:{date.today():%Y%m%d}"
+    if weighted:
+        # Cada passo de aprendizado muda os pesos: só entra nas rotas que usam a utilidade
+        etag += f":w{weights_version}"
+    if time_bucket:
+        etag += f":{time_bucket}"
+    if variant:
+        etag += f":{variant}"
+    return f'"{etag}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+async def cached_json(request: Request, ws, key: str, compute: Callable[[], Awaitable],
+                      time_bucket: Optional[str] = None, columnar: bool = False,
+                      weighted: bool = False) -> Response:
+    """
+    Responde JSON com ETag
+    - If-None-Match igual à versão atual → 304 (só lê os contadores de versão)
+    - Mesma versão já calculada no servidor → corpo do cache
+    - Senão, chama compute() e guarda o resultado
+    time_bucket entra na ETag de respostas que dependem do horário (ex.: minuto atual)
+    columnar=True para rotas cujo compute() devolve um RowSet
+    weighted=True para rotas cuja resposta depende dos pesos do usuário
+    """
+    media_type, use_gzip = negotiate(request, columnar)
+    variant = representation(media_type, use_gzip)
+    versions = await ws.adb.get_data_versions()
+    etag = make_etag(ws.id, key, versions, time_bucket, variant if variant != "json" else None,
+                     weighted)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=dict(headers, Vary=VARY))
+
+    cache_key = f"{key}:{variant}"
+    body = ws.response_cache.get(cache_key, etag)
+    if body is None:
+        content = await compute()
+        body, _ = compress(encode(content, media_type), use_gzip)
+        ws.response_cache.put(cache_key, etag, body)
+
+    # Corpos gzip começam com 1f 8b (JSON nunca começa assim)
+    return build_response(body, media_type, body[:2] == b"\x1f\x8b", headers)
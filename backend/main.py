@@ -1,12 +1,25 @@
-from fastapi import FastAPI, HTTPException
+import os
+from datetime import datetime, date
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from typing import AsyncIterator, List, Optional
 
 from models import (Task, TaskCreate, TaskUpdate, TaskWithUtility, 
-                    NextActionSuggestion, DashboardStats, UserWeights)
-from database import Database
-from agent import prioritize_tasks
-from agent_intelligence import AgentIntelligence
+                    NextActionSuggestion, DashboardStats, UserWeights, TaskChanges,
+                    TaskBatch, TaskBatchResult, WeightSweepRequest, PlanRequest,
+                    TaskSearchHit, TaskSearchResult, ArchivedTaskPage)
+from async_database import DB_EXECUTOR, run_in, run_cpu
+from bulk_io import (CHUNK_SIZE, MAX_REPORTED_ERRORS, iter_lines, iter_ndjson, iter_csv,
+                     validate_rows, export_ndjson, export_csv)
+from workspaces import Workspace, WorkspaceManager, DEFAULT_WORKSPACE
+from http_cache import cached_json
+from serialization import FastJSONResponse, RowSet, respond
+from task_table import TASK_COLUMNS
+from agent_intelligence import PRIORITIZED_FIELDS
+from database import ARCHIVE_AFTER_DAYS
+from risk import DEFAULT_HOURS_PER_DAY, DEFAULT_SIMULATIONS, MAX_SIMULATIONS
+import metrics
 
 app = FastAPI(title="Scrum Master AI - Task Manager Inteligente")
 
@@ -17,11 +30,59 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Server-Timing"],
 )
 
-# Inicializa o banco de dados e agente
-db = Database()
-agent = AgentIntelligence(db)
+# Latência por rota, SQL/conexões/linhas por requisição (SERVER_TIMING=1 liga o header)
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Máximo de itens (atualizações + remoções) por PATCH /tasks/batch
+MAX_BATCH_SIZE = 5000
+
+# Busca: tamanho máximo da página e quantos resultados do BM25 são reordenados por utilidade
+MAX_SEARCH_LIMIT = 200
+MAX_RERANK_CANDIDATES = 500
+
+# Arquivo: tamanho máximo da página
+MAX_ARCHIVE_LIMIT = 200
+
+# Workspaces abertos (um banco + agente por tenant, em LRU)
+workspaces = WorkspaceManager(
+    data_dir=os.environ.get("WORKSPACES_DIR", "workspaces"),
+    capacity=int(os.environ.get("WORKSPACE_CACHE_SIZE", "64")),
+    # Concluídas há mais de N dias são arquivadas ao abrir e a cada virada do dia (0 desativa)
+    archive_after_days=int(os.environ.get("ARCHIVE_AFTER_DAYS", str(ARCHIVE_AFTER_DAYS))),
+    # Com RANKING_MAX_STALENESS (segundos) o ranking é mantido em segundo plano
+    ranking_staleness=(float(os.environ["RANKING_MAX_STALENESS"])
+                       if os.environ.get("RANKING_MAX_STALENESS") else None),
+    # Janela de agrupamento da fila de escrita, em milissegundos (0 = sem espera)
+    write_window=float(os.environ.get("WRITE_BATCH_WINDOW_MS", "0")) / 1000
+)
+
+
+async def get_workspace(x_workspace_id: str = Header(DEFAULT_WORKSPACE)) -> AsyncIterator[Workspace]:
+    """
+    Seleciona o workspace pelo header X-Workspace-Id (padrão: 'default')
+    Fica reservado até o fim da requisição: o LRU não o fecha enquanto ela o usa
+    """
+    workspace = workspaces.get_cached(x_workspace_id, reserve=True)
+    if workspace is None:
+        try:
+            # Abrir/migrar o banco é bloqueante: roda no executor de banco
+            workspace = await run_in(DB_EXECUTOR, workspaces.get, x_workspace_id, reserve=True)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    try:
+        yield workspace
+    finally:
+        if workspaces.release(workspace):
+            # Última requisição de um workspace já despejado do LRU
+            await run_in(DB_EXECUTOR, workspace.close)
+
+
+@app.on_event("shutdown")
+def close_workspaces():
+    workspaces.close_all()
 
 
 @app.get("/")
@@ -39,42 +100,251 @@ def read_root():
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """📈 Métricas no formato texto do Prometheus."""
+    gauges = []
+    for ws in workspaces.open_workspaces():
+        pool = ws.db.pool_stats()
+        labels = {'workspace': ws.id}
+        gauges += [
+            ("db_pool_connections", "Conexões abertas no pool", labels, pool['size']),
+            ("db_pool_in_use", "Conexões emprestadas no momento", labels, pool['in_use']),
+            ("db_pool_checkouts", "Empréstimos de conexão desde a abertura", labels, pool['checkouts']),
+            ("db_pool_waits", "Empréstimos que precisaram esperar", labels, pool['waits']),
+            ("db_pool_wait_seconds", "Tempo total esperando conexão", labels, pool['wait_time_total']),
+        ]
+        writes = ws.db.writes.stats()
+        gauges += [
+            ("db_write_queue_pending", "Escritas aguardando a thread escritora", labels, writes['depth']),
+            ("db_write_commits", "Commits em grupo desde a abertura", labels, writes['commits']),
+            ("db_write_mutations", "Mutações gravadas pela fila", labels, writes['writes']),
+            ("db_write_failures", "Mutações da fila que falharam", labels, writes['failed']),
+        ]
+        if ws.ranking is not None:
+            ranking = ws.ranking.stats()
+            gauges += [
+                ("ranking_snapshot_recomputes", "Recálculos do ranking em segundo plano",
+                 labels, ranking['recomputes']),
+                ("ranking_snapshot_errors", "Recálculos do ranking que falharam", labels, ranking['errors']),
+            ]
+            if ranking['age'] is not None:
+                gauges.append(("ranking_snapshot_age_seconds", "Idade do ranking pré-calculado",
+                               labels, ranking['age']))
+    cache = workspaces.stats()
+    gauges.append(("workspaces_open", "Workspaces abertos", {}, cache['open']))
+    gauges.append(("workspaces_evictions", "Workspaces fechados pelo LRU", {}, cache['evictions']))
+    return PlainTextResponse(metrics.render(gauges), media_type="text/plain; version=0.0.4")
+
+
 # ==================== CRUD de Tarefas ====================
 
 @app.post("/tasks", response_model=Task)
-def create_task(task: TaskCreate):
+async def create_task(task: TaskCreate, ws: Workspace = Depends(get_workspace)):
     """Cria uma nova tarefa."""
-    return db.create_task(task)
+    return await ws.adb.submit_create_task(task)
 
 
 @app.get("/tasks", response_model=List[Task])
-def get_tasks():
-    """Retorna todas as tarefas."""
-    return db.get_all_tasks()
+async def get_tasks(request: Request, ws: Workspace = Depends(get_workspace)):
+    """Retorna todas as tarefas (com ETag; JSON ou colunar, com gzip)."""
+    async def compute():
+        return RowSet(TASK_COLUMNS, await ws.adb.get_task_rows())
+    
+    return await cached_json(request, ws, "tasks", compute, columnar=True)
+
+
+@app.post("/tasks/bulk")
+async def bulk_create_tasks(request: Request, ws: Workspace = Depends(get_workspace)):
+    """
+    📥 Importação em lote (NDJSON ou CSV, conforme o Content-Type)
+    As linhas são validadas e gravadas em blocos, cada bloco numa transação
+    """
+    content_type = request.headers.get("content-type", "")
+    lines = iter_lines(request.stream())
+    records = iter_csv(lines) if "csv" in content_type else iter_ndjson(lines)
+    
+    created = 0
+    failed = 0
+    errors = []
+    
+    async def flush(chunk):
+        nonlocal created, failed
+        valid, chunk_errors = validate_rows(chunk)
+        if valid:
+            created += len(await ws.adb.bulk_create_tasks(valid))
+        failed += len(chunk_errors)
+        errors.extend(chunk_errors[:MAX_REPORTED_ERRORS - len(errors)])
+    
+    chunk = []
+    async for record in records:
+        chunk.append(record)
+        if len(chunk) >= CHUNK_SIZE:
+            await flush(chunk)
+            chunk = []
+    if chunk:
+        await flush(chunk)
+    
+    return {
+        "created": created,
+        "failed": failed,
+        "errors": errors,
+        "errors_truncated": failed > len(errors)
+    }
+
+
+@app.get("/tasks/export")
+def export_tasks(format: str = "ndjson", ws: Workspace = Depends(get_workspace)):
+    """📤 Exporta todas as tarefas em streaming (ndjson ou csv)"""
+    if format not in ["ndjson", "csv"]:
+        raise HTTPException(status_code=400, detail="Invalid format")
+    
+    rows = ws.db.iter_task_rows()
+    if format == "csv":
+        return StreamingResponse(export_csv(rows), media_type="text/csv",
+                                 headers={"Content-Disposition": "attachment; filename=tasks.csv"})
+    return StreamingResponse(export_ndjson(rows), media_type="application/x-ndjson")
+
+
+@app.get("/tasks/changes", response_model=TaskChanges, response_class=FastJSONResponse)
+def get_task_changes(since: int = 0, limit: int = 1000, ws: Workspace = Depends(get_workspace)):
+    """
+    🔄 Sincronização incremental
+    Retorna só o que mudou depois da versão `since` (use a `version` da resposta anterior)
+    """
+    if limit < 1 or limit > 10000:
+        raise HTTPException(status_code=400, detail="Invalid limit")
+    return ws.db.get_changes(since, limit)
+
+
+@app.get("/tasks/due", response_model=List[Task], response_class=FastJSONResponse)
+async def get_tasks_due(start: Optional[date] = None, end: Optional[date] = None,
+                        include_done: bool = False, ws: Workspace = Depends(get_workspace)):
+    """📆 Tarefas com data de entrega no intervalo [start, end] (YYYY-MM-DD)."""
+    return await ws.adb.get_tasks_due_between(start, end, include_done)
+
+
+@app.get("/tasks/search", response_model=TaskSearchResult,
+         response_class=FastJSONResponse)
+async def search_tasks(q: str, status: Optional[List[str]] = Query(None), limit: int = 20,
+                       offset: int = 0, rerank: bool = False, ws: Workspace = Depends(get_workspace)):
+    """
+    🔎 Busca em título e descrição (FTS5): todos os termos, por prefixo, ordenados por BM25
+    `status` pode ser repetido (?status=backlog&status=doing)
+    Com rerank=true os melhores resultados do BM25 são reordenados pela utilidade atual
+    """
+    if limit < 1 or limit > MAX_SEARCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"Invalid limit (1-{MAX_SEARCH_LIMIT})")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid offset")
+    if status and any(s not in ["backlog", "doing", "done"] for s in status):
+        raise HTTPException(status_code=400, detail="Invalid status")
+    
+    if not rerank:
+        hits, total = await ws.adb.search_tasks(q, status, limit, offset)
+        return TaskSearchResult(total=total, hits=[
+            TaskSearchHit.model_construct(**dict(task), score=score, snippet=snippet)
+            for task, score, snippet in hits
+        ])
+    
+    # A página sai dos MAX_RERANK_CANDIDATES mais relevantes, reordenados pela utilidade
+    hits, total = await ws.adb.search_tasks(q, status, MAX_RERANK_CANDIDATES, 0)
+    if not hits:
+        return TaskSearchResult(total=total, hits=[])
+    weights = await ws.adb.get_user_weights()
+    high_stress = await run_in(DB_EXECUTOR, ws.agent.detect_high_stress_mode)
+    utilities = (await run_cpu(ws.agent.score_tasks, [task for task, _, _ in hits],
+                               weights, high_stress)).tolist()
+    order = sorted(range(len(hits)), key=lambda i: -utilities[i])
+    return TaskSearchResult(total=total, hits=[
+        TaskSearchHit.model_construct(**dict(hits[i][0]), score=hits[i][1], snippet=hits[i][2],
+                                      utility=utilities[i])
+        for i in order[offset:offset + limit]
+    ])
+
+
+@app.get("/tasks/archive", response_model=ArchivedTaskPage, response_class=FastJSONResponse)
+async def get_archived_tasks(limit: int = 50, offset: int = 0,
+                             ws: Workspace = Depends(get_workspace)):
+    """🗄️ Tarefas arquivadas, concluídas mais recentes primeiro (paginado)."""
+    if limit < 1 or limit > MAX_ARCHIVE_LIMIT:
+        raise HTTPException(status_code=400, detail=f"Invalid limit (1-{MAX_ARCHIVE_LIMIT})")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid offset")
+    
+    tasks, total = await ws.adb.get_archived_tasks(limit, offset)
+    return ArchivedTaskPage(total=total, tasks=tasks)
+
+
+@app.post("/tasks/archive")
+async def archive_done_tasks(older_than_days: int = ARCHIVE_AFTER_DAYS,
+                             ws: Workspace = Depends(get_workspace)):
+    """
+    🗄️ Move as tarefas concluídas há mais de `older_than_days` dias para o arquivo
+    Elas saem das listas e da sincronização, mas seguem em done_count e completion_rate
+    """
+    if older_than_days < 0:
+        raise HTTPException(status_code=400, detail="Invalid older_than_days")
+    archived = await ws.adb.archive_done_tasks(older_than_days)
+    return {"archived": len(archived)}
+
+
+@app.post("/tasks/archive/{task_id}/restore", response_model=Task)
+async def restore_archived_task(task_id: int, ws: Workspace = Depends(get_workspace)):
+    """
+    Devolve uma tarefa arquivada ao quadro (na coluna Done)
+    Se continuar concluída, volta ao arquivo na próxima passada
+    """
+    task = await ws.adb.restore_archived_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Archived task not found")
+    return task
+
+
+@app.patch("/tasks/batch", response_model=TaskBatchResult)
+def batch_update_tasks(batch: TaskBatch, ws: Workspace = Depends(get_workspace)):
+    """
+    🗂️ Várias movimentações/edições e remoções numa única transação
+    Se alguma tarefa não existir, nada é aplicado (404)
+    """
+    if len(batch.updates) + len(batch.deletes) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch too large (max {MAX_BATCH_SIZE})")
+    if any(item.status not in [None, "backlog", "doing", "done"] for item in batch.updates):
+        raise HTTPException(status_code=400, detail="Invalid status")
+    
+    updates = [(item.id, TaskUpdate(**item.model_dump(exclude_unset=True, exclude={'id'})))
+               for item in batch.updates]
+    try:
+        updated, deleted = ws.db.apply_task_batch(updates, batch.deletes)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return TaskBatchResult(updated=updated, deleted=deleted)
 
 
 @app.get("/tasks/{task_id}", response_model=Task)
-def get_task(task_id: int):
+def get_task(task_id: int, ws: Workspace = Depends(get_workspace)):
     """Retorna uma tarefa específica."""
-    task = db.get_task_by_id(task_id)
+    task = ws.db.get_task_by_id(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     return task
 
 
 @app.patch("/tasks/{task_id}", response_model=Task)
-def update_task(task_id: int, task_update: TaskUpdate):
+async def update_task(task_id: int, task_update: TaskUpdate, ws: Workspace = Depends(get_workspace)):
     """Atualiza uma tarefa (parcialmente)."""
-    task = db.update_task(task_id, task_update)
+    task = await ws.adb.submit_update_task(task_id, task_update)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     return task
 
 
 @app.delete("/tasks/{task_id}")
-def delete_task(task_id: int):
+async def delete_task(task_id: int, ws: Workspace = Depends(get_workspace)):
     """Remove uma tarefa pelo ID."""
-    deleted = db.delete_task(task_id)
+    deleted = await ws.adb.submit_delete_task(task_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Task not found")
     return {"message": "Task deleted successfully"}
@@ -83,131 +353,247 @@ def delete_task(task_id: int):
 # ==================== Kanban ====================
 
 @app.patch("/tasks/{task_id}/status")
-def update_task_status(task_id: int, status: str):
+def update_task_status(task_id: int, status: str, ws: Workspace = Depends(get_workspace)):
     """Atualiza o status da tarefa (para drag-and-drop Kanban)."""
     if status not in ["backlog", "doing", "done"]:
         raise HTTPException(status_code=400, detail="Invalid status")
     
     task_update = TaskUpdate(status=status)
-    task = db.update_task(task_id, task_update)
+    task = ws.db.update_task(task_id, task_update)
     
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
+    # Mover para doing/done é um sinal de preferência para o agente
+    if status in ["doing", "done"]:
+        ws.agent.record_feedback("accepted" if status == "doing" else "completed", task_id)
+    
     return {"message": f"Task moved to {status}", "task": task}
 
 
 @app.get("/tasks/by-status/{status}", response_model=List[Task])
-def get_tasks_by_status(status: str):
+async def get_tasks_by_status(status: str, request: Request,
+                              ws: Workspace = Depends(get_workspace)):
     """Retorna tarefas filtradas por status."""
     if status not in ["backlog", "doing", "done"]:
         raise HTTPException(status_code=400, detail="Invalid status")
     
-    all_tasks = db.get_all_tasks()
-    return [t for t in all_tasks if t.status == status]
+    return respond(request, RowSet(TASK_COLUMNS, await ws.adb.get_task_rows(status=status)))
 
 
 # ==================== Inteligência do Agente ====================
 
 @app.post("/agent/priorizar", response_model=List[TaskWithUtility])
-def priorize_tasks():
+async def priorize_tasks(request: Request, limit: Optional[int] = None, risk_weight: float = 0.0,
+                         fresh: bool = False, ws: Workspace = Depends(get_workspace)):
     """
     🧠 Priorização inteligente com:
     - Reavaliação automática
     - Detecção de modo alto estresse
     - Pesos adaptativos
+    Use `limit` para receber apenas as N primeiras tarefas
+    Com `risk_weight` a probabilidade de atraso (Monte Carlo) entra na utilidade
+    Com o ranking em segundo plano ativo, responde do snapshot (header X-Ranking-Age)
+    enquanto ele estiver dentro da defasagem máxima; `fresh=true` calcula na hora
     """
-    tasks = db.get_all_tasks()
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="Invalid limit")
+    if risk_weight < 0:
+        raise HTTPException(status_code=400, detail="Invalid risk_weight")
+    if ws.ranking is not None and not fresh and not risk_weight:
+        snapshot = ws.ranking.get()
+        if snapshot is not None:
+            return snapshot.response(request, limit)
+    # Leituras do banco no executor de banco; o de CPU só pontua
+    if limit is not None and not risk_weight:
+        await run_in(DB_EXECUTOR, ws.agent.load_index)
+        top = await run_cpu(ws.agent.top_tasks, limit)
+        return respond(request, RowSet.from_models(top, PRIORITIZED_FIELDS))
     
-    if not tasks:
-        return []
-    
-    prioritized = prioritize_tasks(tasks, db)
-    return prioritized
+    # Colunas + linhas brutas; a resposta sai direto das tuplas, sem modelos pydantic
+    tasks = await ws.adb.get_task_table(active_only=True)
+    weights = await ws.adb.get_user_weights()
+    samples = await ws.adb.get_completion_samples() if risk_weight else None
+    rows = await run_cpu(ws.agent.prioritize_rows, tasks, weights, limit=limit,
+                         risk_weight=risk_weight, completion_samples=samples)
+    return respond(request, RowSet(PRIORITIZED_FIELDS, rows))
+
+
+@app.post("/agent/sweep")
+async def sweep_weights(request: WeightSweepRequest, ws: Workspace = Depends(get_workspace)):
+    """
+    🎛️ Sensibilidade do ranking a diferentes pesos
+    Pontua todas as tarefas ativas contra N vetores de pesos (lista, grade ou amostras
+    aleatórias em torno dos pesos atuais) e mede estabilidade do ranking, sobreposição
+    do top-k e quantas vezes cada tarefa fica em 1º
+    """
+    weights = await ws.adb.get_user_weights()
+    active = await ws.adb.get_task_table(active_only=True)
+    try:
+        return await run_cpu(
+            ws.agent.sweep_weights, request.mode, [w.model_dump() for w in request.weights],
+            request.samples, request.steps, request.spread, request.seed, request.top_k,
+            current_weights=weights, active=active
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/agent/plan")
+async def plan_schedule(request: PlanRequest, ws: Workspace = Depends(get_workspace)):
+    """
+    📋 Plano dia a dia com capacidade limitada
+    Verifica quais prazos cabem nas horas disponíveis (EDF), reserva o mínimo necessário
+    para cumpri-los e preenche o restante de cada dia pela utilidade
+    """
+    if request.days < 1 or request.days > 365:
+        raise HTTPException(status_code=400, detail="Invalid days (1-365)")
+    if request.hours_per_day < 0 or any(hours < 0 for hours in request.capacity.values()):
+        raise HTTPException(status_code=400, detail="Invalid capacity")
+    active = await ws.adb.get_task_table(active_only=True)
+    weights = await ws.adb.get_user_weights()
+    return await run_cpu(ws.agent.plan_schedule, request.hours_per_day, request.days,
+                         request.capacity, request.allow_split, active=active, weights=weights)
 
 
 @app.get("/agent/next-action", response_model=NextActionSuggestion)
-def get_next_action():
+async def get_next_action(request: Request, fresh: bool = False,
+                          ws: Workspace = Depends(get_workspace)):
     """
     🎯 O que devo fazer agora?
     Retorna a tarefa com maior utilidade + razão da sugestão
+    Usa o ranking em segundo plano quando disponível (`fresh=true` calcula na hora)
     """
-    try:
-        suggestion = agent.suggest_next_action()
+    snapshot = ws.ranking.get() if ws.ranking is not None and not fresh else None
+    
+    async def compute():
+        try:
+            if snapshot is not None and snapshot.rows:
+                suggestion = ws.agent.suggest_next_action(snapshot.best())
+            else:
+                await run_in(DB_EXECUTOR, ws.agent.load_index)
+                suggestion = await run_cpu(ws.agent.suggest_next_action)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        # Cada sugestão nova entra no log de eventos
+        await run_in(DB_EXECUTOR, ws.agent.record_feedback, "shown", suggestion.task.id)
         return suggestion
-    except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
+    
+    # O horário estimado de término muda a cada minuto; a resposta vinda de um snapshot
+    # só é reaproveitada enquanto esse snapshot for o atual
+    bucket = datetime.now().strftime("%H%M")
+    if snapshot is not None:
+        bucket += f":r{snapshot.seq}"
+    return await cached_json(request, ws, "next-action", compute, time_bucket=bucket,
+                             weighted=True)
 
 
 @app.post("/agent/ignore/{task_id}")
-def ignore_suggestion(task_id: int):
+def ignore_suggestion(task_id: int, ws: Workspace = Depends(get_workspace)):
     """
     🤖 Aprendizado adaptativo
     Registra que usuário ignorou uma sugestão
     """
-    task = db.get_task_by_id(task_id)
+    task = ws.agent.adaptive_learning(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    agent.adaptive_learning(task_id)
-    
     return {
         "message": "Preferências registradas",
-        "ignored_count": task.ignored_count + 1
+        "ignored_count": task.ignored_count
     }
 
 
+@app.post("/agent/retrain")
+def retrain_preferences(epochs: int = 200, ws: Workspace = Depends(get_workspace)):
+    """
+    🔁 Retreina os pesos com todo o histórico de eventos (aceitou, concluiu, ignorou)
+    """
+    if epochs < 1 or epochs > 10000:
+        raise HTTPException(status_code=400, detail="Invalid epochs")
+    result = ws.agent.retrain_preferences(epochs)
+    return {**result, "events": ws.db.get_event_counts()}
+
+
 @app.get("/agent/weights", response_model=UserWeights)
-def get_weights():
+def get_weights(ws: Workspace = Depends(get_workspace)):
     """Retorna pesos adaptativos atuais."""
-    weights = db.get_user_weights()
+    weights = ws.db.get_user_weights()
     return UserWeights(**weights)
 
 
 @app.post("/agent/weights")
-def update_weights(weights: UserWeights):
+async def update_weights(weights: UserWeights, ws: Workspace = Depends(get_workspace)):
     """Atualiza manualmente os pesos."""
-    db.update_user_weights(weights.model_dump())
+    await ws.adb.submit_update_user_weights(weights.model_dump())
     return {"message": "Weights updated successfully"}
 
 
 # ==================== Dashboard & Estatísticas ====================
 
 @app.get("/dashboard/stats", response_model=DashboardStats)
-def get_dashboard_stats():
+async def get_dashboard_stats(request: Request, ws: Workspace = Depends(get_workspace)):
     """📊 Estatísticas para o dashboard."""
-    return agent.get_dashboard_stats()
+    return await cached_json(request, ws, "stats",
+                             lambda: run_in(DB_EXECUTOR, ws.agent.get_dashboard_stats))
 
 
 @app.get("/dashboard/timeline")
-def get_timeline():
+async def get_timeline(request: Request, ws: Workspace = Depends(get_workspace)):
     """📅 Timeline de deadlines para os próximos 30 dias."""
-    return agent.get_timeline_data()
+    return await cached_json(request, ws, "timeline",
+                             lambda: run_in(DB_EXECUTOR, ws.agent.get_timeline_data))
 
 
-@app.get("/dashboard/tasks-by-date/{date}", response_model=List[Task])
-def get_tasks_by_date(date: str):
+@app.get("/dashboard/risk")
+async def get_deadline_risk(request: Request, hours_per_day: float = DEFAULT_HOURS_PER_DAY,
+                            simulations: int = DEFAULT_SIMULATIONS, seed: int = 0, limit: int = 20,
+                            ws: Workspace = Depends(get_workspace)):
+    """
+    🎲 Risco de atraso (Monte Carlo)
+    Probabilidade de cada tarefa atrasar e de a carga não caber nas horas por dia
+    """
+    if hours_per_day <= 0:
+        raise HTTPException(status_code=400, detail="Invalid hours_per_day")
+    if simulations < 1 or simulations > MAX_SIMULATIONS:
+        raise HTTPException(status_code=400, detail=f"Invalid simulations (1-{MAX_SIMULATIONS})")
+    
+    async def compute():
+        active = await ws.adb.get_task_table(active_only=True)
+        samples = await ws.adb.get_completion_samples()
+        return await run_cpu(ws.agent.deadline_risk, hours_per_day, simulations, seed, max(0, limit),
+                             active=active, completion_samples=samples)
+    
+    key = f"risk:{hours_per_day}:{simulations}:{seed}:{limit}"
+    return await cached_json(request, ws, key, compute)
+
+
+@app.get("/dashboard/tasks-by-date/{date}", response_model=List[Task],
+         response_class=FastJSONResponse)
+async def get_tasks_by_date(date: str, ws: Workspace = Depends(get_workspace)):
     """
     📆 Tarefas para uma data específica
     Formato da data: YYYY-MM-DD
     """
     try:
-        tasks = db.get_tasks_by_date(date)
+        tasks = await ws.adb.get_tasks_by_date(date)
         return tasks
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.get("/dashboard/high-stress-mode")
-def check_high_stress_mode():
+async def check_high_stress_mode(request: Request, ws: Workspace = Depends(get_workspace)):
     """🚨 Verifica se está em modo alto estresse."""
-    tasks = db.get_all_tasks()
-    is_high_stress = agent.detect_high_stress_mode(tasks)
+    async def compute():
+        is_high_stress = await run_in(DB_EXECUTOR, ws.agent.detect_high_stress_mode)
+        
+        return {
+            "high_stress_mode": is_high_stress,
+            "message": "Modo alto estresse ativado! Priorizando tarefas rápidas e importantes." if is_high_stress else "Tudo sob controle!"
+        }
     
-    return {
-        "high_stress_mode": is_high_stress,
-        "message": "Modo alto estresse ativado! Priorizando tarefas rápidas e importantes." if is_high_stress else "Tudo sob controle!"
-    }
+    return await cached_json(request, ws, "high-stress-mode", compute)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,261 @@
+"""
+Instrumentação
+Histogramas de latência por rota, contagem de comandos SQL, conexões e linhas
+hidratadas por requisição, e tempo gasto em cada método do agente.
+Tudo é exposto no formato texto do Prometheus (GET /metrics).
+"""
+
+import contextvars
+import functools
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500, 1000, 10000, 100000)
+
+# Server-Timing em todas as respostas (útil nas DevTools do navegador)
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        # labels -> ([contagem por bucket], soma, total)
+        self._series: Dict[Tuple, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_format_labels(key, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_format_labels(key, le)} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Latência das requisições por rota")
+REQUESTS = Counter("http_requests_total", "Requisições por rota e status")
+REQUEST_SQL = Histogram("http_request_sql_statements", "Comandos SQL por requisição", COUNT_BUCKETS)
+REQUEST_CONNECTIONS = Histogram("http_request_db_connections",
+                                "Conexões emprestadas do pool por requisição", COUNT_BUCKETS)
+REQUEST_ROWS = Histogram("http_request_rows_hydrated", "Linhas convertidas em Task por requisição",
+                         COUNT_BUCKETS)
+AGENT_LATENCY = Histogram("agent_method_duration_seconds", "Tempo gasto em cada método do agente")
+SQL_STATEMENTS = Counter("db_sql_statements_total", "Comandos SQL executados")
+CONNECTIONS_OPENED = Counter("db_connections_opened_total", "Conexões SQLite abertas")
+ROWS_HYDRATED = Counter("db_rows_hydrated_total", "Linhas convertidas em Task")
+WRITE_QUEUE_DEPTH = Histogram("db_write_queue_depth", "Escritas na fila ao enfileirar (incluindo a nova)",
+                              COUNT_BUCKETS)
+WRITE_COMMIT_SIZE = Histogram("db_write_commit_size", "Mutações aplicadas por commit em grupo",
+                              COUNT_BUCKETS)
+WRITE_COMMIT_LATENCY = Histogram("db_write_commit_duration_seconds",
+                                 "Tempo de cada transação da fila de escrita")
+RANKING_SNAPSHOT_READS = Counter("ranking_snapshot_reads_total",
+                                 "Leituras do ranking pré-calculado (hit = dentro da defasagem)")
+
+METRICS = (REQUEST_LATENCY, REQUESTS, REQUEST_SQL, REQUEST_CONNECTIONS, REQUEST_ROWS,
+           AGENT_LATENCY, SQL_STATEMENTS, CONNECTIONS_OPENED, ROWS_HYDRATED,
+           WRITE_QUEUE_DEPTH, WRITE_COMMIT_SIZE, WRITE_COMMIT_LATENCY, RANKING_SNAPSHOT_READS)
+
+
+class RequestStats:
+    """
+    Contadores de uma requisição
+    O contexto é copiado para os executores (run_in), então as threads de banco e de
+    pontuação atualizam o mesmo objeto
+    """
+
+    def __init__(self):
+        self.sql_statements = 0
+        self.connections = 0
+        self.rows_hydrated = 0
+        self.timings: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add_timing(self, name: str, seconds: float):
+        with self._lock:
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+# ==================== Ganchos (chamados pelo Database e pelo agente) ====================
+
+def record_statement():
+    SQL_STATEMENTS.inc()
+    stats = _current.get()
+    if stats is not None:
+        stats.sql_statements += 1
+
+
+def record_connection_opened():
+    CONNECTIONS_OPENED.inc()
+
+
+def record_checkout():
+    stats = _current.get()
+    if stats is not None:
+        stats.connections += 1
+
+
+def record_rows(count: int):
+    if not count:
+        return
+    ROWS_HYDRATED.inc(count)
+    stats = _current.get()
+    if stats is not None:
+        stats.rows_hydrated += count
+
+
+def timed(name: str):
+    """Decorator: mede o método no histograma do agente e no Server-Timing da requisição"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                AGENT_LATENCY.observe(elapsed, method=name)
+                stats = _current.get()
+                if stats is not None:
+                    stats.add_timing(name, elapsed)
+        return wrapper
+    return decorator
+
+
+# ==================== Middleware e exposição ====================
+
+def server_timing(stats: RequestStats, total: float) -> str:
+    # Valores de header precisam ser ASCII
+    entries = [f"app;dur={total * 1000:.2f}",
+               f'sql;desc="{stats.sql_statements} comandos"',
+               f'conn;desc="{stats.connections} conexoes"',
+               f'rows;desc="{stats.rows_hydrated} linhas"']
+    for name, seconds in stats.timings.items():
+        entries.append(f"{name};dur={seconds * 1000:.2f}")
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: mede cada requisição HTTP pela rota declarada (ex.: /tasks/{task_id})
+    Com server_timing=True (ou ?timing=1 na URL) adiciona o header Server-Timing
+    """
+
+    def __init__(self, app, server_timing: bool = SERVER_TIMING):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status = 500
+        with_timing = self.server_timing or b"timing=1" in scope.get("query_string", b"")
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if with_timing:
+                    header = server_timing(stats, time.perf_counter() - start)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", "<unmatched>")
+            method = scope["method"]
+            REQUEST_LATENCY.observe(time.perf_counter() - start, method=method, route=path)
+            REQUESTS.inc(method=method, route=path, status=str(status))
+            REQUEST_SQL.observe(stats.sql_statements, route=path)
+            REQUEST_CONNECTIONS.observe(stats.connections, route=path)
+            REQUEST_ROWS.observe(stats.rows_hydrated, route=path)
+
+
+def render(gauges: Iterable[Tuple[str, str, Dict[str, str], float]] = ()) -> str:
+    """Texto do Prometheus com as métricas registradas e gauges calculados na hora"""
+    lines: List[str] = []
+    for metric in METRICS:
+        lines.extend(metric.expose())
+
+    described = set()
+    for name, help_text, labels, value in sorted(gauges, key=lambda gauge: gauge[0]):
+        if name not in described:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            described.add(name)
+        lines.append(f"{name}{_format_labels(tuple(sorted(labels.items())))} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
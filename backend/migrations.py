@@ -0,0 +1,344 @@
+"""
+Migrações de schema versionadas
+Cada passo numerado roda uma única vez; a versão aplicada fica em PRAGMA user_version
+"""
+
+import os
+import threading
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+
+def _initial_schema(conn):
+    # Tabela de tarefas
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT DEFAULT '',
+            deadline INTEGER NOT NULL,
+            importance REAL NOT NULL,
+            duration REAL NOT NULL,
+            stress REAL NOT NULL,
+            fun REAL NOT NULL,
+            penalty_late REAL NOT NULL,
+            status TEXT DEFAULT 'backlog',
+            ignored_count INTEGER DEFAULT 0,
+            completed_date TEXT,
+            created_at TEXT NOT NULL
+        )
+    """)
+
+    # Tabela de pesos do usuário (aprendizado adaptativo)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_weights (
+            id INTEGER PRIMARY KEY,
+            urgency_weight REAL DEFAULT 3.0,
+            importance_weight REAL DEFAULT 2.5,
+            penalty_weight REAL DEFAULT 2.0,
+            stress_weight REAL DEFAULT 1.0,
+            fun_weight REAL DEFAULT 0.5,
+            effort_weight REAL DEFAULT 1.5,
+            updated_at TEXT
+        )
+    """)
+
+    # Inicializa pesos padrão se não existir
+    conn.execute("""
+        INSERT OR IGNORE INTO user_weights (id, updated_at)
+        VALUES (1, ?)
+    """, (datetime.now().isoformat(),))
+
+
+def _task_indexes(conn):
+    # Índices para as consultas por status, deadline e ordem de criação
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_deadline ON tasks (deadline)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks (created_at)")
+
+
+def _change_log(conn):
+    # Log de mudanças para sincronização incremental (uma linha por tarefa: a última mudança)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS task_changes (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            changed_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_task_changes_task ON task_changes (task_id)")
+
+    # Versões abaixo deste horizonte já tiveram tombstones removidos
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            id INTEGER PRIMARY KEY,
+            pruned_version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO sync_state (id, pruned_version) VALUES (1, 0)")
+
+    for event, op, ref in (("INSERT", "upsert", "NEW"),
+                           ("UPDATE", "upsert", "NEW"),
+                           ("DELETE", "delete", "OLD")):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_tasks_{event.lower()}_log
+            AFTER {event} ON tasks
+            BEGIN
+                DELETE FROM task_changes WHERE task_id = {ref}.id;
+                INSERT INTO task_changes (task_id, op, changed_at)
+                VALUES ({ref}.id, '{op}', strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'));
+            END
+        """)
+
+    # Tarefas existentes entram no log como versão inicial
+    conn.execute("""
+        INSERT INTO task_changes (task_id, op, changed_at)
+        SELECT id, 'upsert', created_at FROM tasks ORDER BY id
+    """)
+
+
+def _weights_version(conn):
+    # Contador incrementado a cada mudança de pesos (usado nas ETags)
+    conn.execute("ALTER TABLE user_weights ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+
+def _absolute_due_dates(conn):
+    # Data de entrega absoluta; o deadline em dias passa a ser derivado dela na leitura.
+    # As tarefas existentes mantêm o prazo que mostram hoje (hoje + deadline)
+    conn.execute("ALTER TABLE tasks ADD COLUMN due_at TEXT")
+    # Modificador com sinal explícito ('+3 days', '-2 days'): '+' || -2 viraria '+-2 days' (NULL)
+    conn.execute("""
+        UPDATE tasks SET due_at = date('now', 'localtime', printf('%+d days', deadline))
+        WHERE due_at IS NULL
+    """)
+    conn.execute("DROP INDEX IF EXISTS idx_tasks_deadline")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_due_at ON tasks (due_at)")
+
+    # Agregados por dia das tarefas ativas, mantidos por triggers a cada escrita
+    # (IS NOT 'done': status NULL, de linhas antigas, é lido como 'backlog')
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS timeline_rollup (
+            day TEXT PRIMARY KEY,
+            task_count INTEGER NOT NULL DEFAULT 0,
+            total_hours REAL NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("DELETE FROM timeline_rollup")
+    conn.execute("""
+        INSERT INTO timeline_rollup (day, task_count, total_hours)
+        SELECT due_at, COUNT(*), SUM(duration) FROM tasks
+        WHERE status IS NOT 'done'
+        GROUP BY due_at
+    """)
+
+    add_new = """
+        INSERT INTO timeline_rollup (day, task_count, total_hours)
+        VALUES (NEW.due_at, 1, NEW.duration)
+        ON CONFLICT (day) DO UPDATE SET
+            task_count = task_count + 1,
+            total_hours = total_hours + excluded.total_hours;
+    """
+    remove_old = """
+        UPDATE timeline_rollup
+        SET task_count = task_count - 1, total_hours = total_hours - OLD.duration
+        WHERE day = OLD.due_at;
+        DELETE FROM timeline_rollup WHERE day = OLD.due_at AND task_count <= 0;
+    """
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_insert_rollup
+        AFTER INSERT ON tasks WHEN NEW.status IS NOT 'done'
+        BEGIN {add_new} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_delete_rollup
+        AFTER DELETE ON tasks WHEN OLD.status IS NOT 'done'
+        BEGIN {remove_old} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_update_rollup_old
+        AFTER UPDATE OF status, due_at, duration ON tasks WHEN OLD.status IS NOT 'done'
+        BEGIN {remove_old} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_update_rollup_new
+        AFTER UPDATE OF status, due_at, duration ON tasks WHEN NEW.status IS NOT 'done'
+        BEGIN {add_new} END
+    """)
+
+
+def _suggestion_events(conn):
+    # Log só de inserção com o retorno do usuário às sugestões (base do aprendizado de preferências)
+    # f_*: features da tarefa do evento; r_*: da tarefa de referência (a alternativa comparada)
+    features = ('urgency', 'importance', 'penalty', 'stress_relief', 'fun', 'ease')
+    columns = ",\n".join(f"{prefix}_{name} REAL" for prefix in ('f', 'r') for name in features)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS suggestion_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER NOT NULL,
+            event TEXT NOT NULL,
+            ref_task_id INTEGER,
+            label INTEGER NOT NULL DEFAULT 0,
+            {columns},
+            created_at TEXT NOT NULL
+        )
+    """)
+
+
+def _search_index(conn):
+    # Índice de busca textual (FTS5) sobre título e descrição, sem acentos e com prefixos
+    # de 2 e 3 letras pré-indexados. O conteúdo fica só em tasks (external content)
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+            title, description,
+            content='tasks', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    # Ranking padrão: BM25 com o título valendo 10x a descrição (ORDER BY rank usa isso)
+    conn.execute("INSERT INTO tasks_fts (tasks_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+    conn.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+
+    insert_new = """
+        INSERT INTO tasks_fts (rowid, title, description)
+        VALUES (NEW.id, NEW.title, NEW.description);
+    """
+    delete_old = """
+        INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+        VALUES ('delete', OLD.id, OLD.title, OLD.description);
+    """
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_insert_fts
+        AFTER INSERT ON tasks
+        BEGIN {insert_new} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_delete_fts
+        AFTER DELETE ON tasks
+        BEGIN {delete_old} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_update_fts
+        AFTER UPDATE OF title, description ON tasks
+        BEGIN {delete_old} {insert_new} END
+    """)
+
+
+def _task_archive(conn):
+    # Tarefas concluídas há tempo saem de tasks (conjunto ativo) para o arquivo
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tasks_archive (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT DEFAULT '',
+            deadline INTEGER NOT NULL,
+            importance REAL NOT NULL,
+            duration REAL NOT NULL,
+            stress REAL NOT NULL,
+            fun REAL NOT NULL,
+            penalty_late REAL NOT NULL,
+            status TEXT DEFAULT 'done',
+            ignored_count INTEGER DEFAULT 0,
+            completed_date TEXT,
+            created_at TEXT NOT NULL,
+            due_at TEXT,
+            archived_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_tasks_archive_completed
+        ON tasks_archive (completed_date, id)
+    """)
+
+    # Contadores do arquivo (mantidos por triggers): done_count sem varrer tasks_archive
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS archive_counters (
+            id INTEGER PRIMARY KEY,
+            task_count INTEGER NOT NULL DEFAULT 0,
+            total_hours REAL NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO archive_counters (id, task_count, total_hours) VALUES (1, 0, 0)")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_archive_insert_counters
+        AFTER INSERT ON tasks_archive
+        BEGIN
+            UPDATE archive_counters
+            SET task_count = task_count + 1, total_hours = total_hours + NEW.duration
+            WHERE id = 1;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_archive_delete_counters
+        AFTER DELETE ON tasks_archive
+        BEGIN
+            UPDATE archive_counters
+            SET task_count = task_count - 1, total_hours = total_hours - OLD.duration
+            WHERE id = 1;
+        END
+    """)
+
+    # Consultas do conjunto ativo em ordem de criação sem tocar nas concluídas
+    # (IS NOT: status NULL, de linhas antigas, é lido como 'backlog')
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_tasks_active
+        ON tasks (created_at) WHERE status IS NOT 'done'
+    """)
+
+
+# (versão, passo) em ordem crescente; novos passos só são adicionados no final
+MIGRATIONS: List[Tuple[int, Callable]] = [
+    (1, _initial_schema),
+    (2, _task_indexes),
+    (3, _change_log),
+    (4, _weights_version),
+    (5, _absolute_due_dates),
+    (6, _suggestion_events),
+    (7, _search_index),
+    (8, _task_archive),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+_checked = set()
+_checked_lock = threading.Lock()
+
+
+def migrate(conn) -> int:
+    """Aplica os passos pendentes numa única transação e retorna a versão final"""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= LATEST_VERSION:
+        return version
+
+    # BEGIN IMMEDIATE evita que dois processos migrem o mesmo arquivo ao mesmo tempo
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for step_version, step in MIGRATIONS:
+            if step_version > version:
+                step(conn)
+                conn.execute(f"PRAGMA user_version = {step_version}")
+                version = step_version
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return version
+
+
+def ensure_schema(db_name: str, conn_factory: Callable, force: bool = False):
+    """
+    Garante o schema atualizado, verificando cada arquivo uma vez por processo
+    conn_factory é um context manager que empresta uma conexão
+    """
+    key = os.path.abspath(db_name)
+    if not force and key in _checked:
+        return
+
+    with _checked_lock:
+        if not force and key in _checked:
+            return
+        with conn_factory() as conn:
+            migrate(conn)
+        _checked.add(key)
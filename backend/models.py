@@ -1,18 +1,25 @@
-from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, model_validator
+from typing import Dict, List, Optional
+from datetime import datetime, date
 
 
 class TaskCreate(BaseModel):
     title: str
     description: str = ""
-    deadline: int
+    deadline: Optional[int] = None  # dias a partir de hoje
     importance: float
     duration: float
     stress: float
     fun: float
     penalty_late: float
     status: str = "backlog"  # backlog, doing, done
+    due_at: Optional[date] = None  # data de entrega (tem prioridade sobre deadline)
+
+    @model_validator(mode='after')
+    def check_due_date(self):
+        if self.deadline is None and self.due_at is None:
+            raise ValueError("Informe deadline (dias) ou due_at (data)")
+        return self
 
 
 class TaskUpdate(BaseModel):
@@ -25,6 +32,16 @@ class TaskUpdate(BaseModel):
     fun: Optional[float] = None
     penalty_late: Optional[float] = None
     status: Optional[str] = None
+    due_at: Optional[date] = None
+
+
+class TaskBatchUpdate(TaskUpdate):
+    id: int
+
+
+class TaskBatch(BaseModel):
+    updates: List[TaskBatchUpdate] = []
+    deletes: List[int] = []
 
 
 class Task(BaseModel):
@@ -41,6 +58,7 @@ class Task(BaseModel):
     ignored_count: int = 0
     completed_date: Optional[str] = None
     created_at: str
+    due_at: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -52,6 +70,26 @@ class TaskWithUtility(Task):
     importance_level: str
 
 
+class TaskSearchHit(Task):
+    score: float  # BM25 (menor = mais relevante)
+    snippet: str
+    utility: Optional[float] = None
+
+
+class TaskSearchResult(BaseModel):
+    total: int
+    hits: List[TaskSearchHit]
+
+
+class ArchivedTask(Task):
+    archived_at: str
+
+
+class ArchivedTaskPage(BaseModel):
+    total: int
+    tasks: List[ArchivedTask]
+
+
 class UserWeights(BaseModel):
     urgency_weight: float = 3.0
     importance_weight: float = 2.5
@@ -71,9 +109,40 @@ class DashboardStats(BaseModel):
     high_stress_tasks: int
     average_stress: float
     completion_rate: float
+    archived_count: int = 0
+
+
+class WeightSweepRequest(BaseModel):
+    mode: str = "random"  # explicit (lista em weights), random ou grid em torno dos pesos atuais
+    weights: List[UserWeights] = []
+    samples: int = 100  # random: quantidade de vetores
+    steps: int = 3  # grid: valores por peso (steps^6 vetores)
+    spread: float = 0.2  # variação relativa em torno dos pesos atuais
+    seed: Optional[int] = None
+    top_k: int = 10
+
+
+class PlanRequest(BaseModel):
+    hours_per_day: float = 6.0
+    days: int = 14
+    capacity: Dict[date, float] = {}  # horas de dias específicos (ex.: fim de semana = 0)
+    allow_split: bool = True  # permite dividir tarefas entre dias
 
 
 class NextActionSuggestion(BaseModel):
     task: TaskWithUtility
     reason: str
     estimated_finish_time: str
+
+
+class TaskChanges(BaseModel):
+    version: int
+    changes: List[Task]
+    deleted: List[int]
+    has_more: bool
+    reset: bool = False
+
+
+class TaskBatchResult(BaseModel):
+    updated: List[Task]
+    deleted: List[int]
@@ -0,0 +1,236 @@
+"""
+Planejamento diário com capacidade limitada
+1. Viabilidade (EDF): percorre as tarefas por prazo; quando a demanda acumulada passa da
+   capacidade até o prazo, descarta as de menor utilidade por hora (prazos inviáveis)
+2. Reserva ALAP: as tarefas viáveis reservam horas o mais tarde possível antes do prazo
+   Sem divisão, os dois passos trabalham com blocos inteiros: first-fit em ordem EDF decide
+   quem cabe (o resto é inviável) e cada bloco depois desliza para o dia mais tardio com folga
+3. Dia a dia: faz primeiro o que a reserva exige naquele dia e preenche o restante
+   da capacidade com as tarefas de maior utilidade (antecipando trabalho)
+Tudo em O(n log n + dias) (sem divisão, O(n log dias) a mais na árvore de folgas)
+"""
+
+import heapq
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+EPS = 1e-9
+# No modo sem divisão, quantas tarefas que não cabem no dia são puladas antes de desistir
+MAX_SKIPS = 64
+
+
+class Plan:
+    __slots__ = ('days', 'infeasible', 'finish_day', 'remaining')
+
+    def __init__(self, days: List[Dict[int, float]], infeasible: List[int],
+                 finish_day: List[Optional[int]], remaining: List[float]):
+        self.days = days              # por dia: {índice da tarefa: horas}
+        self.infeasible = infeasible  # tarefas cujo prazo não cabe na capacidade
+        self.finish_day = finish_day  # dia em que cada tarefa termina (None = fora do horizonte)
+        self.remaining = remaining    # horas que sobraram de cada tarefa
+
+
+def _feasible_set(durations: Sequence[float], dues: Sequence[int], utilities: Sequence[float],
+                  cumulative: List[float]) -> Tuple[List[int], List[int]]:
+    """EDF com descarte guloso por utilidade/hora; retorna (mantidas, inviáveis)"""
+    horizon = len(cumulative)
+    constrained = sorted((i for i in range(len(durations)) if dues[i] < horizon),
+                         key=lambda i: (dues[i], -utilities[i]))
+    heap: List[Tuple[float, int]] = []
+    dropped = set()
+    load = 0.0
+    for i in constrained:
+        heapq.heappush(heap, (utilities[i] / max(durations[i], EPS), i))
+        load += durations[i]
+        while load > cumulative[dues[i]] + EPS:
+            _, j = heapq.heappop(heap)
+            dropped.add(j)
+            load -= durations[j]
+    kept = [i for i in constrained if i not in dropped]
+    return kept, sorted(dropped, key=lambda i: (dues[i], -utilities[i]))
+
+
+class _FreeDays:
+    """Árvore de máximos sobre a folga de cada dia: acha o primeiro/último dia com espaço"""
+
+    def __init__(self, capacities: Sequence[float]):
+        self.size = 1
+        while self.size < len(capacities):
+            self.size *= 2
+        self.tree = [-1.0] * (2 * self.size)
+        for d, capacity in enumerate(capacities):
+            self.tree[self.size + d] = capacity
+        for node in range(self.size - 1, 0, -1):
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def add(self, d: int, hours: float):
+        node = self.size + d
+        self.tree[node] += hours
+        node //= 2
+        while node:
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+            node //= 2
+
+    def find(self, limit: int, need: float, latest: bool) -> int:
+        """Primeiro (ou último) dia <= limit com folga >= need (-1 se nenhum)"""
+        def search(node: int, lo: int, hi: int) -> int:
+            if lo > limit or self.tree[node] < need - EPS:
+                return -1
+            if lo == hi:
+                return lo
+            mid = (lo + hi) // 2
+            children = [(2 * node, lo, mid), (2 * node + 1, mid + 1, hi)]
+            if latest:
+                children.reverse()
+            for child in children:
+                found = search(*child)
+                if found >= 0:
+                    return found
+            return -1
+
+        return search(1, 0, self.size - 1)
+
+
+def _place_whole(durations: Sequence[float], dues: Sequence[int], utilities: Sequence[float],
+                 capacities: Sequence[float]) -> Tuple[List[int], List[int],
+                                                       List[List[Tuple[int, float]]], List[float]]:
+    """
+    Sem divisão: cada tarefa com prazo no horizonte ocupa um único dia
+    First-fit em ordem EDF decide quem cabe; depois, do prazo mais distante para o mais
+    próximo, cada bloco desliza para o dia mais tardio com folga até o prazo (o dia atual
+    sempre serve, então ninguém que coube deixa de caber)
+    Retorna (mantidas, inviáveis, reservas por dia, horas reservadas por tarefa)
+    """
+    horizon = len(capacities)
+    constrained = sorted((i for i in range(len(durations)) if dues[i] < horizon),
+                         key=lambda i: (dues[i], -utilities[i]))
+    days = _FreeDays(capacities)
+    placed: Dict[int, int] = {}
+    infeasible = []
+    for i in constrained:
+        d = days.find(dues[i], durations[i], latest=False)
+        if d < 0:
+            infeasible.append(i)
+            continue
+        days.add(d, -durations[i])
+        placed[i] = d
+
+    kept = [i for i in constrained if i in placed]
+    for i in sorted(kept, key=lambda i: -dues[i]):
+        days.add(placed[i], durations[i])
+        placed[i] = days.find(dues[i], durations[i], latest=True)
+        days.add(placed[i], -durations[i])
+
+    reservations: List[List[Tuple[int, float]]] = [[] for _ in capacities]
+    pending = [0.0] * len(durations)
+    for i in kept:
+        reservations[placed[i]].append((i, float(durations[i])))
+        pending[i] = float(durations[i])
+    return kept, infeasible, reservations, pending
+
+
+def _reserve_alap(kept: List[int], durations: Sequence[float], dues: Sequence[int],
+                  capacities: Sequence[float]) -> Tuple[List[List[Tuple[int, float]]], List[float]]:
+    """
+    Reserva as horas de cada tarefa nos dias mais tardios possíveis (prazo mais distante primeiro)
+    Dias cheios são pulados com union-find, então cada dia é visitado O(1) vezes amortizado
+    """
+    free = list(capacities)
+    # parent[d] == d: o dia d ainda tem folga; senão aponta para um dia anterior
+    parent = [d if free[d] > EPS else d - 1 for d in range(len(free))]
+    reservations: List[List[Tuple[int, float]]] = [[] for _ in capacities]
+    pending = [0.0] * len(durations)
+
+    def find(d: int) -> int:
+        """Último dia <= d com folga (-1 se nenhum)"""
+        path = []
+        while d >= 0 and parent[d] != d:
+            path.append(d)
+            d = parent[d]
+        for visited in path:
+            parent[visited] = d
+        return d
+
+    for i in sorted(kept, key=lambda i: -dues[i]):
+        need = durations[i]
+        d = find(dues[i])
+        while need > EPS and d >= 0:
+            take = min(need, free[d])
+            free[d] -= take
+            need -= take
+            reservations[d].append((i, take))
+            pending[i] += take
+            if free[d] <= EPS:
+                parent[d] = d - 1
+                d = find(d - 1)
+    return reservations, pending
+
+
+def build_plan(durations: Sequence[float], dues: Sequence[int], utilities: Sequence[float],
+               capacities: Sequence[float], allow_split: bool = True) -> Plan:
+    """
+    durations: horas de cada tarefa; dues: dia do prazo (índice a partir de 0; valores >= dias
+    não restringem o plano); utilities: utilidade; capacities: horas disponíveis por dia
+    """
+    n = len(durations)
+    horizon = len(capacities)
+    cumulative = []
+    total = 0.0
+    for capacity in capacities:
+        total += capacity
+        cumulative.append(total)
+
+    if allow_split:
+        kept, infeasible = _feasible_set(durations, dues, utilities, cumulative)
+        reservations, pending = _reserve_alap(kept, durations, dues, capacities)
+    else:
+        kept, infeasible, reservations, pending = _place_whole(durations, dues, utilities, capacities)
+
+    remaining = [float(d) for d in durations]
+    finish_day: List[Optional[int]] = [None] * n
+    # Tarefas maiores que qualquer dia só podem ser feitas em partes
+    largest_day = max(capacities, default=0.0)
+    heap = [(-utilities[i], i) for i in range(n)]
+    heapq.heapify(heap)
+
+    days: List[Dict[int, float]] = []
+    for d in range(horizon):
+        entries: Dict[int, float] = {}
+        used = 0.0
+
+        def work(i: int, hours: float):
+            nonlocal used
+            remaining[i] -= hours
+            used += hours
+            entries[i] = entries.get(i, 0.0) + hours
+            if remaining[i] <= EPS:
+                remaining[i] = 0.0
+                finish_day[i] = d
+
+        # O que precisa ser feito hoje para o restante caber nas reservas dos próximos dias
+        for i, hours in reservations[d]:
+            pending[i] -= hours
+            must = remaining[i] - max(pending[i], 0.0)
+            if must > EPS:
+                work(i, min(must, remaining[i]))
+
+        # Capacidade livre: maior utilidade primeiro
+        skipped = []
+        while capacities[d] - used > EPS and heap:
+            i = heap[0][1]
+            if remaining[i] <= EPS:
+                heapq.heappop(heap)
+                continue
+            free = capacities[d] - used
+            if not allow_split and remaining[i] > free + EPS and durations[i] <= largest_day:
+                skipped.append(heapq.heappop(heap))
+                if len(skipped) >= MAX_SKIPS:
+                    break
+                continue
+            work(i, min(free, remaining[i]))
+        for item in skipped:
+            heapq.heappush(heap, item)
+
+        days.append(entries)
+
+    return Plan(days, infeasible, finish_day, remaining)
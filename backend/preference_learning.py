@@ -0,0 +1,96 @@
+"""
+Aprendizado de preferências
+Modelo pairwise: cada evento do log diz que uma tarefa foi preferida a outra, e os
+pesos da utilidade são ajustados por SGD na perda logística
+    P(a preferida a b) = sigmoid(w · (x_a - x_b))
+O ajuste online custa O(nº de features) por evento; o retreino em lote usa o log inteiro
+"""
+
+import math
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from models import Task, UserWeights
+from scoring import WEIGHT_KEYS
+
+
+# Features da utilidade, na mesma ordem de WEIGHT_KEYS
+FEATURE_NAMES = ('urgency', 'importance', 'penalty', 'stress_relief', 'fun', 'ease')
+
+# Eventos do log e o rótulo do par (tarefa do evento vs. tarefa de referência)
+# +1: tarefa preferida à referência, -1: referência preferida, 0: só registro
+EVENT_LABELS = {
+    'shown': 0,
+    'accepted': 1,
+    'completed': 1,
+    'ignored': -1,
+}
+
+LEARNING_RATE = 0.05
+# Puxa os pesos de volta para os padrões (evita que poucos eventos dominem)
+REGULARIZATION = 0.1
+MIN_WEIGHT = 0.0
+
+PRIOR_WEIGHTS = UserWeights().model_dump()
+
+
+def task_features(task: Task) -> List[float]:
+    """Termos da fórmula de utilidade de uma tarefa (ver calculate_utility)"""
+    return [
+        1 / (task.deadline + 1),
+        task.importance,
+        task.penalty_late if task.deadline < 2 else 0,
+        1 - task.stress,
+        task.fun,
+        1 - task.duration / 10,
+    ]
+
+
+def _sigmoid(z: float) -> float:
+    if z >= 0:
+        return 1 / (1 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1 + e)
+
+
+def sgd_update(weights: Dict, preferred: Sequence[float], other: Sequence[float],
+               learning_rate: float = LEARNING_RATE,
+               regularization: float = REGULARIZATION) -> Dict:
+    """Um passo de SGD para o par (preferred > other); retorna novos pesos"""
+    diff = [a - b for a, b in zip(preferred, other)]
+    w = [weights[key] for key in WEIGHT_KEYS]
+    p = _sigmoid(sum(wi * di for wi, di in zip(w, diff)))
+
+    updated = dict(weights)
+    for key, wi, di in zip(WEIGHT_KEYS, w, diff):
+        gradient = (1 - p) * di - regularization * (wi - PRIOR_WEIGHTS[key])
+        updated[key] = max(MIN_WEIGHT, wi + learning_rate * gradient)
+    return updated
+
+
+def fit(pairs: Iterable[Tuple[int, Sequence[float], Sequence[float]]], epochs: int = 200,
+        learning_rate: float = 0.5, regularization: float = REGULARIZATION) -> Tuple[Dict, int]:
+    """
+    Retreino em lote a partir do log: gradiente descendente (vetorizado) sobre todos os pares,
+    partindo dos pesos padrão. Retorna (pesos, nº de pares usados)
+    """
+    rows = [(label, features, ref) for label, features, ref in pairs if label]
+    prior = np.array([PRIOR_WEIGHTS[key] for key in WEIGHT_KEYS])
+    if not rows:
+        return dict(PRIOR_WEIGHTS), 0
+
+    labels = np.array([label for label, _, _ in rows], dtype=np.float64)
+    # Cada linha: x_preferida - x_outra
+    diffs = (np.array([f for _, f, _ in rows], dtype=np.float64) -
+             np.array([r for _, _, r in rows], dtype=np.float64)) * labels[:, None]
+
+    w = prior.copy()
+    for _ in range(epochs):
+        margin = diffs @ w
+        # 1 - sigmoid(margin), estável para margens grandes
+        residual = np.exp(-np.logaddexp(0, margin))
+        gradient = diffs.T @ residual / len(diffs) - regularization * (w - prior)
+        w = np.maximum(MIN_WEIGHT, w + learning_rate * gradient)
+
+    return {key: float(value) for key, value in zip(WEIGHT_KEYS, w)}, len(rows)
@@ -0,0 +1,209 @@
+"""
+Índice de prioridade mantido incrementalmente
+Guarda as tarefas ativas ordenadas por utilidade, atualizado a cada escrita no banco
+As notificações chegam na thread escritora: só são enfileiradas, e a próxima consulta
+as aplica (assim uma consulta que repontua não segura as escritas)
+"""
+
+import threading
+from collections import deque
+from datetime import date
+from typing import Dict, List, Optional, Tuple, Union
+
+from sortedcontainers import SortedList
+
+from models import Task, TaskWithUtility
+from scoring import TaskColumns, utility_scores, round_scores
+from task_table import task_from_row
+
+
+# Mudanças pendentes acima disso (índice sem consultas): descarta e remonta na próxima consulta
+MAX_PENDING_EVENTS = 10000
+
+
+class PriorityIndex:
+    """
+    Tarefas ativas ordenadas por (-utilidade, -id)
+    Empates ficam com a tarefa mais recente primeiro, como em get_all_tasks
+    """
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.db = agent.db
+        self._lock = threading.RLock()
+        # Linha bruta da TaskTable (vira Task ao aparecer num top-k) ou Task já montado
+        self._tasks: Dict[int, Union[Task, tuple]] = {}
+        # Campos numéricos de cada tarefa, na ordem de TaskColumns
+        self._fields: Dict[int, Tuple[float, ...]] = {}
+        self._keys: Dict[int, Tuple[float, int]] = {}
+        self._order = SortedList()
+        self._base_weights: Optional[Dict] = None
+        # Pontuação desatualizada: refeita na próxima consulta, fora de quem escreveu
+        self._stale = False
+        self._weights: Optional[Dict] = None
+        self._high_stress = False
+        # Contadores usados para detectar mudança no modo alto estresse
+        self._high_stress_count = 0
+        self._urgent_count = 0
+        self._total_hours = 0.0
+        self._built = False
+        self._built_on: Optional[date] = None
+        # (evento, payload) ainda não aplicados; escrito pelo listener sem o lock
+        self._events = deque()
+        self._overflowed = False
+        self.db.subscribe(self._on_change)
+
+    # ==================== Consultas ====================
+
+    def best(self) -> Optional[TaskWithUtility]:
+        """Tarefa de maior utilidade (O(log n))"""
+        top = self.top(1)
+        return top[0] if top else None
+
+    def top(self, k: int) -> List[TaskWithUtility]:
+        """As k tarefas de maior utilidade, sem varrer o backlog"""
+        with self._lock:
+            self._ensure_built()
+            return [self.agent._with_utility(self._task(-neg_id), -neg_utility)
+                    for neg_utility, neg_id in self._order.islice(0, k)]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_built()
+            return len(self._fields)
+
+    # ==================== Manutenção ====================
+
+    def rebuild(self):
+        """Recarrega as tarefas ativas (TaskTable, sem hidratar) e repontua tudo em lote"""
+        with self._lock:
+            self._load()
+            self._rescore()
+
+    def load(self):
+        """Só a parte de I/O da montagem, se necessária: a pontuação fica para a próxima consulta"""
+        with self._lock:
+            self._apply_pending()
+            if not self._built or self._built_on != date.today():
+                self._load()
+
+    def _load(self):
+        active = self.db.get_task_table(active_only=True)
+        c = active.columns
+        ids = active.ids.tolist()
+        self._base_weights = self.db.get_user_weights()
+        self._tasks = dict(zip(ids, active.rows))
+        self._fields = dict(zip(ids, zip(
+            c.deadline.tolist(), c.importance.tolist(), c.duration.tolist(),
+            c.stress.tolist(), c.fun.tolist(), c.penalty_late.tolist())))
+        self._high_stress_count = int((c.stress >= 0.6).sum())
+        self._urgent_count = int((c.deadline <= 2).sum())
+        self._total_hours = sum(c.duration.tolist())
+        self._stale = True
+        self._built = True
+        self._built_on = date.today()
+
+    def _rescore(self):
+        self._stale = False
+        self._total_hours = sum(fields[2] for fields in self._fields.values())
+        self._high_stress = self._current_high_stress()
+        self._weights = (self.agent.adjust_weights_for_high_stress(self._base_weights)
+                         if self._high_stress else self._base_weights)
+
+        ids = list(self._fields)
+        scores = []
+        if ids:
+            columns = TaskColumns(*zip(*self._fields.values()))
+            scores = round_scores(utility_scores(columns, self._weights)).tolist()
+        self._keys = {i: (-u, -i) for i, u in zip(ids, scores)}
+        self._order = SortedList(self._keys.values())
+
+    def _task(self, task_id: int) -> Task:
+        """Hidrata a linha na primeira vez que a tarefa é devolvida"""
+        task = self._tasks[task_id]
+        if not isinstance(task, Task):
+            task = self._tasks[task_id] = task_from_row(task)
+        return task
+
+    def _current_high_stress(self) -> bool:
+        return self.agent._is_high_stress(len(self._fields), self._high_stress_count,
+                                          self._urgent_count, self._total_hours)
+
+    def _ensure_built(self):
+        self._apply_pending()
+        # Os deadlines em dias mudam na virada do dia: remonta uma vez por dia
+        if not self._built or self._built_on != date.today():
+            self.rebuild()
+        elif self._stale:
+            self._rescore()
+
+    def _on_change(self, event: str, payload):
+        """Listener do banco (thread escritora): O(1), sem esperar o lock do índice"""
+        if len(self._events) >= MAX_PENDING_EVENTS:
+            self._overflowed = True
+            self._events.clear()
+        self._events.append((event, payload))
+
+    def _apply_pending(self):
+        """Aplica as mudanças enfileiradas, na ordem dos commits (com o lock)"""
+        if self._overflowed:
+            # Mudanças descartadas: as escritas já estão no banco, que a remontagem relê
+            self._overflowed = False
+            self._built = False
+        while True:
+            try:
+                event, payload = self._events.popleft()
+            except IndexError:  # vazia (ou esvaziada pelo listener ao transbordar)
+                return
+            self._apply(event, payload)
+
+    def _apply(self, event: str, payload):
+        if not self._built:
+            return  # Ainda não foi usado: será montado na primeira consulta
+
+        if event == 'tasks_bulk_saved':
+            # Importação em lote: remonta tudo na próxima consulta
+            self._built = False
+            return
+
+        if event == 'task_saved':
+            self._remove(payload.id)
+            if payload.status != 'done':
+                self._add(payload)
+        elif event == 'task_deleted':
+            self._remove(payload)
+        elif event in ('weights_changed', 'weights_learned'):
+            # Pesos novos (inclusive um passo de SGD): repontua uma vez, na próxima consulta
+            self._base_weights = dict(payload)
+            self._stale = True
+            return
+
+        # Se o modo alto estresse mudou, todos os pesos mudam: repontua na próxima consulta
+        if self._current_high_stress() != self._high_stress:
+            self._stale = True
+
+    def _add(self, task: Task):
+        self._tasks[task.id] = task
+        self._fields[task.id] = (task.deadline, task.importance, task.duration,
+                                 task.stress, task.fun, task.penalty_late)
+        self._high_stress_count += task.stress >= 0.6
+        self._urgent_count += task.deadline <= 2
+        self._total_hours += task.duration
+        if self._stale:
+            return  # As chaves são refeitas na repontuação
+        key = (-self.agent.calculate_utility(task, self._weights), -task.id)
+        self._keys[task.id] = key
+        self._order.add(key)
+
+    def _remove(self, task_id: int):
+        fields = self._fields.pop(task_id, None)
+        if fields is None:
+            return
+        del self._tasks[task_id]
+        deadline, _, duration, stress, _, _ = fields
+        self._high_stress_count -= stress >= 0.6
+        self._urgent_count -= deadline <= 2
+        self._total_hours -= duration
+        key = self._keys.pop(task_id, None)
+        if key is not None and not self._stale:
+            self._order.remove(key)
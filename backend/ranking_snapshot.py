@@ -0,0 +1,174 @@
+"""
+Ranking pré-calculado em segundo plano (um por workspace)
+Uma thread mantém o ranking completo (prioritize_rows) pronto para leitura:
+- recalcula depois de escritas no banco, com debounce (uma rajada vira um único recálculo)
+- recalcula na virada do dia, porque a urgência depende da data de hoje
+As requisições leem o snapshot em O(1) enquanto a defasagem não passa de max_staleness
+"""
+
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from fastapi import Request, Response
+
+from agent_intelligence import PRIORITIZED_FIELDS
+from models import TaskWithUtility
+from serialization import RowSet, negotiate, representation, compress, build_response
+import metrics
+
+
+# Espera após a última escrita antes de recalcular
+DEBOUNCE_SECONDS = 0.25
+# Defasagem máxima (segundos desde a primeira escrita que o snapshot ainda não reflete)
+DEFAULT_MAX_STALENESS = 5.0
+# Espera antes de tentar de novo depois de um recálculo com erro
+RETRY_SECONDS = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+class RankingSnapshot:
+    """Ranking completo num instante: tuplas na ordem de PRIORITIZED_FIELDS, maior utilidade primeiro"""
+
+    __slots__ = ('rows', 'seq', 'computed_at', 'computed_on', '_bodies')
+
+    def __init__(self, rows: List[tuple], seq: int, computed_at: float, computed_on: date):
+        self.rows = rows
+        self.seq = seq                   # cresce a cada recálculo publicado
+        self.computed_at = computed_at   # time.monotonic() do início do cálculo
+        self.computed_on = computed_on
+        self._bodies: Dict[str, bytes] = {}  # lista completa já codificada, por representação
+
+    def age(self) -> float:
+        return time.monotonic() - self.computed_at
+
+    def best(self) -> Optional[TaskWithUtility]:
+        if not self.rows:
+            return None
+        return TaskWithUtility.model_construct(**dict(zip(PRIORITIZED_FIELDS, self.rows[0])))
+
+    def response(self, request: Request, limit: Optional[int] = None) -> Response:
+        """As `limit` primeiras (ou todas) no formato negociado; a lista completa é codificada uma vez"""
+        media_type, use_gzip = negotiate(request)
+        headers = {"X-Ranking-Age": f"{self.age():.3f}"}
+        if limit is not None and limit < len(self.rows):
+            body, compressed = compress(RowSet(PRIORITIZED_FIELDS, self.rows[:limit]).encode(media_type),
+                                        use_gzip)
+            return build_response(body, media_type, compressed, headers)
+
+        variant = representation(media_type, use_gzip)
+        body = self._bodies.get(variant)
+        if body is None:
+            body, _ = compress(RowSet(PRIORITIZED_FIELDS, self.rows).encode(media_type), use_gzip)
+            self._bodies[variant] = body
+        return build_response(body, media_type, body[:2] == b"\x1f\x8b", headers)
+
+
+class RankingService:
+    """
+    Thread que mantém o RankingSnapshot de um workspace
+    get() devolve None quando não há snapshot dentro da defasagem máxima: quem chama
+    calcula na hora (o mesmo acontece com ?fresh=true)
+    """
+
+    def __init__(self, agent, max_staleness: float = DEFAULT_MAX_STALENESS,
+                 debounce: float = DEBOUNCE_SECONDS):
+        self.agent = agent
+        self.max_staleness = max_staleness
+        self.debounce = debounce
+        self._cond = threading.Condition()
+        self._snapshot: Optional[RankingSnapshot] = None
+        self._dirty_since: Optional[float] = None  # primeira escrita ainda não vista pela thread
+        self._last_change: Optional[float] = None
+        self._stale_since: Optional[float] = None  # primeira escrita fora do snapshot publicado
+        self._closed = False
+        self.recomputes = 0
+        self.errors = 0
+        agent.db.subscribe(self._on_change)
+        self._thread = threading.Thread(target=self._run, name="ranking-snapshot", daemon=True)
+        self._thread.start()
+
+    def get(self) -> Optional[RankingSnapshot]:
+        with self._cond:
+            snapshot, stale_since = self._snapshot, self._stale_since
+        usable = (snapshot is not None and snapshot.computed_on == date.today()
+                  and (stale_since is None or time.monotonic() - stale_since <= self.max_staleness))
+        metrics.RANKING_SNAPSHOT_READS.inc(result="hit" if usable else "miss")
+        return snapshot if usable else None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=5)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            snapshot = self._snapshot
+            return {
+                'age': snapshot.age() if snapshot else None,
+                'stale': self._stale_since is not None,
+                'recomputes': self.recomputes,
+                'errors': self.errors,
+            }
+
+    def _on_change(self, event: str, payload):
+        now = time.monotonic()
+        with self._cond:
+            if self._dirty_since is None:
+                self._dirty_since = now
+            if self._stale_since is None:
+                self._stale_since = now
+            self._last_change = now
+            self._cond.notify()
+
+    def _next_wait(self) -> float:
+        """Segundos até o próximo recálculo (<= 0: agora)"""
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.computed_on != date.today():
+            return 0
+        if self._dirty_since is not None:
+            # Debounce, mas sem deixar uma sequência contínua de escritas passar da defasagem
+            due = min(self._last_change + self.debounce,
+                      self._dirty_since + self.max_staleness / 2)
+            return due - time.monotonic()
+        # Sem escritas o ranking só muda quando os deadlines em dias mudam: na virada do dia
+        midnight = datetime.combine(snapshot.computed_on + timedelta(days=1), datetime.min.time())
+        return (midnight - datetime.now()).total_seconds()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    wait = self._next_wait()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                if self._closed:
+                    return
+                # Escritas a partir daqui marcam de novo (podem não entrar neste cálculo)
+                self._dirty_since = self._last_change = None
+
+            started = time.monotonic()
+            try:
+                rows = self._compute()
+            except Exception:
+                logger.exception("Falha ao recalcular o ranking em segundo plano")
+                with self._cond:
+                    self.errors += 1
+                    self._cond.wait(RETRY_SECONDS)
+                    if self._dirty_since is None:
+                        self._dirty_since = self._last_change = started
+                continue
+
+            with self._cond:
+                self.recomputes += 1
+                self._snapshot = RankingSnapshot(rows, self.recomputes, started, date.today())
+                self._stale_since = self._dirty_since
+
+    @metrics.timed("ranking_snapshot")
+    def _compute(self) -> List[tuple]:
+        return self.agent.prioritize_rows(self.agent.db.get_task_table(active_only=True))
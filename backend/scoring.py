@@ -0,0 +1,121 @@
+"""
+Motor de pontuação vetorizado
+Calcula a utilidade de muitas tarefas de uma só vez usando colunas NumPy
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from models import Task
+
+
+# Ordem dos pesos na fórmula de utilidade
+WEIGHT_KEYS = (
+    'urgency_weight',
+    'importance_weight',
+    'penalty_weight',
+    'stress_weight',
+    'fun_weight',
+    'effort_weight',
+)
+
+
+class TaskColumns:
+    """Atributos numéricos das tarefas organizados em colunas (um array por campo)"""
+
+    __slots__ = ('deadline', 'importance', 'duration', 'stress', 'fun', 'penalty_late')
+
+    def __init__(self, deadline, importance, duration, stress, fun, penalty_late):
+        self.deadline = np.asarray(deadline, dtype=np.float64)
+        self.importance = np.asarray(importance, dtype=np.float64)
+        self.duration = np.asarray(duration, dtype=np.float64)
+        self.stress = np.asarray(stress, dtype=np.float64)
+        self.fun = np.asarray(fun, dtype=np.float64)
+        self.penalty_late = np.asarray(penalty_late, dtype=np.float64)
+
+    @classmethod
+    def from_tasks(cls, tasks: List[Task]) -> "TaskColumns":
+        n = len(tasks)
+        return cls(
+            np.fromiter((t.deadline for t in tasks), dtype=np.float64, count=n),
+            np.fromiter((t.importance for t in tasks), dtype=np.float64, count=n),
+            np.fromiter((t.duration for t in tasks), dtype=np.float64, count=n),
+            np.fromiter((t.stress for t in tasks), dtype=np.float64, count=n),
+            np.fromiter((t.fun for t in tasks), dtype=np.float64, count=n),
+            np.fromiter((t.penalty_late for t in tasks), dtype=np.float64, count=n),
+        )
+
+    def __len__(self) -> int:
+        return len(self.deadline)
+
+
+def utility_scores(columns: TaskColumns, weights: Dict) -> np.ndarray:
+    """
+    Utilidade (sem arredondamento) de todas as tarefas
+    Mantém a mesma ordem de operações de AgentIntelligence.calculate_utility,
+    então cada elemento é bit a bit igual ao cálculo escalar
+    """
+    urgency = 1.0 / (columns.deadline + 1.0)
+    effort = columns.duration / 10
+    penalty = np.where(columns.deadline < 2, columns.penalty_late, 0.0)
+
+    utility = urgency * weights['urgency_weight']
+    utility += columns.importance * weights['importance_weight']
+    utility += penalty * weights['penalty_weight']
+    utility += (1 - columns.stress) * weights['stress_weight']
+    utility += columns.fun * weights['fun_weight']
+    utility += (1 - effort) * weights['effort_weight']
+    return utility
+
+
+def feature_matrix(columns: TaskColumns) -> np.ndarray:
+    """
+    Termos da utilidade em uma matriz (tarefas x 6), na ordem de WEIGHT_KEYS
+    feature_matrix(columns) @ vetor_de_pesos dá a utilidade de cada tarefa
+    """
+    deadline = columns.deadline
+    return np.column_stack((
+        1.0 / (deadline + 1.0),
+        columns.importance,
+        np.where(deadline < 2, columns.penalty_late, 0.0),
+        1 - columns.stress,
+        columns.fun,
+        1 - columns.duration / 10,
+    ))
+
+
+def weight_vector(weights: Dict) -> np.ndarray:
+    return np.array([weights[key] for key in WEIGHT_KEYS], dtype=np.float64)
+
+
+def round_scores(utility: np.ndarray) -> np.ndarray:
+    """
+    Arredonda para 2 casas exatamente como round(x, 2) do Python
+    np.round só diverge em valores muito próximos de ...5, que são refeitos um a um
+    """
+    rounded = np.round(utility, 2)
+    scaled = utility * 100
+    ambiguous = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for i in ambiguous:
+        rounded[i] = round(float(utility[i]), 2)
+    return rounded
+
+
+def rank(scores: np.ndarray, limit: Optional[int] = None) -> np.ndarray:
+    """
+    Índices ordenados por score decrescente (empates mantêm a ordem original,
+    como o sort estável do Python). Com limit, usa argpartition e só ordena o top-k
+    """
+    n = len(scores)
+    if limit is None or limit >= n:
+        return np.argsort(-scores, kind='stable')
+    if limit <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    kth = np.argpartition(-scores, limit - 1)[:limit]
+    threshold = scores[kth].min()
+    # Inclui todos os empatados no limiar para desempatar pela posição original
+    candidates = np.flatnonzero(scores >= threshold)
+    order = np.argsort(-scores[candidates], kind='stable')
+    return candidates[order[:limit]]
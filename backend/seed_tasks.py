@@ -53,8 +53,8 @@ tarefas_exemplo = [
 ]
 
 print("🎯 Criando tarefas de exemplo...")
+db.bulk_create_tasks(tarefas_exemplo)
 for tarefa in tarefas_exemplo:
-    task = db.create_task(tarefa)
-    print(f"✅ Criada: {task.title}")
+    print(f"✅ Criada: {tarefa.title}")
 
 print(f"\n📊 Total de tarefas no banco: {len(db.get_all_tasks())}")
@@ -0,0 +1,136 @@
+"""
+Serialização rápida das respostas
+As linhas lidas do banco já são confiáveis (tipos garantidos pelo schema e padrões
+aplicados no SELECT), então as listas de tarefas são codificadas direto das tuplas,
+sem validar de novo pelo response_model.
+Formatos negociados com o cliente:
+- application/json (padrão): lista de objetos, como no response_model
+- application/vnd.taskmanager.columnar+json (ou ?format=columnar): um array por campo,
+  {"count": n, "data": {"id": [...], "title": [...], ...}}
+- Accept-Encoding: gzip comprime respostas a partir de GZIP_MIN_SIZE bytes
+"""
+
+import gzip
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Opcional: sem orjson usa o json da biblioteca padrão
+    orjson = None
+
+
+JSON = "application/json"
+COLUMNAR = "application/vnd.taskmanager.columnar+json"
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 5
+VARY = "X-Workspace-Id, Accept, Accept-Encoding"
+
+
+def dumps(content: Any) -> bytes:
+    """JSON compacto em UTF-8 (só tipos nativos: dict, list, str, números, None)"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class RowSet:
+    """Linhas confiáveis (tuplas alinhadas a `keys`) prontas para codificar"""
+
+    __slots__ = ('keys', 'rows')
+
+    def __init__(self, keys: Sequence[str], rows: List[tuple]):
+        self.keys = tuple(keys)
+        self.rows = rows
+
+    @classmethod
+    def from_models(cls, models: Iterable, keys: Sequence[str]) -> "RowSet":
+        return cls(keys, [tuple(getattr(model, key) for key in keys) for model in models])
+
+    def encode(self, media_type: str = JSON) -> bytes:
+        keys = self.keys
+        if media_type == COLUMNAR:
+            columns = zip(*self.rows) if self.rows else [()] * len(keys)
+            return dumps({'count': len(self.rows), 'data': dict(zip(keys, map(list, columns)))})
+        # Um dict por linha com as mesmas chaves: uma única chamada ao encoder em C
+        return dumps([dict(zip(keys, row)) for row in self.rows])
+
+
+def encode(content: Any, media_type: str = JSON) -> bytes:
+    """
+    RowSet no formato pedido; qualquer outro conteúdo sai como JSON comum
+    Conteúdo de response_model já vem convertido pelo FastAPI: o jsonable_encoder só roda
+    quando o encoder recusa algum tipo (modelos, chaves não-str, ...)
+    """
+    if isinstance(content, RowSet):
+        return content.encode(media_type)
+    try:
+        return dumps(content)
+    except TypeError:  # orjson.JSONEncodeError também é TypeError
+        return dumps(jsonable_encoder(content))
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse com orjson (quando instalado) e RowSet codificado direto das tuplas
+    Opcional, por rota (response_class=): usado nas listas de tarefas
+    """
+
+    def render(self, content: Any) -> bytes:
+        return encode(content)
+
+
+def _accepts(header: str, token: str) -> bool:
+    """token aparece no header com q > 0 (ex.: 'gzip, deflate' ou 'gzip;q=0.5')"""
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() != token:
+            continue
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def negotiate(request: Request, columnar: bool = True) -> Tuple[str, bool]:
+    """(media type, usar gzip) a partir de Accept, ?format= e Accept-Encoding"""
+    media_type = JSON
+    if columnar and (request.query_params.get("format") == "columnar"
+                     or _accepts(request.headers.get("accept", ""), COLUMNAR)):
+        media_type = COLUMNAR
+    return media_type, _accepts(request.headers.get("accept-encoding", ""), "gzip")
+
+
+def representation(media_type: str, use_gzip: bool) -> str:
+    """Sufixo que distingue as variantes no cache e na ETag"""
+    return ("col" if media_type == COLUMNAR else "json") + ("+gz" if use_gzip else "")
+
+
+def compress(body: bytes, use_gzip: bool) -> Tuple[bytes, bool]:
+    """Comprime se o cliente aceita e o corpo compensa; retorna (corpo, comprimido)"""
+    if use_gzip and len(body) >= GZIP_MIN_SIZE:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), True
+    return body, False
+
+
+def build_response(body: bytes, media_type: str, compressed: bool,
+                   headers: Optional[Dict[str, str]] = None, status_code: int = 200) -> Response:
+    headers = dict(headers or {}, Vary=VARY)
+    if compressed:
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
+
+
+def respond(request: Request, content: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Resposta negociada (JSON ou colunar, com ou sem gzip) sem cache"""
+    media_type, use_gzip = negotiate(request, columnar=isinstance(content, RowSet))
+    body, compressed = compress(encode(content, media_type), use_gzip)
+    return build_response(body, media_type, compressed, headers)
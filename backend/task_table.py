@@ -0,0 +1,151 @@
+"""
+Tabela compacta de tarefas (struct of arrays)
+Leitura em massa sem montar um Task (pydantic) por linha: as colunas usadas na pontuação
+viram arrays NumPy e as linhas brutas ficam guardadas para a hidratação sob demanda,
+só das tarefas que vão de fato para a resposta
+"""
+
+from datetime import date
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from models import Task
+from scoring import TaskColumns
+import metrics
+
+
+# Colunas lidas para montar um Task (a tabela pode ter colunas extras)
+TASK_COLUMNS = (
+    'id', 'title', 'description', 'deadline', 'importance', 'duration', 'stress',
+    'fun', 'penalty_late', 'status', 'ignored_count', 'completed_date', 'created_at', 'due_at'
+)
+_INDEX = {name: i for i, name in enumerate(TASK_COLUMNS)}
+
+
+def task_from_row(row: Sequence) -> Task:
+    """Task a partir de uma tupla na ordem de TASK_COLUMNS"""
+    return Task(
+        id=row[0],
+        title=row[1],
+        description=row[2] or "",
+        deadline=row[3],
+        importance=row[4],
+        duration=row[5],
+        stress=row[6],
+        fun=row[7],
+        penalty_late=row[8],
+        status=row[9] or "backlog",
+        ignored_count=row[10] or 0,
+        completed_date=row[11],
+        created_at=row[12],
+        due_at=row[13]
+    )
+
+
+class TaskTable:
+    """
+    Tarefas em colunas: id, status e os campos numéricos em arrays, a data de entrega
+    como datetime64 e a linha original de cada tarefa para hidratar depois
+    """
+
+    __slots__ = ('ids', 'status', 'columns', 'due_at', 'rows', 'hydrated')
+
+    def __init__(self, ids: np.ndarray, status: np.ndarray, columns: TaskColumns,
+                 due_at: np.ndarray, rows: List, hydrated: bool = False):
+        self.ids = ids
+        self.status = status
+        self.columns = columns
+        self.due_at = due_at
+        self.rows = rows
+        self.hydrated = hydrated  # rows já são Tasks
+
+    @classmethod
+    def from_rows(cls, rows: List[tuple]) -> "TaskTable":
+        """Linhas na ordem de TASK_COLUMNS (ex.: vindas de fetchmany)"""
+        if not rows:
+            return cls.empty()
+        fields = list(zip(*rows))
+
+        def numeric(name: str) -> np.ndarray:
+            return np.array(fields[_INDEX[name]], dtype=np.float64)
+
+        return cls(
+            np.array(fields[_INDEX['id']], dtype=np.int64),
+            np.array([status or "backlog" for status in fields[_INDEX['status']]]),
+            TaskColumns(numeric('deadline'), numeric('importance'), numeric('duration'),
+                        numeric('stress'), numeric('fun'), numeric('penalty_late')),
+            np.array(fields[_INDEX['due_at']], dtype='datetime64[D]'),
+            rows
+        )
+
+    @classmethod
+    def from_tasks(cls, tasks: List[Task]) -> "TaskTable":
+        """Tabela sobre Tasks já montados (a hidratação devolve os próprios objetos)"""
+        if not tasks:
+            return cls.empty()
+        return cls(
+            np.fromiter((t.id for t in tasks), dtype=np.int64, count=len(tasks)),
+            np.array([t.status for t in tasks]),
+            TaskColumns.from_tasks(tasks),
+            np.array([t.due_at for t in tasks], dtype='datetime64[D]'),
+            list(tasks),
+            hydrated=True
+        )
+
+    @classmethod
+    def empty(cls) -> "TaskTable":
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype='<U7'),
+                   TaskColumns(*([np.empty(0)] * 6)), np.empty(0, dtype='datetime64[D]'), [])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def select(self, indices: np.ndarray) -> "TaskTable":
+        """Subconjunto pelas posições (ou máscara booleana), mantendo a ordem"""
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+        c = self.columns
+        return TaskTable(
+            self.ids[indices],
+            self.status[indices],
+            TaskColumns(c.deadline[indices], c.importance[indices], c.duration[indices],
+                        c.stress[indices], c.fun[indices], c.penalty_late[indices]),
+            self.due_at[indices],
+            [self.rows[i] for i in indices.tolist()],
+            self.hydrated
+        )
+
+    def active(self) -> "TaskTable":
+        """Tarefas não concluídas"""
+        return self.select(self.status != 'done')
+
+    def due_days(self, today: Optional[date] = None) -> np.ndarray:
+        """Dias até a entrega (negativo = vencida); sem due_at, usa o deadline"""
+        today = np.datetime64(today or date.today(), 'D')
+        missing = np.isnat(self.due_at)
+        days = (self.due_at - today).astype(np.int64)
+        if missing.any():
+            days[missing] = self.columns.deadline[missing].astype(np.int64)
+        return days
+
+    def value(self, i: int, name: str):
+        """Um campo da linha i sem hidratar (ex.: id e título para respostas resumidas)"""
+        row = self.rows[i]
+        return getattr(row, name) if self.hydrated else row[_INDEX[name]]
+
+    def row(self, i: int) -> tuple:
+        """Linha i como tupla na ordem de TASK_COLUMNS"""
+        row = self.rows[i]
+        return tuple(getattr(row, name) for name in TASK_COLUMNS) if self.hydrated else row
+
+    def task(self, i: int) -> Task:
+        return self.tasks([i])[0]
+
+    def tasks(self, indices: Optional[Iterable[int]] = None) -> List[Task]:
+        """Hidrata as tarefas nas posições informadas (todas, se None)"""
+        rows = self.rows if indices is None else [self.rows[i] for i in indices]
+        if self.hydrated:
+            return list(rows)
+        metrics.record_rows(len(rows))
+        return [task_from_row(row) for row in rows]
@@ -0,0 +1,35 @@
+"""
+Rotas HTTP: validação igual em todos os caminhos de uma mesma rota
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from database import Database
+from models import TaskCreate
+from workspaces import WorkspaceManager
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # Com ranking em segundo plano: /agent/priorizar tem os três caminhos (snapshot, índice, vetorizado)
+    db = Database(str(tmp_path / "tasks.db"))
+    for i in range(3):
+        db.create_task(TaskCreate(title=f"t{i}", deadline=i, importance=0.5, duration=1.0,
+                                  stress=0.2, fun=0.5, penalty_late=0.5))
+    db.close()
+    manager = WorkspaceManager(data_dir=str(tmp_path), default_db=str(tmp_path / "tasks.db"),
+                               ranking_staleness=5.0)
+    monkeypatch.setattr(main, "workspaces", manager)
+    yield TestClient(main.app)
+    manager.close_all()
+
+
+@pytest.mark.parametrize("query", ["", "&fresh=true", "&risk_weight=1"])
+def test_priorizar_rejects_non_positive_limit(client, query):
+    for limit in (-1, 0):
+        assert client.post(f"/agent/priorizar?limit={limit}{query}").status_code == 400
+    response = client.post(f"/agent/priorizar?limit=2{query}")
+    assert response.status_code == 200
+    assert len(response.json()) == 2
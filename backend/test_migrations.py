@@ -0,0 +1,141 @@
+"""
+Migrações sobre um banco criado pela versão original (sem user_version, sem due_at)
+"""
+
+import sqlite3
+from datetime import date, timedelta
+
+from database import Database
+from migrations import LATEST_VERSION
+
+
+LEGACY_SCHEMA = """
+    CREATE TABLE tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT DEFAULT '',
+        deadline INTEGER NOT NULL,
+        importance REAL NOT NULL,
+        duration REAL NOT NULL,
+        stress REAL NOT NULL,
+        fun REAL NOT NULL,
+        penalty_late REAL NOT NULL,
+        status TEXT DEFAULT 'backlog',
+        ignored_count INTEGER DEFAULT 0,
+        completed_date TEXT,
+        created_at TEXT NOT NULL
+    );
+    CREATE TABLE user_weights (
+        id INTEGER PRIMARY KEY,
+        urgency_weight REAL DEFAULT 3.0,
+        importance_weight REAL DEFAULT 2.5,
+        penalty_weight REAL DEFAULT 2.0,
+        stress_weight REAL DEFAULT 1.0,
+        fun_weight REAL DEFAULT 0.5,
+        effort_weight REAL DEFAULT 1.5,
+        updated_at TEXT
+    );
+    INSERT INTO user_weights (id, updated_at) VALUES (1, '2024-01-01T00:00:00');
+"""
+
+
+def legacy_db(path, deadlines):
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.executemany("""
+        INSERT INTO tasks (title, deadline, importance, duration, stress, fun, penalty_late, created_at)
+        VALUES (?, ?, 0.5, 2.0, 0.3, 0.5, 0.5, '2024-01-01T00:00:00')
+    """, [(f"t{deadline}", deadline) for deadline in deadlines])
+    conn.commit()
+    conn.close()
+
+
+def test_legacy_db_with_negative_deadline(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    legacy_db(path, [-2, 0, 3])
+
+    db = Database(path)
+    tasks = {task.title: task for task in db.get_all_tasks()}
+    db.close()
+
+    today = date.today()
+    assert tasks["t-2"].due_at == (today - timedelta(days=2)).isoformat()
+    assert tasks["t-2"].deadline == 0  # vencida: o prazo lido não fica negativo
+    assert tasks["t0"].due_at == today.isoformat()
+    assert tasks["t3"].due_at == (today + timedelta(days=3)).isoformat()
+    assert tasks["t3"].deadline == 3
+
+
+def test_legacy_rollup_has_no_undated_day(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    legacy_db(path, [-2, 3])
+
+    db = Database(path)
+    with db.connection() as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        days = [row[0] for row in conn.execute("SELECT day FROM timeline_rollup ORDER BY day")]
+    db.close()
+
+    assert version == LATEST_VERSION
+    assert None not in days
+    assert len(days) == 2
+
+
+def test_null_status_counts_as_backlog(tmp_path):
+    """Linhas antigas com status NULL são lidas como 'backlog' (ativas) em todas as consultas"""
+    path = str(tmp_path / "legacy.db")
+    legacy_db(path, [1, 3])
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE tasks SET status = NULL WHERE title = 't1'")
+    conn.commit()
+    conn.close()
+
+    db = Database(path)
+    summary = db.get_status_summary()
+    backlog = [task.title for task in db.get_tasks_by_status("backlog")]
+    due = [task.title for task in db.get_tasks_due_between(None, None)]
+    with db.connection() as conn:
+        rollup = conn.execute("SELECT SUM(task_count) FROM timeline_rollup").fetchone()[0]
+    db.close()
+
+    assert summary["backlog"]["count"] == 2
+    assert None not in summary
+    assert sorted(backlog) == ["t1", "t3"]
+    assert sorted(due) == ["t1", "t3"]
+    assert rollup == 2
+
+
+def test_null_status_rows_in_active_table(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    legacy_db(path, [1, 3])
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE tasks SET status = NULL WHERE title = 't1'")
+    conn.commit()
+    conn.close()
+
+    db = Database(path)
+    active = db.get_task_table(active_only=True)
+    backlog = db.get_task_rows(status="backlog")
+    db.close()
+
+    assert len(active) == 2
+    assert len(backlog) == 2
+
+
+def test_search_by_backlog_includes_null_status(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    legacy_db(path, [1, 3])
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE tasks SET status = NULL WHERE title = 't1'")
+    conn.commit()
+    conn.close()
+
+    db = Database(path)
+    hits, total = db.search_tasks("t1", ["backlog"])
+    both, _ = db.search_tasks("t1", ["doing", "backlog"])
+    none, _ = db.search_tasks("t1", ["doing"])
+    db.close()
+
+    assert total == 1 and [task.title for task, _, _ in hits] == ["t1"]
+    assert len(both) == 1
+    assert none == []
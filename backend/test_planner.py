@@ -0,0 +1,114 @@
+"""
+Planejador: capacidade diária, prazos viáveis cumpridos e inviáveis sinalizados
+"""
+
+import random
+
+import pytest
+
+from planner import EPS, build_plan
+
+
+def random_instance(seed, n=60, horizon=10):
+    rng = random.Random(seed)
+    durations = [round(rng.uniform(0.5, 8), 1) for _ in range(n)]
+    dues = [rng.randint(0, horizon + 5) for _ in range(n)]  # parte fora do horizonte
+    utilities = [round(rng.uniform(0, 10), 2) for _ in range(n)]
+    capacities = [rng.choice([0.0, 4.0, 6.0, 8.0]) for _ in range(horizon)]
+    return durations, dues, utilities, capacities
+
+
+@pytest.mark.parametrize("allow_split", [True, False])
+@pytest.mark.parametrize("seed", range(20))
+def test_capacity_and_feasible_deadlines(seed, allow_split):
+    durations, dues, utilities, capacities = random_instance(seed)
+    plan = build_plan(durations, dues, utilities, capacities, allow_split)
+    horizon = len(capacities)
+
+    # Nenhum dia passa da capacidade
+    for day, entries in enumerate(plan.days):
+        assert sum(entries.values()) <= capacities[day] + 1e-6
+
+    # Horas planejadas + restantes = duração
+    planned = [0.0] * len(durations)
+    for entries in plan.days:
+        for i, hours in entries.items():
+            planned[i] += hours
+    for i, duration in enumerate(durations):
+        assert planned[i] + plan.remaining[i] == pytest.approx(duration)
+
+    # O conjunto mantido cabe na capacidade acumulada até cada prazo (EDF)
+    infeasible = set(plan.infeasible)
+    for day in range(horizon):
+        demand = sum(durations[i] for i in range(len(durations))
+                     if dues[i] <= day and i not in infeasible)
+        assert demand <= sum(capacities[:day + 1]) + 1e-6
+
+    # Todo prazo viável dentro do horizonte é cumprido
+    for i, due in enumerate(dues):
+        if due < horizon and i not in infeasible:
+            assert plan.finish_day[i] is not None and plan.finish_day[i] <= due
+            assert plan.remaining[i] <= EPS
+
+    # Só tarefas com prazo no horizonte podem ser inviáveis
+    assert all(dues[i] < horizon for i in plan.infeasible)
+
+    # Sem divisão, toda tarefa que cabe em um dia é feita em um único dia
+    if not allow_split:
+        largest_day = max(capacities)
+        for i, duration in enumerate(durations):
+            if duration <= largest_day:
+                assert sum(i in entries for entries in plan.days) <= 1
+
+
+def test_overloaded_deadline_drops_lowest_utility_per_hour():
+    # Dois prazos hoje somando 8h com 6h de capacidade: sai a de menor utilidade por hora
+    plan = build_plan([4.0, 4.0], [0, 0], [8.0, 2.0], [6.0, 6.0])
+    assert plan.infeasible == [1]
+    assert plan.finish_day[0] == 0
+    assert sum(plan.days[0].values()) == pytest.approx(6.0)
+
+
+def test_free_capacity_goes_to_highest_utility():
+    # Sem prazos no horizonte, o primeiro dia é preenchido por utilidade
+    plan = build_plan([3.0, 3.0, 3.0], [10, 10, 10], [1.0, 5.0, 3.0], [6.0, 6.0])
+    assert plan.days[0] == {1: 3.0, 2: 3.0}
+    assert plan.days[1] == {0: 3.0}
+    assert plan.infeasible == []
+
+
+def test_deadline_work_takes_priority_over_utility():
+    # A tarefa de baixa utilidade com prazo amanhã precisa de parte de hoje (ALAP)
+    plan = build_plan([10.0, 8.0], [1, 10], [1.0, 9.0], [8.0, 8.0])
+    assert plan.infeasible == []
+    assert plan.finish_day[0] == 1
+    assert plan.days[0][0] == pytest.approx(2.0)  # só o mínimo hoje; o resto vai para a utilidade
+    assert plan.days[0][1] == pytest.approx(6.0)
+
+
+def test_without_split_tasks_are_not_broken_across_days():
+    plan = build_plan([5.0, 5.0, 2.0], [10, 10, 10], [9.0, 8.0, 1.0], [6.0, 6.0],
+                      allow_split=False)
+    assert plan.days[0] == {0: 5.0}
+    assert plan.days[1] == {1: 5.0}
+    assert plan.remaining[2] == 2.0
+
+
+def test_without_split_deadline_tasks_are_whole_blocks():
+    plan = build_plan([5.0, 5.0, 2.0], [1, 1, 10], [1.0, 2.0, 9.0], [6.0, 6.0], allow_split=False)
+    assert plan.infeasible == []
+    assert plan.days == [{1: 5.0}, {0: 5.0}]
+    assert plan.remaining[2] == 2.0
+
+    plan = build_plan([4.0, 4.0, 4.0], [2, 2, 2], [1.0, 1.0, 1.0], [6.0, 6.0, 6.0], False)
+    assert plan.infeasible == []
+    assert sorted(len(entries) for entries in plan.days) == [1, 1, 1]
+    assert all(hours == 4.0 for entries in plan.days for hours in entries.values())
+
+
+def test_without_split_deadline_that_fits_only_in_parts_is_infeasible():
+    # 8h de prazo até amanhã cabem em 2 x 6h só dividindo: sem divisão, é inviável
+    plan = build_plan([4.0, 4.0, 4.0], [1, 1, 1], [3.0, 2.0, 1.0], [6.0, 6.0], allow_split=False)
+    assert plan.infeasible == [2]
+    assert plan.finish_day[0] is not None and plan.finish_day[1] is not None
+    assert all(len(entries) == 1 for entries in plan.days)
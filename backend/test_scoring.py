@@ -0,0 +1,100 @@
+"""
+Pontuação vetorizada: bit a bit igual ao cálculo escalar de AgentIntelligence
+"""
+
+import random
+
+import numpy as np
+
+from agent_intelligence import AgentIntelligence
+from database import Database
+from models import Task, TaskCreate
+from scoring import TaskColumns, feature_matrix, rank, round_scores, utility_scores, weight_vector
+
+
+DEFAULT_WEIGHTS = {
+    'urgency_weight': 3.0,
+    'importance_weight': 2.5,
+    'penalty_weight': 2.0,
+    'stress_weight': 1.0,
+    'fun_weight': 0.5,
+    'effort_weight': 1.5,
+}
+
+
+def random_tasks(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        Task(id=i + 1, title=f"t{i}", deadline=rng.randint(0, 30), importance=rng.random(),
+             duration=round(rng.uniform(0.1, 12), 1), stress=rng.random(), fun=rng.random(),
+             penalty_late=rng.random(), created_at="2024-01-01T00:00:00")
+        for i in range(n)
+    ]
+
+
+def random_weights(seed):
+    rng = random.Random(seed)
+    return {key: rng.uniform(0, 5) for key in DEFAULT_WEIGHTS}
+
+
+def test_vectorized_scores_match_scalar_bit_for_bit():
+    agent = AgentIntelligence(db=None)
+    tasks = random_tasks(5000)
+    columns = TaskColumns.from_tasks(tasks)
+    for weights in [DEFAULT_WEIGHTS, agent.adjust_weights_for_high_stress(DEFAULT_WEIGHTS)] + \
+            [random_weights(seed) for seed in range(5)]:
+        vectorized = round_scores(utility_scores(columns, weights)).tolist()
+        scalar = [agent.calculate_utility(task, weights) for task in tasks]
+        assert vectorized == scalar
+
+
+def test_penalty_applies_only_below_two_days():
+    agent = AgentIntelligence(db=None)
+    tasks = [Task(id=d + 1, title="t", deadline=d, importance=0.5, duration=2.0, stress=0.5,
+                  fun=0.5, penalty_late=1.0, created_at="2024-01-01T00:00:00") for d in range(4)]
+    vectorized = round_scores(utility_scores(TaskColumns.from_tasks(tasks), DEFAULT_WEIGHTS)).tolist()
+    assert vectorized == [agent.calculate_utility(task, DEFAULT_WEIGHTS) for task in tasks]
+
+
+def test_round_scores_matches_python_round_on_halfway_values():
+    values = np.array([0.125, 0.135, 2.675, 1.005, 1.015, -0.125, 3.0049999999, 7.995])
+    assert round_scores(values).tolist() == [round(float(v), 2) for v in values]
+
+
+def test_feature_matrix_reproduces_utility():
+    tasks = random_tasks(500, seed=1)
+    columns = TaskColumns.from_tasks(tasks)
+    weights = random_weights(7)
+    np.testing.assert_allclose(feature_matrix(columns) @ weight_vector(weights),
+                               utility_scores(columns, weights), rtol=0, atol=1e-12)
+
+
+def test_rank_matches_stable_sort():
+    scores = round_scores(utility_scores(TaskColumns.from_tasks(random_tasks(2000, seed=2)),
+                                         DEFAULT_WEIGHTS))
+    expected = sorted(range(len(scores)), key=lambda i: -scores[i])
+    assert rank(scores).tolist() == expected
+    for limit in (0, 1, 10, 137, 2000, 5000):
+        assert rank(scores, limit).tolist() == expected[:limit]
+
+
+def test_index_matches_full_ranking_after_feedback_steps(tmp_path):
+    db = Database(str(tmp_path / "tasks.db"))
+    agent = AgentIntelligence(db, use_index=True)
+    db.bulk_create_tasks([
+        TaskCreate(title=task.title, deadline=task.deadline, importance=task.importance,
+                   duration=task.duration, stress=task.stress, fun=task.fun,
+                   penalty_late=task.penalty_late)
+        for task in random_tasks(300, seed=3)
+    ])
+    rng = random.Random(4)
+    start = db.get_user_weights()
+
+    for _ in range(40):
+        # Cada passo de SGD muda os pesos: o índice tem de seguir o ranking completo
+        agent.record_feedback(rng.choice(['accepted', 'completed', 'ignored']), rng.randint(1, 300))
+        top = agent.top_tasks(20)
+        expected = agent.prioritize_tasks(db.get_task_table(active_only=True), limit=20)
+        assert [(t.id, t.utility) for t in top] == [(t.id, t.utility) for t in expected]
+    assert db.get_user_weights() != start
+    db.close()
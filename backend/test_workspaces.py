@@ -0,0 +1,68 @@
+"""
+LRU de workspaces: um workspace reservado não é fechado nem aberto duas vezes
+"""
+
+import time
+from datetime import date, datetime, timedelta
+
+from models import TaskCreate
+from workspaces import WorkspaceManager
+
+
+def make_manager(tmp_path):
+    return WorkspaceManager(data_dir=str(tmp_path), capacity=1, default_db=str(tmp_path / "default.db"))
+
+
+def test_evicted_workspace_stays_open_while_reserved(tmp_path):
+    manager = make_manager(tmp_path)
+    alice = manager.get("alice", reserve=True)
+    manager.get("bob")  # passa da capacidade: alice sai do LRU
+
+    # A requisição em andamento continua escrevendo
+    alice.db.create_task(TaskCreate(title="t", deadline=1, importance=0.5, duration=1.0,
+                                    stress=0.2, fun=0.5, penalty_late=0.5))
+    assert manager.stats()['draining'] == 1
+
+    assert manager.release(alice) is True
+    alice.close()
+    assert manager.stats()['draining'] == 0
+    manager.close_all()
+
+
+def test_reopening_a_draining_workspace_reuses_it(tmp_path):
+    manager = make_manager(tmp_path)
+    alice = manager.get("alice", reserve=True)
+    manager.get("bob")
+
+    again = manager.get("alice", reserve=True)
+    assert again is alice  # um único Database (e índice) por arquivo
+    assert [ws.id for ws in manager.open_workspaces()] == ["alice"]
+
+    assert manager.release(alice) is False
+    assert manager.release(again) is False  # de volta ao LRU: não fecha
+    manager.close_all()
+
+
+def test_open_workspace_archives_again_after_midnight(tmp_path):
+    manager = WorkspaceManager(data_dir=str(tmp_path), default_db=str(tmp_path / "default.db"),
+                               archive_after_days=30)
+    workspace = manager.get()
+    task = workspace.db.create_task(TaskCreate(title="t", deadline=1, importance=0.5, duration=1.0,
+                                               stress=0.2, fun=0.5, penalty_late=0.5))
+    # Concluída há 31 dias: passou do prazo com o workspace aberto
+    with workspace.db.connection() as conn:
+        conn.execute("UPDATE tasks SET status = 'done', completed_date = ? WHERE id = ?",
+                     ((datetime.now() - timedelta(days=31)).isoformat(), task.id))
+
+    archiver = workspace.archiver
+    with archiver._cond:  # como se a última passada tivesse sido ontem
+        archiver._archived_on = date.today() - timedelta(days=1)
+        archiver._cond.notify()
+
+    deadline = time.monotonic() + 5
+    while workspace.db.get_task_by_id(task.id) is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert workspace.db.get_task_by_id(task.id) is None
+    assert workspace.db.get_archive_summary()['count'] == 1
+    assert archiver.runs == 2
+    manager.close_all()
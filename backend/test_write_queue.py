@@ -0,0 +1,175 @@
+"""
+Fila de escrita: isolamento por SAVEPOINT, notificação depois do commit e recuperação da thread
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+import metrics
+from agent_intelligence import AgentIntelligence
+from database import Database
+from models import TaskCreate, TaskUpdate
+from write_queue import WriteQueue
+
+
+def make_queue(path, **kwargs):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE items (name TEXT UNIQUE)")
+    conn.commit()
+    conn.close()
+    return WriteQueue(lambda: sqlite3.connect(path, check_same_thread=False), **kwargs)
+
+
+def names(path):
+    conn = sqlite3.connect(path)
+    try:
+        return sorted(row[0] for row in conn.execute("SELECT name FROM items"))
+    finally:
+        conn.close()
+
+
+def insert(name):
+    return lambda conn: conn.execute("INSERT INTO items (name) VALUES (?)", (name,)).lastrowid
+
+
+def test_failed_write_is_rolled_back_alone(tmp_path):
+    path = str(tmp_path / "q.db")
+    queue = make_queue(path, window=0.05)
+
+    def partial(conn):
+        conn.execute("INSERT INTO items (name) VALUES ('partial')")
+        conn.execute("INSERT INTO items (name) VALUES ('a')")  # UNIQUE: desfaz a escrita inteira
+
+    futures = [queue.submit(insert("a")), queue.submit(partial), queue.submit(insert("b"))]
+    queue.close()
+
+    assert futures[0].result() == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[1].result()
+    assert futures[2].result() == 2
+    assert names(path) == ["a", "b"]
+    assert queue.stats()['failed'] == 1
+
+
+def test_after_runs_once_committed_and_before_result(tmp_path):
+    path = str(tmp_path / "q.db")
+    queue = make_queue(path)
+    seen = []
+
+    def after(rowid):
+        # Outra conexão já enxerga a escrita: o commit veio antes da notificação
+        seen.append((rowid, names(path)))
+
+    future = queue.submit(insert("a"), after)
+    assert future.result(timeout=5) == 1
+    assert seen == [(1, ["a"])]
+    queue.close()
+
+
+def test_failing_after_fails_only_its_future(tmp_path):
+    path = str(tmp_path / "q.db")
+    queue = make_queue(path)
+
+    def after(_):
+        raise ValueError("listener")
+
+    failed = queue.submit(insert("a"), after)
+    with pytest.raises(ValueError):
+        failed.result(timeout=5)
+    assert queue.submit(insert("b")).result(timeout=5) == 2
+    queue.close()
+    assert names(path) == ["a", "b"]
+
+
+def test_submit_after_close_raises(tmp_path):
+    queue = make_queue(str(tmp_path / "q.db"))
+    queue.close()
+    with pytest.raises(RuntimeError):
+        queue.submit(insert("a"))
+
+
+def test_writer_restarts_after_connect_error(tmp_path):
+    path = str(tmp_path / "q.db")
+    queue = make_queue(path)
+    connect = queue.connect
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError("unable to open database file")
+        return connect()
+
+    queue.connect = flaky
+    with pytest.raises(sqlite3.OperationalError):
+        queue.submit(insert("a")).result(timeout=5)
+
+    assert queue.submit(insert("b")).result(timeout=5) == 1
+    queue.close()
+    assert names(path) == ["b"]
+    assert len(attempts) == 2
+
+
+class BrokenRollback(sqlite3.Connection):
+    """COMMIT e ROLLBACK falham: a conexão fica inutilizável"""
+
+    def execute(self, sql, *args):
+        if sql in ("COMMIT", "ROLLBACK"):
+            raise sqlite3.OperationalError("disk I/O error")
+        return super().execute(sql, *args)
+
+
+def test_writer_restarts_after_failed_rollback(tmp_path):
+    path = str(tmp_path / "q.db")
+    queue = make_queue(path)
+    connect = queue.connect
+    broken = threading.Event()
+
+    def connect_once_broken():
+        if not broken.is_set():
+            broken.set()
+            return sqlite3.connect(path, check_same_thread=False, factory=BrokenRollback)
+        return connect()
+
+    queue.connect = connect_once_broken
+    with pytest.raises(sqlite3.OperationalError):
+        queue.submit(insert("a")).result(timeout=5)
+
+    assert queue.submit(insert("b")).result(timeout=5) == 1
+    queue.close()
+    assert names(path) == ["b"]
+
+
+def test_writes_do_not_wait_for_index_lock(tmp_path):
+    """O listener do índice só enfileira: uma consulta longa não segura a thread escritora"""
+    db = Database(str(tmp_path / "tasks.db"))
+    agent = AgentIntelligence(db, use_index=True)
+    task = TaskCreate(title="t", deadline=1, importance=0.5, duration=1.0, stress=0.2,
+                      fun=0.5, penalty_late=0.5)
+    agent.top_tasks(1)
+
+    with agent.index._lock:  # como uma consulta repontuando o backlog
+        created = db.submit_create_task(task).result(timeout=5)
+    assert [t.id for t in agent.top_tasks(1)] == [created.id]
+    db.close()
+
+
+def test_queued_write_counts_for_the_submitting_request(tmp_path):
+    """O PATCH roda na thread escritora, mas os comandos contam no Server-Timing da requisição"""
+    db = Database(str(tmp_path / "tasks.db"))
+    created = db.create_task(TaskCreate(title="t", deadline=1, importance=0.5, duration=1.0,
+                                        stress=0.2, fun=0.5, penalty_late=0.5))
+
+    stats = metrics.RequestStats()
+    token = metrics._current.set(stats)
+    try:
+        updated = db.submit_update_task(created.id, TaskUpdate(status="doing")).result(timeout=5)
+    finally:
+        metrics._current.reset(token)
+    assert updated.status == "doing"
+    assert stats.sql_statements >= 1
+    assert stats.connections == 1
+    assert f'sql;desc="{stats.sql_statements} comandos"' in metrics.server_timing(stats, 0.0)
+    db.close()
@@ -0,0 +1,141 @@
+"""
+Análise de sensibilidade dos pesos
+Pontua todas as tarefas ativas contra muitos vetores de pesos de uma vez
+(produto matricial tarefas x pesos) e resume o quanto o ranking muda
+"""
+
+import itertools
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from scoring import WEIGHT_KEYS, weight_vector
+
+
+MAX_VECTORS = 5000
+MAX_GRID_STEPS = 4
+# Vetores processados por bloco (limita a memória em n x CHUNK)
+CHUNK = 128
+
+
+def random_vectors(base: Dict, samples: int, spread: float, seed: Optional[int] = None) -> np.ndarray:
+    """Amostras multiplicativas (lognormais) em torno dos pesos base: (samples x 6)"""
+    rng = np.random.default_rng(seed)
+    factors = np.exp(rng.normal(0.0, spread, size=(samples, len(WEIGHT_KEYS))))
+    return weight_vector(base) * factors
+
+
+def grid_vectors(base: Dict, steps: int, spread: float) -> np.ndarray:
+    """Grade completa de fatores entre (1 - spread) e (1 + spread) por peso: (steps^6 x 6)"""
+    factors = np.linspace(1 - spread, 1 + spread, steps)
+    grid = np.array(list(itertools.product(factors, repeat=len(WEIGHT_KEYS))))
+    return np.maximum(0.0, weight_vector(base) * grid)
+
+
+def _ranks(scores: np.ndarray) -> np.ndarray:
+    """Posição (0 = melhor) de cada tarefa em cada coluna; empates pela ordem original"""
+    order = np.argsort(-scores, axis=0, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(scores.shape[0])[:, None], axis=0)
+    return ranks
+
+
+def sweep(features: np.ndarray, vectors: np.ndarray, baseline_scores: np.ndarray,
+          top_k: int = 10) -> Dict:
+    """
+    features: (n x 6), vectors: (m x 6), baseline_scores: (n,) utilidade com os pesos atuais
+    Os scores são arredondados em 2 casas, como na priorização, antes de ordenar
+    Retorna estatísticas agregadas; a memória usada é O(n x CHUNK)
+    """
+    if top_k < 1:
+        raise ValueError("top_k deve ser pelo menos 1")
+    n = features.shape[0]
+    m = vectors.shape[0]
+    top_k = min(top_k, n)
+
+    base_rank = _ranks(baseline_scores[:, None])[:, 0]
+    base_top = np.flatnonzero(base_rank < top_k)
+    base_top = base_top[np.argsort(base_rank[base_top])]
+    in_base_top = base_rank < top_k
+
+    spearman = np.empty(m)
+    overlap = np.empty(m)
+    top1_counts = np.zeros(n, dtype=np.int64)
+    rank_sum = np.zeros(n)
+    rank_sq_sum = np.zeros(n)
+    best_rank = np.full(n, n, dtype=np.int64)
+    worst_rank = np.zeros(n, dtype=np.int64)
+
+    for start in range(0, m, CHUNK):
+        block = vectors[start:start + CHUNK]
+        ranks = _ranks(np.round(features @ block.T, 2))  # (n x bloco)
+
+        # Correlação de Spearman com o ranking de referência
+        d = (ranks - base_rank[:, None]).astype(np.float64)
+        if n > 1:
+            spearman[start:start + len(block)] = 1 - 6 * (d * d).sum(axis=0) / (n * (n * n - 1))
+        else:
+            spearman[start:start + len(block)] = 1.0
+
+        top_mask = ranks < top_k
+        overlap[start:start + len(block)] = (top_mask & in_base_top[:, None]).sum(axis=0) / max(top_k, 1)
+
+        top1_counts += np.bincount(np.argmin(ranks, axis=0), minlength=n)
+        rank_sum += ranks.sum(axis=1)
+        rank_sq_sum += (ranks.astype(np.float64) ** 2).sum(axis=1)
+        best_rank = np.minimum(best_rank, ranks.min(axis=1))
+        worst_rank = np.maximum(worst_rank, ranks.max(axis=1))
+
+    mean_rank = rank_sum / m
+    rank_std = np.sqrt(np.maximum(0.0, rank_sq_sum / m - mean_rank ** 2))
+    winners = np.flatnonzero(top1_counts)
+    winners = winners[np.argsort(-top1_counts[winners], kind='stable')]
+
+    return {
+        'baseline_top': base_top.tolist(),
+        'rank_stability': {
+            'spearman_mean': float(spearman.mean()),
+            'spearman_min': float(spearman.min()),
+            'spearman_p10': float(np.percentile(spearman, 10)),
+        },
+        'top_k_overlap': {
+            'mean': float(overlap.mean()),
+            'min': float(overlap.min()),
+        },
+        'top1': [(int(i), int(top1_counts[i])) for i in winners],
+        'baseline_top_ranks': [
+            {
+                'index': int(i),
+                'baseline_rank': int(base_rank[i]) + 1,
+                'mean_rank': float(mean_rank[i]) + 1,
+                'rank_std': float(rank_std[i]),
+                'best_rank': int(best_rank[i]) + 1,
+                'worst_rank': int(worst_rank[i]) + 1,
+            }
+            for i in base_top
+        ],
+    }
+
+
+def build_vectors(mode: str, base: Dict, weights: Optional[List[Dict]] = None,
+                  samples: int = 100, steps: int = 3, spread: float = 0.2,
+                  seed: Optional[int] = None) -> np.ndarray:
+    """Monta os vetores do sweep conforme o modo (explicit, random ou grid)"""
+    if mode == 'explicit':
+        if not weights:
+            raise ValueError("Informe ao menos um vetor de pesos")
+        vectors = np.array([weight_vector(w) for w in weights])
+    elif mode == 'random':
+        if not 1 <= samples <= MAX_VECTORS:
+            raise ValueError(f"samples deve estar entre 1 e {MAX_VECTORS}")
+        vectors = random_vectors(base, samples, spread, seed)
+    elif mode == 'grid':
+        if not 2 <= steps <= MAX_GRID_STEPS:
+            raise ValueError(f"steps deve estar entre 2 e {MAX_GRID_STEPS}")
+        vectors = grid_vectors(base, steps, spread)
+    else:
+        raise ValueError("mode deve ser explicit, random ou grid")
+
+    if len(vectors) == 0 or len(vectors) > MAX_VECTORS:
+        raise ValueError(f"Número de vetores deve estar entre 1 e {MAX_VECTORS}")
+    return vectors
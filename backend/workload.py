@@ -0,0 +1,70 @@
+"""
+Gerador de carga sintética
+Produz tarefas com distribuições realistas (prazos concentrados nos próximos dias,
+durações assimétricas, maioria das tarefas concluídas) de forma reprodutível pela semente
+"""
+
+import random
+from datetime import date, timedelta
+from typing import Iterator, List, Optional
+
+from models import TaskCreate
+from database import Database
+
+
+# Proporção de cada status em um quadro "vivo"
+STATUS_WEIGHTS = (('backlog', 0.45), ('doing', 0.10), ('done', 0.45))
+
+_VERBS = ("Implementar", "Revisar", "Corrigir", "Estudar", "Documentar", "Testar",
+          "Refatorar", "Planejar", "Apresentar", "Escrever")
+_SUBJECTS = ("API de tarefas", "dashboard", "testes unitários", "relatório", "migração do banco",
+             "tela de login", "algoritmos", "pipeline de deploy", "sprint review", "documentação")
+
+
+def _clamp(value: float, low: float, high: float) -> float:
+    return max(low, min(high, value))
+
+
+def generate_task(rng: random.Random, today: Optional[date] = None) -> TaskCreate:
+    """Uma tarefa sintética usando o gerador informado"""
+    today = today or date.today()
+    statuses, weights = zip(*STATUS_WEIGHTS)
+    status = rng.choices(statuses, weights)[0]
+
+    # Prazos: maioria nas próximas duas semanas, cauda longa até ~3 meses
+    deadline = min(int(rng.expovariate(1 / 7)), 90)
+    # Durações: lognormal em torno de ~2h, entre 15 min e 16h
+    duration = round(_clamp(rng.lognormvariate(0.7, 0.8), 0.25, 16), 2)
+
+    return TaskCreate(
+        title=f"{rng.choice(_VERBS)} {rng.choice(_SUBJECTS)} #{rng.randrange(10000)}",
+        description=rng.choice(("", "Detalhes na issue", "Combinar com o time antes de começar")),
+        due_at=today + timedelta(days=deadline),
+        importance=round(rng.betavariate(2, 2), 2),
+        duration=duration,
+        stress=round(rng.betavariate(2, 3), 2),
+        fun=round(rng.betavariate(2, 2), 2),
+        penalty_late=round(rng.betavariate(2, 2), 2),
+        status=status
+    )
+
+
+def generate_tasks(count: int, seed: int = 42, today: Optional[date] = None) -> Iterator[TaskCreate]:
+    """`count` tarefas sintéticas; a mesma semente gera sempre a mesma sequência"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield generate_task(rng, today)
+
+
+def populate(db: Database, count: int, seed: int = 42, chunk_size: int = 10000) -> List[int]:
+    """Insere `count` tarefas sintéticas em blocos e retorna os ids criados"""
+    ids: List[int] = []
+    chunk: List[TaskCreate] = []
+    for task in generate_tasks(count, seed):
+        chunk.append(task)
+        if len(chunk) >= chunk_size:
+            ids.extend(db.bulk_create_tasks(chunk))
+            chunk = []
+    if chunk:
+        ids.extend(db.bulk_create_tasks(chunk))
+    return ids
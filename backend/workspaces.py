@@ -0,0 +1,257 @@
+"""
+Workspaces (multi-tenant)
+Cada workspace tem seu próprio arquivo SQLite, com tarefas e pesos adaptativos próprios.
+O servidor mantém abertos apenas os workspaces usados mais recentemente (LRU).
+Um workspace reservado por requisições em andamento só é fechado quando a última termina.
+"""
+
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from database import Database
+from async_database import AsyncDatabase
+from agent_intelligence import AgentIntelligence
+from http_cache import ResponseCache
+from ranking_snapshot import RankingService
+
+
+DEFAULT_WORKSPACE = "default"
+
+_WORKSPACE_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+# Espera antes de tentar de novo depois de um arquivamento com erro
+ARCHIVE_RETRY_SECONDS = 60.0
+
+logger = logging.getLogger(__name__)
+
+
+class DailyArchiver:
+    """
+    Arquiva as concluídas antigas ao abrir o workspace e depois a cada virada do dia,
+    enquanto ele continuar aberto (o workspace padrão nunca sai do LRU)
+    """
+
+    def __init__(self, db: Database, older_than_days: int):
+        self.db = db
+        self.older_than_days = older_than_days
+        self._cond = threading.Condition()
+        self._closed = False
+        self._archived_on: Optional[date] = None
+        self.runs = 0
+        self.errors = 0
+        # Concluídas antigas saem do conjunto ativo antes do primeiro uso
+        self.archive()
+        self._thread = threading.Thread(target=self._run, name="daily-archive", daemon=True)
+        self._thread.start()
+
+    def archive(self) -> int:
+        archived = self.db.archive_done_tasks(self.older_than_days)
+        with self._cond:
+            self._archived_on = date.today()
+            self.runs += 1
+        return len(archived)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=5)
+
+    def _next_wait(self) -> float:
+        """Segundos até a próxima passada: a meia-noite depois da última"""
+        midnight = datetime.combine(self._archived_on + timedelta(days=1), datetime.min.time())
+        return (midnight - datetime.now()).total_seconds()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    wait = self._next_wait()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                if self._closed:
+                    return
+            try:
+                self.archive()
+            except Exception:
+                logger.exception("Falha ao arquivar as tarefas concluídas")
+                with self._cond:
+                    self.errors += 1
+                    self._cond.wait(ARCHIVE_RETRY_SECONDS)
+
+
+class Workspace:
+    """Banco e agente (com caches quentes) de um tenant"""
+
+    def __init__(self, workspace_id: str, db: Database, ranking_staleness: Optional[float] = None,
+                 archive_after_days: int = 0):
+        self.id = workspace_id
+        self.db = db
+        self.users = 0  # reservas em andamento (controladas pelo WorkspaceManager)
+        self.adb = AsyncDatabase(db)
+        self.agent = AgentIntelligence(db, use_index=True)
+        self.response_cache = ResponseCache()
+        # Ranking recalculado em segundo plano (opcional)
+        self.ranking = (RankingService(self.agent, max_staleness=ranking_staleness)
+                        if ranking_staleness is not None else None)
+        # Arquivamento diário das concluídas antigas (0 = desligado)
+        self.archiver = (DailyArchiver(db, archive_after_days)
+                         if archive_after_days > 0 else None)
+
+    def close(self):
+        if self.archiver is not None:
+            self.archiver.close()
+        if self.ranking is not None:
+            self.ranking.close()
+        self.db.close()
+
+
+class WorkspaceManager:
+    """
+    LRU limitado de workspaces abertos
+    Ao passar da capacidade, o workspace menos usado sai do LRU e é fechado (pool e caches
+    liberados); se ainda estiver reservado, o fechamento espera o último release().
+    Enquanto isso, pedir o mesmo workspace o devolve ao LRU: nunca há dois Database abertos
+    no mesmo arquivo
+    """
+
+    def __init__(self, data_dir: str = "workspaces", capacity: int = 64,
+                 default_db: str = "tasks.db", pool_size: int = 4, archive_after_days: int = 0,
+                 ranking_staleness: Optional[float] = None, write_window: float = 0.0):
+        self.data_dir = data_dir
+        self.capacity = capacity
+        self.default_db = default_db
+        self.pool_size = pool_size
+        self.archive_after_days = archive_after_days  # 0 = não arquiva automaticamente
+        self.ranking_staleness = ranking_staleness  # None = sem ranking em segundo plano
+        self.write_window = write_window
+        self._open: "OrderedDict[str, Workspace]" = OrderedDict()
+        # Fora do LRU mas ainda reservados: fecham no último release()
+        self._draining: Dict[str, Workspace] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def path_for(self, workspace_id: str) -> str:
+        """Arquivo do workspace; o padrão continua usando o tasks.db original"""
+        if not _WORKSPACE_ID.match(workspace_id):
+            raise ValueError("Workspace inválido (use letras, números, '-' ou '_')")
+        if workspace_id == DEFAULT_WORKSPACE:
+            return self.default_db
+        return os.path.join(self.data_dir, f"{workspace_id}.db")
+
+    def get_cached(self, workspace_id: str, reserve: bool = False) -> Optional[Workspace]:
+        """Retorna o workspace só se já estiver no LRU (não faz I/O)"""
+        with self._lock:
+            workspace = self._open.get(workspace_id)
+            if workspace is not None:
+                self._open.move_to_end(workspace_id)
+                self._hits += 1
+                if reserve:
+                    workspace.users += 1
+            return workspace
+
+    def get(self, workspace_id: str = DEFAULT_WORKSPACE, reserve: bool = False) -> Workspace:
+        """
+        Retorna o workspace, abrindo (e migrando) o banco se necessário
+        Com reserve=True ele não é fechado até o release() correspondente
+        """
+        workspace = self.get_cached(workspace_id, reserve)
+        if workspace is not None:
+            return workspace
+
+        closable: List[Workspace] = []
+        with self._lock:
+            workspace = self._draining.pop(workspace_id, None)
+            if workspace is not None:
+                # Despejado mas ainda em uso: volta ao LRU em vez de abrir outro Database
+                self._open[workspace_id] = workspace
+                self._hits += 1
+                closable = self._evict_over_capacity()
+                if reserve:
+                    workspace.users += 1
+        if workspace is not None:
+            for old in closable:
+                old.close()
+            return workspace
+
+        path = self.path_for(workspace_id)
+        if workspace_id != DEFAULT_WORKSPACE:
+            os.makedirs(self.data_dir, exist_ok=True)
+        # Abre fora do lock para não bloquear os outros tenants durante a migração
+        opened = Workspace(workspace_id,
+                           Database(path, pool_size=self.pool_size, write_window=self.write_window),
+                           self.ranking_staleness, self.archive_after_days)
+
+        with self._lock:
+            workspace = self._open.get(workspace_id) or self._draining.pop(workspace_id, None)
+            if workspace is None:
+                workspace = opened
+                self._misses += 1
+            else:
+                # Outra thread abriu (ou devolveu ao LRU) o mesmo workspace primeiro
+                closable.append(opened)
+            self._open[workspace_id] = workspace
+            self._open.move_to_end(workspace_id)
+            closable += self._evict_over_capacity()
+            if reserve:
+                workspace.users += 1
+
+        for old in closable:
+            old.close()
+        return workspace
+
+    def release(self, workspace: Workspace) -> bool:
+        """
+        Libera uma reserva de get(..., reserve=True)
+        True quando era a última reserva de um workspace já fora do LRU: quem chama deve
+        fechá-lo (close() bloqueia até a fila de escrita esvaziar)
+        """
+        with self._lock:
+            workspace.users -= 1
+            if workspace.users or self._draining.get(workspace.id) is not workspace:
+                return False
+            del self._draining[workspace.id]
+            return True
+
+    def _evict_over_capacity(self) -> List[Workspace]:
+        """Tira do LRU os excedentes (com o lock); devolve os que já podem ser fechados"""
+        closable = []
+        while len(self._open) > self.capacity:
+            old = self._open.popitem(last=False)[1]
+            self._evictions += 1
+            if old.users:
+                self._draining[old.id] = old
+            else:
+                closable.append(old)
+        return closable
+
+    def open_workspaces(self) -> List[Workspace]:
+        """Workspaces abertos no momento (cópia, sem alterar a ordem do LRU)"""
+        with self._lock:
+            return list(self._open.values())
+
+    def close_all(self):
+        with self._lock:
+            workspaces = list(self._open.values()) + list(self._draining.values())
+            self._open.clear()
+            self._draining.clear()
+        for workspace in workspaces:
+            workspace.close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'open': len(self._open),
+                'draining': len(self._draining),
+                'capacity': self.capacity,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+            }
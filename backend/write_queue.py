@@ -0,0 +1,194 @@
+"""
+Fila de escrita com commit em grupo
+Uma única thread escritora consome as mutações pendentes e aplica várias na mesma
+transação (um commit para o grupo), em vez de cada requisição abrir sua conexão e
+disputar o lock de escrita do SQLite
+Cada mutação roda num SAVEPOINT: se falhar, só ela é desfeita e a sua Future recebe a exceção
+apply e after rodam no contexto (contextvars) de quem enfileirou, então os comandos SQL
+contam para a requisição de origem no /metrics e no Server-Timing
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import metrics
+
+
+# Espera por mais escritas antes de abrir a transação (0 = só agrupa o que já está na fila)
+DEFAULT_WINDOW = 0.0
+DEFAULT_MAX_BATCH = 256
+
+
+class _Write:
+    __slots__ = ('apply', 'after', 'future', 'context')
+
+    def __init__(self, apply: Callable, after: Optional[Callable], future: Future,
+                 context: contextvars.Context):
+        self.apply = apply    # apply(conn) -> resultado, dentro da transação do grupo
+        self.after = after    # after(resultado), depois do commit (ex.: notificar listeners)
+        self.future = future
+        self.context = context  # contexto de quem enfileirou
+
+
+class WriteQueue:
+    """
+    Mutações enfileiradas com submit(); a thread escritora (criada na primeira escrita)
+    usa uma conexão própria e resolve as Futures só depois do commit
+    """
+
+    def __init__(self, connect: Callable, window: float = DEFAULT_WINDOW,
+                 max_batch: int = DEFAULT_MAX_BATCH):
+        self.connect = connect
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Deque[_Write] = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._commits = 0
+        self._writes = 0
+        self._failed = 0
+
+    def submit(self, apply: Callable[[Any], Any], after: Optional[Callable[[Any], None]] = None) -> Future:
+        future: Future = Future()
+        context = contextvars.copy_context()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Fila de escrita fechada")
+            self._pending.append(_Write(apply, after, future, context))
+            depth = len(self._pending)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        metrics.WRITE_QUEUE_DEPTH.observe(depth)
+        return future
+
+    def close(self):
+        """Aplica o que já está na fila e encerra a thread escritora"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'depth': len(self._pending),
+                'commits': self._commits,
+                'writes': self._writes,
+                'failed': self._failed,
+            }
+
+    def _next_batch(self) -> List[_Write]:
+        """Espera a próxima escrita (e a janela, se houver); vazio = fila fechada"""
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if self.window > 0 and not self._closed:
+                deadline = time.monotonic() + self.window
+                while len(self._pending) < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            return [self._pending.popleft() for _ in range(min(len(self._pending), self.max_batch))]
+
+    def _run(self):
+        try:
+            conn = self.connect()
+            # Transações controladas aqui (BEGIN/SAVEPOINT/COMMIT explícitos)
+            conn.isolation_level = None
+        except Exception as e:
+            self._abandon(e)
+            return
+        try:
+            while True:
+                batch = self._next_batch()
+                if not batch:
+                    return
+                self._commit(conn, batch)
+        except Exception as e:
+            self._abandon(e)
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _abandon(self, error: Exception):
+        """
+        A thread escritora vai parar por erro (sem conexão ou conexão inutilizável):
+        as escritas pendentes recebem o erro e a próxima submit() cria outra thread
+        """
+        with self._cond:
+            pending = list(self._pending)
+            self._pending.clear()
+            self._thread = None
+        for write in pending:
+            if write.future.set_running_or_notify_cancel():
+                write.future.set_exception(error)
+
+    @staticmethod
+    def _apply(conn, write: _Write) -> Tuple[bool, Any]:
+        """Uma mutação no seu SAVEPOINT (no contexto de quem enfileirou)"""
+        # A escrita usa a conexão da thread escritora no lugar de uma do pool
+        metrics.record_checkout()
+        conn.execute("SAVEPOINT write")
+        try:
+            outcome = (True, write.apply(conn))
+        except Exception as e:
+            conn.execute("ROLLBACK TO write")
+            outcome = (False, e)
+        conn.execute("RELEASE write")
+        return outcome
+
+    def _commit(self, conn, batch: List[_Write]):
+        batch = [write for write in batch if write.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        outcomes: List[Tuple[bool, Any]] = []
+        broken: Optional[Exception] = None
+        start = time.perf_counter()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for write in batch:
+                outcomes.append(write.context.run(self._apply, conn, write))
+            conn.execute("COMMIT")
+        except Exception as e:
+            # Falha do grupo (ex.: disco cheio): nada foi gravado, todas recebem o erro
+            outcomes = [(False, e)] * len(batch)
+            try:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+            except Exception as rollback_error:
+                # Sem ROLLBACK a conexão fica inutilizável: resolve o grupo e para a thread
+                broken = rollback_error
+
+        failed = sum(1 for ok, _ in outcomes if not ok)
+        metrics.WRITE_COMMIT_SIZE.observe(len(batch) - failed)
+        metrics.WRITE_COMMIT_LATENCY.observe(time.perf_counter() - start)
+        with self._cond:
+            self._commits += 1
+            self._writes += len(batch) - failed
+            self._failed += failed
+
+        for write, (ok, value) in zip(batch, outcomes):
+            if not ok:
+                write.future.set_exception(value)
+                continue
+            try:
+                if write.after is not None:
+                    write.context.run(write.after, value)
+            except Exception as e:
+                write.future.set_exception(e)
+            else:
+                write.future.set_result(value)
+        if broken is not None:
+            raise broken
@@ -1,15 +1,28 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { DndContext, DragOverlay, closestCorners, useDraggable, useDroppable, PointerSensor, useSensor, useSensors } from '@dnd-kit/core'
 import { Plus, Clock, AlertCircle, Trash2, Inbox, Rocket, CheckCircle2 } from 'lucide-react'
 import { ConfirmModal } from './Modal'
 
 const API_URL = 'http://localhost:8000'
 
+// Dias até a entrega, calculados a partir de due_at (como no servidor, nunca negativo)
+// O deadline que veio na sincronização vale para o dia em que a tarefa mudou
+const daysUntil = (task) => {
+  if (!task.due_at) return task.deadline
+  const [year, month, day] = task.due_at.split('-').map(Number)
+  const today = new Date()
+  today.setHours(0, 0, 0, 0)
+  return Math.max(0, Math.round((new Date(year, month - 1, day) - today) / 86400000))
+}
+
 export default function KanbanBoard() {
   const [tasks, setTasks] = useState({ backlog: [], doing: [], done: [] })
   const [activeId, setActiveId] = useState(null)
   const [showDeleteModal, setShowDeleteModal] = useState(false)
   const [taskToDelete, setTaskToDelete] = useState(null)
+  // Cópia local do quadro + versão do servidor para sincronização incremental
+  const taskMap = useRef(new Map())
+  const version = useRef(0)
   
   const sensors = useSensors(
     useSensor(PointerSensor, {
@@ -21,12 +34,45 @@ export default function KanbanBoard() {
   
   useEffect(() => {
     fetchTasks()
+    
+    // Na virada do dia os prazos em dias mudam sem nenhuma escrita: recalcula o quadro
+    let timer
+    const scheduleMidnight = () => {
+      const midnight = new Date()
+      midnight.setHours(24, 0, 1, 0)
+      timer = setTimeout(() => {
+        fetchTasks()
+        scheduleMidnight()
+      }, midnight - new Date())
+    }
+    scheduleMidnight()
+    return () => clearTimeout(timer)
   }, [])
   
   const fetchTasks = async () => {
     try {
-      const response = await fetch(`${API_URL}/tasks`)
-      const data = await response.json()
+      // Busca só o que mudou desde a última versão conhecida
+      let hasMore = true
+      while (hasMore) {
+        const response = await fetch(`${API_URL}/tasks/changes?since=${version.current}`)
+        const data = await response.json()
+        
+        if (data.reset) {
+          // Histórico antigo foi limpo: recarrega o quadro inteiro
+          taskMap.current = new Map()
+          version.current = 0
+          continue
+        }
+        
+        data.changes.forEach(t => taskMap.current.set(t.id, t))
+        data.deleted.forEach(id => taskMap.current.delete(id))
+        version.current = data.version
+        hasMore = data.has_more
+      }
+      
+      const data = Array.from(taskMap.current.values())
+        .map(t => ({ ...t, deadline: daysUntil(t) }))
+        .sort((a, b) => b.created_at.localeCompare(a.created_at))
       
       // Agrupa por status
       const grouped = {